@@ -1,8 +1,10 @@
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
-from langchain_openai import ChatOpenAI, AzureChatOpenAI
-from langchain_core.messages import SystemMessage, AIMessage
+from langchain_core.messages import SystemMessage, AIMessage, ToolMessage, message_chunk_to_message
+from langchain_core.runnables import RunnableConfig
 import json
+import time
+from typing import Optional
 
 from app.agent.state import AgentState
 from app.agent.prompts import SYSTEM_PROMPT, PLANNER_PROMPT
@@ -12,14 +14,23 @@ from app.agent.skills.faq_search import knowledge_base_search
 from app.agent.skills.escalation import escalate_to_engineer
 from app.agent.skills.sentiment import equipment_status
 from app.agent.skills.chart_generator import generate_chart
+from app.agent.skills.aggregate_query import aggregate_query
+from app.agent.skills.materials_query import materials_query
+from app.agent.skills.shift_digest import shift_digest
+from app.agent.tool_executor import StreamingToolExecutor
+from app.agent.model_router import FAST, LARGE, choose_tier, record_llm_call
+from app.agent.provider_pool import PooledChatModel
 from app.config import (
-    LLM_PROVIDER, OPENAI_API_KEY, OPENAI_MODEL, TEMPERATURE,
+    LLM_PROVIDER, OPENAI_API_KEY, OPENAI_MODEL, OPENAI_FAST_MODEL, OPENAI_BASE_URL, TEMPERATURE,
     AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_DEPLOYMENT, AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_DEPLOYMENT, AZURE_OPENAI_FAST_DEPLOYMENT, AZURE_OPENAI_API_VERSION,
+    STREAMING_TOOL_EXECUTION,
+    LLM_POOL_PROVIDERS, LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_MS, LLM_HEDGE_DEFAULT_MS,
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_MS, LLM_RETRY_MAX_MS, LLM_POOL_EWMA_ALPHA,
 )
 
 # All agent skills (tools)
-tools = [work_order_lookup, equipment_status, defect_report, knowledge_base_search, escalate_to_engineer, generate_chart]
+tools = [work_order_lookup, equipment_status, defect_report, knowledge_base_search, escalate_to_engineer, generate_chart, aggregate_query, materials_query, shift_digest]
 
 SKILL_DESCRIPTIONS = {
     "work_order_lookup": {
@@ -69,39 +80,105 @@ SKILL_DESCRIPTIONS = {
         "details": "Creates Seaborn charts for data analysis: material property comparisons, work order OEE dashboards, equipment utilization overviews, OEE trend lines, and defect analysis scatter plots.",
         "examples": ["Compare titanium vs stainless steel", "Show equipment utilization chart", "Generate a defect analysis dashboard"],
         "data_source": "All data sources"
+    },
+    "aggregate_query": {
+        "name": "Aggregate Query",
+        "description": "Compute averages, totals, and rankings over plant data",
+        "icon": "🧮",
+        "details": "Runs filtered, grouped aggregations (count, sum, avg, min, max, top-k) over work orders and equipment on the server and returns only the small result table.",
+        "examples": ["What's the average OEE of in-progress orders?", "Which machine has the highest downtime this week?", "Count work orders by priority"],
+        "data_source": "work_orders.json, equipment.json"
+    },
+    "materials_query": {
+        "name": "Materials Query",
+        "description": "Filter and rank materials by their properties",
+        "icon": "🧪",
+        "details": "Answers property questions over the materials catalogue with range filters (tensile strength, hardness, cost, machinability, density), single or weighted multi-criteria ranking, and top-k, returning a compact table without rendering a chart.",
+        "examples": ["Which materials exceed 900 MPa tensile and cost under $20/kg?", "Top 3 most machinable materials", "Rank alloys by strength and cost"],
+        "data_source": "materials.json"
+    },
+    "shift_digest": {
+        "name": "Shift Digest",
+        "description": "Precomputed shift-change overviews with charts",
+        "icon": "🗞️",
+        "details": "Serves digests computed in the background on the shift schedule and whenever the data changes: machines in maintenance and the work orders they block, overdue work orders, and the defect dashboard including logged NCRs, each with its chart.",
+        "examples": ["Which machines are in maintenance this shift?", "What work orders are overdue?", "Show the defect dashboard"],
+        "data_source": "equipment.json, work_orders.json, NCR journal"
     }
 }
 
 
-def _create_llm():
-    """Create LLM instance based on the configured provider (openai or azure)."""
-    if LLM_PROVIDER == "azure":
+def _create_provider_llm(provider: str, tier: str = LARGE, max_retries: Optional[int] = None):
+    """Create the chat model for one provider ("openai" or "azure").
+    The fast tier uses OPENAI_FAST_MODEL / AZURE_OPENAI_FAST_DEPLOYMENT when set.
+    """
+    # Imported lazily: langchain_openai pulls in the openai SDK and tiktoken
+    from langchain_openai import ChatOpenAI, AzureChatOpenAI
+
+    # Leave the SDK's own retry default alone unless the caller (the pool) manages retries
+    retry_kwargs = {} if max_retries is None else {"max_retries": max_retries}
+    if provider == "azure":
         if not AZURE_OPENAI_API_KEY or not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_DEPLOYMENT:
             raise ValueError(
                 "Azure OpenAI requires AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, "
                 "and AZURE_OPENAI_DEPLOYMENT environment variables."
             )
+        deployment = AZURE_OPENAI_DEPLOYMENT
+        if tier == FAST and AZURE_OPENAI_FAST_DEPLOYMENT:
+            deployment = AZURE_OPENAI_FAST_DEPLOYMENT
         return AzureChatOpenAI(
-            azure_deployment=AZURE_OPENAI_DEPLOYMENT,
+            azure_deployment=deployment,
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
             api_key=AZURE_OPENAI_API_KEY,
             api_version=AZURE_OPENAI_API_VERSION,
             temperature=TEMPERATURE,
             streaming=True,
+            stream_usage=True,
+            **retry_kwargs,
         )
-    else:
+    elif provider == "openai":
         return ChatOpenAI(
-            model=OPENAI_MODEL,
+            model=OPENAI_FAST_MODEL if tier == FAST and OPENAI_FAST_MODEL else OPENAI_MODEL,
             temperature=TEMPERATURE,
             api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL or None,
             streaming=True,
+            stream_usage=True,
+            **retry_kwargs,
+        )
+    raise ValueError(f"Unknown LLM provider '{provider}'. Use openai, azure, or pool.")
+
+
+# One pool per model tier, kept so provider latency stats persist across requests
+_provider_pools: dict[str, PooledChatModel] = {}
+
+
+def _create_llm(tier: str = LARGE):
+    """Create LLM instance based on the configured provider (openai, azure, or pool).
+    "pool" spreads calls over LLM_POOL_PROVIDERS with hedging and retries.
+    """
+    if LLM_PROVIDER != "pool":
+        return _create_provider_llm(LLM_PROVIDER, tier)
+    if tier not in _provider_pools:
+        _provider_pools[tier] = PooledChatModel(
+            providers=[(name, _create_provider_llm(name, tier, max_retries=0)) for name in LLM_POOL_PROVIDERS],
+            hedge_enabled=LLM_HEDGE_ENABLED,
+            hedge_percentile=LLM_HEDGE_PERCENTILE,
+            hedge_min_ms=LLM_HEDGE_MIN_MS,
+            hedge_default_ms=LLM_HEDGE_DEFAULT_MS,
+            max_retries=LLM_MAX_RETRIES,
+            retry_base_ms=LLM_RETRY_BASE_MS,
+            retry_max_ms=LLM_RETRY_MAX_MS,
+            ewma_alpha=LLM_POOL_EWMA_ALPHA,
         )
+    return _provider_pools[tier]
 
 
-def _planner_node(state: AgentState) -> dict:
+async def _planner_node(state: AgentState) -> dict:
     """Plan which skills to use and in what order."""
-    llm = _create_llm()
     messages = state["messages"]
+    tier, _ = choose_tier("planner", messages)
+    llm = _create_llm(tier)
     
     # Get the latest user message
     user_msg = ""
@@ -115,7 +192,9 @@ def _planner_node(state: AgentState) -> dict:
         SystemMessage(content=f"User query: {user_msg}")
     ]
     
-    response = llm.invoke(planner_messages)
+    started = time.perf_counter()
+    response = await llm.ainvoke(planner_messages)
+    record_llm_call(tier, (time.perf_counter() - started) * 1000, response.usage_metadata)
     plan_text = response.content.strip()
     
     # Try to parse the plan
@@ -134,25 +213,51 @@ def _planner_node(state: AgentState) -> dict:
     return {"messages": [plan_msg]}
 
 
-def _agent_node(state: AgentState) -> dict:
-    """Run the LLM agent with tools bound."""
-    llm = _create_llm()
-    llm_with_tools = llm.bind_tools(tools)
-
+async def _agent_node(state: AgentState, config: RunnableConfig) -> dict:
+    """Run the LLM agent with tools bound.
+    Async so that cancelling the graph task also aborts the in-flight LLM HTTP stream.
+    """
     messages = state["messages"]
+    tier, reason = choose_tier("agent", messages)
+    llm_with_tools = _create_llm(tier).bind_tools(tools).with_config(
+        metadata={"model_tier": tier, "model_tier_reason": reason}
+    )
+
     # Prepend system prompt if not already there
     if not messages or not isinstance(messages[0], SystemMessage) or "__PLAN__" in messages[0].content:
         # Filter out plan messages and prepend system prompt
         filtered = [m for m in messages if not (isinstance(m, SystemMessage) and "__PLAN__" in m.content)]
         messages = [SystemMessage(content=SYSTEM_PROMPT)] + filtered
 
-    response = llm_with_tools.invoke(messages)
-    return {"messages": [response]}
+    started = time.perf_counter()
+    if not STREAMING_TOOL_EXECUTION:
+        response = await llm_with_tools.ainvoke(messages)
+        record_llm_call(tier, (time.perf_counter() - started) * 1000, response.usage_metadata)
+        return {"messages": [response]}
+
+    # Launch each tool call as soon as its arguments finish streaming, then return the
+    # AI message together with the tool results so the next step goes straight back here
+    executor = StreamingToolExecutor(tools, config)
+    accumulated = None
+    try:
+        async for chunk in llm_with_tools.astream(messages, config):
+            accumulated = chunk if accumulated is None else accumulated + chunk
+            if chunk.tool_call_chunks:
+                executor.feed(accumulated)
+        # A provider may end the stream without a single chunk; treat that as an empty answer
+        response = message_chunk_to_message(accumulated) if accumulated is not None else AIMessage(content="")
+        record_llm_call(tier, (time.perf_counter() - started) * 1000, response.usage_metadata)
+        tool_messages = await executor.results(response) if response.tool_calls else []
+    finally:
+        executor.cancel()
+    return {"messages": [response, *tool_messages]}
 
 
 def _should_continue(state: AgentState) -> str:
-    """Determine whether to route to tools or end."""
+    """Determine whether to route to tools, back to the agent (tools already ran), or end."""
     last_message = state["messages"][-1]
+    if isinstance(last_message, ToolMessage):
+        return "agent"
     if hasattr(last_message, "tool_calls") and last_message.tool_calls:
         return "tools"
     return END
@@ -163,6 +268,7 @@ def build_graph() -> StateGraph:
     graph = StateGraph(AgentState)
 
     # Add nodes — sequential: planner → agent → tools → agent loop
+    # (with streaming tool execution the agent runs its tools itself and loops directly)
     graph.add_node("planner", _planner_node)
     graph.add_node("agent", _agent_node)
     graph.add_node("tools", ToolNode(tools))
@@ -179,6 +285,7 @@ def build_graph() -> StateGraph:
         _should_continue,
         {
             "tools": "tools",
+            "agent": "agent",
             END: END,
         }
     )
@@ -189,5 +296,15 @@ def build_graph() -> StateGraph:
     return graph.compile()
 
 
-# Pre-compiled graph instance
-agent_graph = build_graph()
+_agent_graph = None
+
+
+def get_agent_graph():
+    """Return the compiled agent graph, compiling it on first use.
+    The FastAPI startup hook calls this so compilation happens once per worker
+    at boot rather than at import time.
+    """
+    global _agent_graph
+    if _agent_graph is None:
+        _agent_graph = build_graph()
+    return _agent_graph
@@ -0,0 +1,71 @@
+"""Route each LLM call to the fast or the large model tier.
+
+Planning and tool selection only need to pick skills, and short factual answers
+only restate a tool result, so they go to the smaller, faster model. A turn is
+escalated to the large model when it has to synthesize a lot: a long request,
+a multi-step plan, many tool results, or several charts to interpret.
+"""
+import json
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app import metrics
+from app.config import (
+    MODEL_ROUTING_ENABLED, ROUTER_LONG_MESSAGE_CHARS, ROUTER_MAX_FAST_PLAN_STEPS,
+    ROUTER_MAX_FAST_TOOL_RESULTS, ROUTER_MULTI_CHART_COUNT,
+)
+
+FAST = "fast"
+LARGE = "large"
+
+
+def _current_turn(messages: list[BaseMessage]) -> tuple[str, list[BaseMessage]]:
+    """The latest user message and everything after it."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return str(messages[i].content), messages[i + 1:]
+    return "", list(messages)
+
+
+def _plan_size(turn: list[BaseMessage]) -> int:
+    for msg in turn:
+        if isinstance(msg, SystemMessage) and str(msg.content).startswith("__PLAN__:"):
+            try:
+                plan = json.loads(msg.content.split("__PLAN__:", 1)[1])
+            except json.JSONDecodeError:
+                return 0
+            return len(plan) if isinstance(plan, list) else 0
+    return 0
+
+
+def choose_tier(stage: str, messages: list[BaseMessage]) -> tuple[str, str]:
+    """Pick the model tier for a planner or agent call; returns (tier, reason)."""
+    if not MODEL_ROUTING_ENABLED:
+        return LARGE, "routing disabled"
+    if stage == "planner":
+        return FAST, "planning"
+
+    user_msg, turn = _current_turn(messages)
+    tool_results = [m for m in turn if isinstance(m, ToolMessage)]
+    if not tool_results:
+        return FAST, "tool selection"
+
+    charts = sum(1 for m in tool_results if m.name == "generate_chart")
+    if len(user_msg) > ROUTER_LONG_MESSAGE_CHARS:
+        return LARGE, "long request"
+    if _plan_size(turn) > ROUTER_MAX_FAST_PLAN_STEPS:
+        return LARGE, "multi-step plan"
+    if charts >= ROUTER_MULTI_CHART_COUNT:
+        return LARGE, "multi-chart analysis"
+    if len(tool_results) > ROUTER_MAX_FAST_TOOL_RESULTS:
+        return LARGE, "synthesis over many tool results"
+    return FAST, "short answer"
+
+
+def record_llm_call(tier: str, latency_ms: float, usage: dict | None) -> None:
+    """Per-tier call count, latency and token usage for /api/metrics."""
+    metrics.incr(f"llm_{tier}_calls")
+    metrics.observe(f"llm_{tier}_latency_ms", latency_ms)
+    if usage:
+        metrics.incr(f"llm_{tier}_input_tokens", usage.get("input_tokens", 0))
+        metrics.incr(f"llm_{tier}_output_tokens", usage.get("output_tokens", 0))
@@ -0,0 +1,216 @@
+"""A chat model that spreads calls over several OpenAI-compatible providers.
+
+The pool keeps an EWMA of each provider's latency (time to first streamed
+chunk; every call streams) and sends every call to the currently fastest one. If that provider has not answered by a high percentile of
+its recent latencies, a hedged request goes to the next provider and whichever
+answers first wins; the loser is cancelled. Throttling (429), server errors
+(5xx) and connection failures are retried with jittered exponential backoff,
+re-ranking providers after each failure.
+
+Providers are called through their private _astream so that only
+the pool's own run reports callbacks (one set of stream events per call).
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream, generate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+
+from app import metrics
+
+_RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError")
+
+
+def _is_retryable(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in _RETRYABLE_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class _ProviderStats:
+    def __init__(self, window: int = 200):
+        self.ewma_ms: Optional[float] = None
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def record(self, latency_ms: float, alpha: float) -> None:
+        self.recent.append(latency_ms)
+        self.ewma_ms = latency_ms if self.ewma_ms is None else alpha * latency_ms + (1 - alpha) * self.ewma_ms
+
+    def penalize(self, floor_ms: float) -> None:
+        # Push a failing provider behind the others until it proves fast again
+        self.ewma_ms = max((self.ewma_ms or 0) * 2, floor_ms)
+
+
+class PooledChatModel(BaseChatModel):
+    """Hedged, retried chat completions over named provider models (e.g. openai, azure)."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    providers: list[tuple[str, BaseChatModel]]
+    hedge_enabled: bool = True
+    hedge_percentile: float = 0.95
+    hedge_min_ms: float = 300
+    hedge_default_ms: float = 2000
+    hedge_min_samples: int = 20
+    max_retries: int = 3
+    retry_base_ms: float = 250
+    retry_max_ms: float = 4000
+    ewma_alpha: float = 0.2
+
+    _stats: dict[str, _ProviderStats] = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled-openai"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """Bind OpenAI-format tools; every provider receives them with each request."""
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def stats(self) -> dict:
+        """Latency EWMA and sample count per provider."""
+        return {
+            name: {"ewma_ms": round(s.ewma_ms, 1) if s.ewma_ms is not None else None, "samples": len(s.recent)}
+            for name, s in ((n, self._stat(n)) for n, _ in self.providers)
+        }
+
+    # ---- Ranking, hedging and backoff ----
+
+    def _stat(self, name: str) -> _ProviderStats:
+        if name not in self._stats:
+            self._stats[name] = _ProviderStats()
+        return self._stats[name]
+
+    def _ranked(self) -> list[tuple[str, BaseChatModel]]:
+        # Unmeasured providers rank first so each gets sampled; ties keep configured order
+        order = {name: i for i, (name, _) in enumerate(self.providers)}
+        return sorted(self.providers, key=lambda p: (self._stat(p[0]).ewma_ms or 0.0, order[p[0]]))
+
+    def _hedge_delay_s(self, name: str) -> float:
+        recent = sorted(self._stat(name).recent)
+        if len(recent) < self.hedge_min_samples:
+            return self.hedge_default_ms / 1000
+        idx = min(len(recent) - 1, int(self.hedge_percentile * len(recent)))
+        return max(recent[idx], self.hedge_min_ms) / 1000
+
+    def _backoff_s(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.retry_max_ms, self.retry_base_ms * 2 ** attempt)) / 1000
+
+    async def _race(self, call: Callable[[BaseChatModel], Any],
+                    discard: Optional[Callable[[Any], Any]] = None) -> tuple[str, Any]:
+        """Run `call` on the fastest provider, hedging to the next one if it is slow.
+        Returns (provider name, result); raises the last error if every attempt failed.
+        `discard` releases the result of a losing attempt that also completed."""
+        ranked = self._ranked()
+        tasks: dict[asyncio.Task, str] = {}
+
+        async def attempt(name: str, model: BaseChatModel):
+            started = time.perf_counter()
+            try:
+                result = await call(model)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                metrics.incr(f"llm_pool_{name}_errors")
+                self._stat(name).penalize(self.hedge_default_ms)
+                raise
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._stat(name).record(latency_ms, self.ewma_alpha)
+            metrics.observe(f"llm_pool_{name}_latency_ms", latency_ms)
+            return result
+
+        def launch(index: int) -> None:
+            name, model = ranked[index]
+            tasks[asyncio.create_task(attempt(name, model))] = name
+
+        launch(0)
+        next_index = 1
+        hedge_at = self._hedge_delay_s(ranked[0][0]) if self.hedge_enabled else None
+        last_error: Optional[BaseException] = None
+        try:
+            while tasks:
+                can_hedge = hedge_at is not None and next_index < len(ranked)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=hedge_at if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    metrics.incr("llm_pool_hedges")
+                    launch(next_index)
+                    next_index += 1
+                    hedge_at = None
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        if next_index > 1 and name != ranked[0][0]:
+                            metrics.incr("llm_pool_hedge_wins")
+                        return name, task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    async def _with_retries(self, call: Callable[[BaseChatModel], Any],
+                            discard: Optional[Callable[[Any], Any]] = None) -> tuple[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._race(call, discard)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                metrics.incr("llm_pool_retries")
+                await asyncio.sleep(self._backoff_s(attempt))
+
+    # ---- BaseChatModel ----
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        # Sync calls are not hedged; the graph only uses the async paths
+        _, model = self._ranked()[0]
+        return generate_from_stream(model._stream(messages, stop=stop, **kwargs))
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        # Providers are configured for streaming, so non-streaming calls collect the stream
+        return await agenerate_from_stream(self._astream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async def first_chunk(model: BaseChatModel):
+            stream = model._astream(messages, stop=stop, **kwargs)
+            try:
+                return await anext(stream), stream
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        # Hedging and retries cover the time to first chunk; once a provider is
+        # streaming, the response is committed to it
+        async def close(result) -> None:
+            await result[1].aclose()
+
+        _, (chunk, stream) = await self._with_retries(first_chunk, close)
+        try:
+            while True:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                try:
+                    chunk = await anext(stream)
+                except StopAsyncIteration:
+                    return
+        finally:
+            await stream.aclose()
@@ -0,0 +1,188 @@
+import json
+import re
+from langchain_core.tools import tool
+
+from app.ncr_journal import apply_logged_defects
+from app.storage import load_records
+
+AGGREGATIONS = ("count", "sum", "avg", "min", "max")
+
+# filter grammar: "<field><op><value>", comma separated (e.g. "status=in_progress,oee_pct>=80")
+_FILTER_RE = re.compile(r"^\s*([a-z0-9_]+)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$", re.IGNORECASE)
+
+
+def _work_order_rows() -> list[dict]:
+    """Flatten work orders into one row per order with performance metrics inlined."""
+    rows = []
+    for wo in apply_logged_defects(load_records("work_orders")):
+        row = {k: v for k, v in wo.items() if k not in ("performance_metrics", "notes")}
+        row.update(wo["performance_metrics"])
+        row["progress_pct"] = round(wo["completed_quantity"] / wo["quantity"] * 100, 1) if wo["quantity"] > 0 else 0
+        rows.append(row)
+    return rows
+
+
+def _equipment_rows() -> list[dict]:
+    """Flatten equipment into one row per machine with sensors and 7-day history rolled up."""
+    rows = []
+    for m in load_records("equipment"):
+        history = m["performance_history"]
+        row = {k: v for k, v in m.items() if k not in ("sensor_readings", "performance_history", "notes")}
+        row.update(m["sensor_readings"])
+        row["active_work_order_count"] = len(m["active_work_orders"])
+        row["avg_oee_7d"] = round(sum(history["daily_oee"]) / max(len(history["daily_oee"]), 1), 1)
+        row["avg_availability_7d"] = round(sum(history["daily_availability"]) / max(len(history["daily_availability"]), 1), 1)
+        row["output_parts_7d"] = sum(history["daily_output_parts"])
+        row["downtime_hours_7d"] = round(sum(history["weekly_downtime_hours"]), 1)
+        rows.append(row)
+    return rows
+
+
+DATASETS = {
+    "work_orders": _work_order_rows,
+    "equipment": _equipment_rows,
+}
+
+
+def _parse_filters(filters: str) -> list[tuple[str, str, str]]:
+    parsed = []
+    for part in filters.split(","):
+        if not part.strip():
+            continue
+        match = _FILTER_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid filter '{part.strip()}'. Use field=value, field>=number, or field~text.")
+        parsed.append((match.group(1).lower(), match.group(2), match.group(3)))
+    return parsed
+
+
+def _matches(row: dict, field: str, op: str, value: str) -> bool:
+    actual = row.get(field)
+    if actual is None:
+        return False
+    if op == "~":
+        return value.lower() in str(actual).lower()
+    if op in ("=", "!="):
+        equal = str(actual).lower() == value.lower()
+        return equal if op == "=" else not equal
+    try:
+        actual_num, value_num = float(actual), float(value)
+    except (TypeError, ValueError):
+        return False
+    if op == ">":
+        return actual_num > value_num
+    if op == ">=":
+        return actual_num >= value_num
+    if op == "<":
+        return actual_num < value_num
+    return actual_num <= value_num
+
+
+def _aggregate(values: list[float], aggregation: str, count: int):
+    if aggregation == "count":
+        return count
+    if not values:
+        return None
+    if aggregation == "sum":
+        return round(sum(values), 2)
+    if aggregation == "avg":
+        return round(sum(values) / len(values), 2)
+    if aggregation == "min":
+        return min(values)
+    return max(values)
+
+
+@tool
+def aggregate_query(
+    dataset: str,
+    aggregation: str = "count",
+    metric: str = "",
+    group_by: str = "",
+    filters: str = "",
+    top_k: int = 0,
+    order: str = "desc",
+) -> str:
+    """Compute statistics over work orders or equipment without pulling raw records.
+    Use this tool for analytical questions such as averages, totals, rankings,
+    or "which machine has the highest ..." instead of listing records and doing math.
+
+    dataset: 'work_orders' or 'equipment'
+    aggregation: 'count', 'sum', 'avg', 'min', or 'max'
+    metric: numeric field to aggregate (not needed for 'count'), e.g. 'oee_pct',
+        'scrap_rate_pct', 'defects_found', 'progress_pct' for work orders, or
+        'utilization_pct', 'avg_oee_7d', 'downtime_hours_7d', 'vibration_mm_s' for equipment
+    group_by: optional field to group by, e.g. 'status', 'priority', 'machine_assigned', 'machine_id', 'type'
+    filters: optional comma-separated conditions, e.g. 'status=in_progress,oee_pct>=70,customer~aero'
+    top_k: optional number of groups to return after sorting by value (0 = all)
+    order: 'desc' (highest first) or 'asc' (lowest first)
+    """
+    dataset_key = dataset.lower().strip().replace(" ", "_")
+    loader = DATASETS.get(dataset_key)
+    if loader is None:
+        return json.dumps({"error": f"Unknown dataset: {dataset}. Available: {', '.join(DATASETS)}"})
+
+    aggregation = aggregation.lower().strip()
+    if aggregation not in AGGREGATIONS:
+        return json.dumps({"error": f"Unknown aggregation: {aggregation}. Available: {', '.join(AGGREGATIONS)}"})
+
+    metric = metric.lower().strip()
+    group_by = group_by.lower().strip()
+    if aggregation != "count" and not metric:
+        return json.dumps({"error": f"Aggregation '{aggregation}' requires a metric field."})
+
+    try:
+        conditions = _parse_filters(filters)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+    rows = loader()
+    fields = sorted({k for row in rows for k in row})
+    for field in [f for f, _, _ in conditions] + [metric, group_by]:
+        if field and field not in fields:
+            return json.dumps({"error": f"Unknown field '{field}' for {dataset_key}. Available: {', '.join(fields)}"})
+
+    matched = [row for row in rows if all(_matches(row, f, op, v) for f, op, v in conditions)]
+
+    groups: dict[str, list[dict]] = {}
+    for row in matched:
+        key = str(row.get(group_by)) if group_by else "all"
+        groups.setdefault(key, []).append(row)
+
+    results = []
+    for key, members in groups.items():
+        values = [float(r[metric]) for r in members if metric and isinstance(r.get(metric), (int, float))]
+        results.append({
+            "group": key,
+            "value": _aggregate(values, aggregation, len(members)),
+            "count": len(members),
+        })
+
+    # Groups with no numeric values for the metric sort last regardless of order
+    valued = sorted((r for r in results if r["value"] is not None), key=lambda r: r["value"],
+                    reverse=order.lower().strip() != "asc")
+    results = valued + [r for r in results if r["value"] is None]
+    if top_k and top_k > 0:
+        results = results[:top_k]
+
+    label = f"{aggregation}({metric})" if metric else aggregation
+    if results:
+        leader = results[0]
+        summary = (
+            f"{label} over {len(matched)} {dataset_key.replace('_', ' ')} record(s)"
+            + (f" grouped by {group_by}" if group_by else "")
+            + f": {'top' if group_by else 'result'} = {leader['group'] + ' → ' if group_by else ''}{leader['value']}."
+        )
+    else:
+        summary = f"No {dataset_key.replace('_', ' ')} records matched the filters."
+
+    return json.dumps({
+        "found": bool(results),
+        "dataset": dataset_key,
+        "aggregation": aggregation,
+        "metric": metric or None,
+        "group_by": group_by or None,
+        "filters": filters or None,
+        "matched_records": len(matched),
+        "rows": results,
+        "summary": summary,
+    }, indent=2)
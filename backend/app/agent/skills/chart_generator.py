@@ -1,61 +1,392 @@
 import json
-import os
 import base64
 import io
+import threading
 import uuid
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
 from langchain_core.tools import tool
 
-# Set matplotlib backend before importing pyplot
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
+from app.cancellation import RequestCancelled, check_cancelled, is_cancelled
+from app.ncr_journal import apply_logged_defects
+from app.storage import load_records
+from app.config import (
+    CHART_DEFAULT_FORMAT, CHART_DEFAULT_SIZE, CHART_DEFAULT_MODE, CHART_THUMBNAIL_FIRST, CHART_SOURCE_CACHE_SIZE,
+    CHART_TEMPLATES,
+)
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-
-# Module-level chart store: chart_id → base64 PNG
+# Module-level chart store: chart_id → rendered preview (base64 image + format metadata)
 # The SSE handler reads from here so the LLM never sees the raw image data
-chart_store: dict[str, str] = {}
-
-# Configure Seaborn style for dark theme
-sns.set_theme(style="darkgrid")
-plt.rcParams.update({
-    'figure.facecolor': '#111827',
-    'axes.facecolor': '#1a2236',
-    'axes.edgecolor': '#374151',
-    'axes.labelcolor': '#e2e8f0',
-    'text.color': '#e2e8f0',
-    'xtick.color': '#94a3b8',
-    'ytick.color': '#94a3b8',
-    'grid.color': '#1e293b',
-    'figure.figsize': (10, 6),
-    'font.size': 11,
-    'axes.titlesize': 14,
-    'axes.labelsize': 12,
-})
+chart_store: dict[str, dict] = {}
+
+# matplotlib/seaborn (and transitively pandas/scipy) are imported on first use,
+# not at module import, to keep worker cold start fast
+_plt = None
+_plt_lock = threading.Lock()
+
+
+def _pyplot():
+    """Import and configure matplotlib on first use and return pyplot."""
+    global _plt
+    if _plt is not None:
+        return _plt
+    with _plt_lock:
+        if _plt is None:
+            # Set matplotlib backend before importing pyplot
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            # Configure Seaborn style for dark theme
+            sns.set_theme(style="darkgrid")
+            plt.rcParams.update({
+                'figure.facecolor': '#111827',
+                'axes.facecolor': '#1a2236',
+                'axes.edgecolor': '#374151',
+                'axes.labelcolor': '#e2e8f0',
+                'text.color': '#e2e8f0',
+                'xtick.color': '#94a3b8',
+                'ytick.color': '#94a3b8',
+                'grid.color': '#1e293b',
+                'figure.figsize': (10, 6),
+                'font.size': 11,
+                'axes.titlesize': 14,
+                'axes.labelsize': 12,
+            })
+            _plt = plt
+    return _plt
+
+
+def warm_up_charts() -> None:
+    """Load the chart libraries ahead of the first generate_chart call."""
+    _pyplot()
+
 
 COLORS = ['#6366f1', '#8b5cf6', '#06b6d4', '#22c55e', '#f59e0b',
           '#ef4444', '#ec4899', '#14b8a6', '#f97316', '#a78bfa']
 
 
-def _fig_to_base64(fig) -> str:
-    """Convert a matplotlib figure to a base64-encoded PNG string."""
+# Output formats and size presets. Only 'print' pays for bbox_inches='tight'
+# (an extra layout pass); the others rely on fig.tight_layout() alone.
+CHART_FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+CHART_SIZES = {
+    "thumbnail": {"dpi": 40, "tight": False},
+    "standard": {"dpi": 100, "tight": False},
+    "print": {"dpi": 200, "tight": True},
+}
+CHART_MODES = ("image", "spec")
+
+# Per-request render options (format, size), set by the chat handler
+render_options: ContextVar[tuple[str, str]] = ContextVar(
+    "render_options", default=(CHART_DEFAULT_FORMAT, CHART_DEFAULT_SIZE)
+)
+
+# Per-request delivery mode: 'image' renders on the server, 'spec' sends series data
+# for client-side rendering (chart types without a spec builder fall back to 'image')
+chart_mode: ContextVar[str] = ContextVar("chart_mode", default=CHART_DEFAULT_MODE)
+
+# chart_id → (chart_type, subject, input records) so full-resolution renders can be
+# produced lazily from the same data the preview showed
+_chart_sources: OrderedDict[str, tuple[str, str, dict]] = OrderedDict()
+_chart_sources_lock = threading.Lock()
+
+# Records the chart builder being run has read (or, on a re-render, must read again)
+_chart_inputs: ContextVar[Optional[dict]] = ContextVar("chart_inputs", default=None)
+
+
+def _records(dataset: str, with_logged_defects: bool = False) -> list[dict]:
+    """A dataset for a chart builder, remembered with the chart so re-renders reuse it."""
+    inputs = _chart_inputs.get()
+    key = (dataset, with_logged_defects)
+    if inputs is not None and key in inputs:
+        return inputs[key]
+    records = load_records(dataset)
+    if with_logged_defects:
+        records = apply_logged_defects(records)
+    if inputs is not None:
+        inputs[key] = records
+    return records
+
+
+def _build_chart(chart_type: str, subject: str, inputs: dict):
+    """Run a chart builder, recording the records it reads into `inputs` (or replaying
+    the ones already there). Returns (fig, summary)."""
+    token = _chart_inputs.set(inputs)
+    try:
+        return CHART_BUILDERS[chart_type](subject)
+    finally:
+        _chart_inputs.reset(token)
+
+
+def normalize_render_options(fmt: Optional[str], size: Optional[str]) -> tuple[str, str]:
+    """Validate requested format/size, falling back to the configured defaults."""
+    fmt = (fmt or CHART_DEFAULT_FORMAT).lower()
+    size = (size or CHART_DEFAULT_SIZE).lower()
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unknown chart format: {fmt}. Available: {', '.join(CHART_FORMATS)}")
+    if size not in CHART_SIZES:
+        raise ValueError(f"Unknown chart size: {size}. Available: {', '.join(CHART_SIZES)}")
+    return fmt, size
+
+
+def normalize_chart_mode(mode: Optional[str]) -> str:
+    """Validate a requested delivery mode, falling back to the configured default."""
+    mode = (mode or CHART_DEFAULT_MODE).lower()
+    if mode not in CHART_MODES:
+        raise ValueError(f"Unknown chart mode: {mode}. Available: {', '.join(CHART_MODES)}")
+    return mode
+
+
+def _band_colors(values: list, good: float, warn: float, higher_is_better: bool = True) -> list[str]:
+    """Traffic-light bar colors: green at/over `good`, amber at/over `warn`, red otherwise."""
+    if higher_is_better:
+        return ['#22c55e' if v >= good else '#f59e0b' if v >= warn else '#ef4444' for v in values]
+    return ['#22c55e' if v <= good else '#f59e0b' if v <= warn else '#ef4444' for v in values]
+
+
+def _fig_to_bytes(fig, fmt: str = "png", size: str = "standard") -> bytes:
+    """Render a matplotlib figure in the given format and size preset, then close it
+    (template figures stay open for the next render)."""
+    preset = CHART_SIZES[size]
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=130, bbox_inches='tight', pad_inches=0.3)
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    if preset["tight"]:
+        fig.savefig(buf, format=fmt, dpi=preset["dpi"], bbox_inches='tight', pad_inches=0.3)
+    else:
+        fig.savefig(buf, format=fmt, dpi=preset["dpi"])
+    _close_figure(fig)
+    return buf.getvalue()
+
+
+def _close_figure(fig) -> None:
+    if fig not in _template_figures:
+        _pyplot().close(fig)
+
+
+# ---- Dashboard templates ----
+# Fixed-layout dashboards keep one figure per type per worker thread (matplotlib
+# figures are not thread-safe). Axes, titles, threshold lines, legends and styling
+# are built once; each render swaps only the data artists.
+
+_template_figures: "weakref.WeakSet" = weakref.WeakSet()
+_templates = threading.local()
+
+
+def _tick_labels(axis) -> tuple:
+    """The tick label strings `axis` will draw for its current limits."""
+    return tuple(axis.major.formatter.format_ticks(axis.get_majorticklocs()))
+
+
+class _DashboardTemplate(ABC):
+    """A reusable dashboard figure. Subclasses create the static parts in build()
+    and add data artists in draw(); the layout pass (tight_layout) reruns only when
+    the x or y tick labels of some axis change, since those set the margins."""
+
+    title = ""
+    grid = (1, 1)
+    figsize = (10, 6)
+
+    def __init__(self):
+        self.fig, self.axes = _pyplot().subplots(*self.grid, figsize=self.figsize)
+        self.fig.suptitle(self.title, fontsize=16, fontweight='bold', color='#a78bfa')
+        self._data_artists = []
+        self._layout_key = None
+        self.build()
+
+    @abstractmethod
+    def build(self) -> None:
+        """Create the static parts: titles, labels, threshold lines, legends."""
+
+    @abstractmethod
+    def draw(self, **data) -> None:
+        """Add this render's data artists (through _add) and rescale the axes."""
+
+    def render(self, **data):
+        for artist in self._data_artists:
+            artist.remove()
+        self._data_artists = []
+        self.draw(**data)
+        layout_key = tuple(
+            (_tick_labels(ax.xaxis), _tick_labels(ax.yaxis)) for ax in self.fig.axes
+        )
+        if layout_key != self._layout_key:
+            self.fig.tight_layout()
+            self._layout_key = layout_key
+        return self.fig
+
+    def _add(self, artist):
+        self._data_artists.append(artist)
+        return artist
+
+    @staticmethod
+    def _set_categories(ax, labels: list[str], rotation: int = 0) -> None:
+        """Label bar positions 0..n-1 and rescale to the new data."""
+        ax.set_xticks(range(len(labels)), labels, rotation=rotation)
+        ax.relim()
+        ax.autoscale_view()
+
+
+class _WorkOrderPerformanceTemplate(_DashboardTemplate):
+    title = "Work Order Performance Dashboard"
+    grid = (1, 3)
+    figsize = (16, 5)
+
+    def build(self) -> None:
+        from matplotlib.patches import Patch
+
+        oee_ax, scrap_ax, cycle_ax = self.axes
+        oee_ax.axhline(y=85, color='#22c55e', linestyle='--', alpha=0.5, label='Target 85%')
+        oee_ax.set_ylabel("OEE %")
+        oee_ax.set_title("Overall Equipment Effectiveness")
+        oee_ax.legend(fontsize=9)
+
+        scrap_ax.axhline(y=2.0, color='#22c55e', linestyle='--', alpha=0.5, label='Target ≤2%')
+        scrap_ax.set_ylabel("Scrap Rate %")
+        scrap_ax.set_title("Scrap Rate")
+        scrap_ax.legend(fontsize=9)
+
+        cycle_ax.set_ylabel("Minutes")
+        cycle_ax.set_title("Cycle Time vs Target")
+        cycle_ax.legend(handles=[Patch(facecolor='#6366f1', label='Actual'),
+                                 Patch(facecolor='#374151', alpha=0.7, label='Target')], fontsize=9)
+
+    def draw(self, ids, oee, scrap, cycle_actual, cycle_target) -> None:
+        oee_ax, scrap_ax, cycle_ax = self.axes
+        x_pos = range(len(ids))
+        self._add(oee_ax.bar(x_pos, oee, color=_band_colors(oee, 80, 65), edgecolor='none'))
+        self._add(scrap_ax.bar(x_pos, scrap, color=_band_colors(scrap, 2, 5, higher_is_better=False), edgecolor='none'))
+        self._add(cycle_ax.bar([p - 0.15 for p in x_pos], cycle_actual, 0.3, color='#6366f1'))
+        self._add(cycle_ax.bar([p + 0.15 for p in x_pos], cycle_target, 0.3, color='#374151', alpha=0.7))
+        for ax in self.axes:
+            self._set_categories(ax, ids, rotation=45)
+
+
+class _EquipmentUtilizationTemplate(_DashboardTemplate):
+    title = "Equipment Performance Overview"
+    grid = (1, 2)
+    figsize = (14, 5)
+
+    def build(self) -> None:
+        util_ax, oee_ax = self.axes
+        util_ax.set_ylabel("Utilization %")
+        util_ax.set_title("Current Utilization")
+        util_ax.set_ylim(0, 100)
+
+        oee_ax.axhline(y=85, color='#22c55e', linestyle='--', alpha=0.5, label='World-class 85%')
+        oee_ax.set_ylabel("Average OEE %")
+        oee_ax.set_title("7-Day Average OEE")
+        oee_ax.set_ylim(0, 100)
+        oee_ax.legend(fontsize=9)
+
+    def draw(self, names, utilization, avg_oee) -> None:
+        util_ax, oee_ax = self.axes
+        x_pos = range(len(names))
+        bars = self._add(util_ax.bar(x_pos, utilization, color=_band_colors(utilization, 70, 40), edgecolor='none'))
+        for bar, val in zip(bars, utilization):
+            self._add(util_ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'{val}%',
+                                   ha='center', fontsize=10, color='#e2e8f0'))
+        bars = self._add(oee_ax.bar(x_pos, avg_oee, color=_band_colors(avg_oee, 80, 60), edgecolor='none'))
+        for bar, val in zip(bars, avg_oee):
+            self._add(oee_ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'{val:.1f}%',
+                                  ha='center', fontsize=10, color='#e2e8f0'))
+        for ax in self.axes:
+            self._set_categories(ax, names)
+
+
+class _DefectAnalysisTemplate(_DashboardTemplate):
+    title = "Quality & Defect Analysis"
+    grid = (1, 3)
+    figsize = (16, 5)
+
+    def build(self) -> None:
+        defects_ax, quality_ax, scatter_ax = self.axes
+        defects_ax.set_ylabel("Defects Found")
+        defects_ax.set_title("Defects per Work Order")
+
+        quality_ax.axhline(y=99, color='#22c55e', linestyle='--', alpha=0.5, label='Target 99%')
+        quality_ax.set_ylabel("Quality %")
+        quality_ax.set_title("Quality Rate")
+        quality_ax.set_ylim(90, 101)
+        quality_ax.legend(fontsize=9)
+
+        scatter_ax.set_xlabel("Scrap Rate %")
+        scatter_ax.set_ylabel("Quality %")
+        scatter_ax.set_title("Scrap Rate vs Quality")
+
+    def draw(self, ids, defects, scrap, quality) -> None:
+        defects_ax, quality_ax, scatter_ax = self.axes
+        x_pos = range(len(ids))
+        self._add(defects_ax.bar(x_pos, defects, color=_band_colors(defects, 1, 3, higher_is_better=False), edgecolor='none'))
+        self._add(quality_ax.bar(x_pos, quality, color=_band_colors(quality, 98, 95), edgecolor='none'))
+        self._set_categories(defects_ax, ids, rotation=45)
+        self._set_categories(quality_ax, ids, rotation=45)
+
+        self._add(scatter_ax.scatter(scrap, quality, c=COLORS[:len(ids)], s=120, edgecolors='white', linewidth=1, zorder=5))
+        for i, wo_id in enumerate(ids):
+            self._add(scatter_ax.annotate(wo_id, (scrap[i], quality[i]), fontsize=8, color='#94a3b8',
+                                          textcoords="offset points", xytext=(5, 5)))
+        # Collections are not part of relim(), so the points are added to the data limits directly
+        scatter_ax.ignore_existing_data_limits = True
+        if ids:
+            scatter_ax.update_datalim(list(zip(scrap, quality)))
+        scatter_ax.autoscale_view()
+
+
+def _dashboard(kind: type) -> _DashboardTemplate:
+    """This thread's template of `kind` (a fresh, single-use one with CHART_TEMPLATES off)."""
+    if not CHART_TEMPLATES:
+        return kind()
+    template = getattr(_templates, kind.__name__, None)
+    if template is None:
+        template = kind()
+        _template_figures.add(template.fig)
+        setattr(_templates, kind.__name__, template)
+    return template
+
+
+def _store_chart(fig, chart_type: str, subject: str, summary: str, inputs: dict) -> str:
+    """Render the preview image into the chart store and return summary-only JSON for the LLM.
+    With CHART_THUMBNAIL_FIRST the stream carries a thumbnail and the requested size is
+    rendered on demand by render_chart(); SVG is vector, so it is always sent as requested.
+    """
+    fmt, size = render_options.get()
+    preview_size = size
+    if CHART_THUMBNAIL_FIRST and fmt != "svg" and size != "thumbnail":
+        preview_size = "thumbnail"
 
+    chart_id = str(uuid.uuid4())
+    chart_store[chart_id] = {
+        "image_base64": base64.b64encode(_fig_to_bytes(fig, fmt, preview_size)).decode('utf-8'),
+        "format": fmt,
+        "mime_type": CHART_FORMATS[fmt],
+        "size": preview_size,
+        "full_size": size if preview_size != size else None,
+    }
+    with _chart_sources_lock:
+        _chart_sources[chart_id] = (chart_type, subject, inputs)
+        while len(_chart_sources) > CHART_SOURCE_CACHE_SIZE:
+            _chart_sources.popitem(last=False)
 
-def _load_json(filename: str):
-    with open(os.path.join(DATA_DIR, filename), "r") as f:
-        return json.load(f)
+    return json.dumps({
+        "chart_generated": True,
+        "chart_id": chart_id,
+        "chart_type": chart_type,
+        "summary": summary,
+        "note": "The chart has been rendered and displayed to the user."
+    }, indent=2)
 
 
-def _store_chart(img_b64: str, chart_type: str, summary: str) -> str:
-    """Store chart image in module-level dict and return summary-only JSON for the LLM."""
+def _store_chart_spec(spec: dict, chart_type: str, summary: str) -> str:
+    """Store a client-side chart spec in the chart store and return summary-only JSON for the LLM."""
     chart_id = str(uuid.uuid4())
-    chart_store[chart_id] = img_b64
+    chart_store[chart_id] = {"spec": spec}
     return json.dumps({
         "chart_generated": True,
         "chart_id": chart_id,
@@ -65,6 +396,38 @@ def _store_chart(img_b64: str, chart_type: str, summary: str) -> str:
     }, indent=2)
 
 
+def store_rendered_chart(image: bytes, fmt: str, size: str) -> str:
+    """Put an already rendered image (e.g. a precomputed digest chart) in the chart store
+    so the SSE handler streams it, and return its chart_id. No source is registered:
+    rebuilding it from current data could show something other than the image sent."""
+    chart_id = str(uuid.uuid4())
+    chart_store[chart_id] = {
+        "image_base64": base64.b64encode(image).decode('utf-8'),
+        "format": fmt,
+        "mime_type": CHART_FORMATS[fmt],
+        "size": size,
+        "full_size": None,
+    }
+    return chart_id
+
+
+def render_figure(fig, fmt: str, size: str) -> bytes:
+    """Rasterize a figure (e.g. a digest chart) without storing it."""
+    return _fig_to_bytes(fig, fmt, size)
+
+
+def render_chart(chart_id: str, fmt: str, size: str) -> Optional[bytes]:
+    """Re-render a previously generated chart at another format/size from the records it
+    was first built from (None if unknown or evicted)."""
+    with _chart_sources_lock:
+        source = _chart_sources.get(chart_id)
+    if source is None:
+        return None
+    chart_type, subject, inputs = source
+    fig, _ = _build_chart(chart_type, subject, inputs)
+    return _fig_to_bytes(fig, fmt, size)
+
+
 @tool
 def generate_chart(chart_type: str, subject: str) -> str:
     """Generate a performance chart or comparison visualization.
@@ -79,25 +442,29 @@ def generate_chart(chart_type: str, subject: str) -> str:
 
     subject: Additional context (e.g., 'titanium vs stainless steel', 'CNC-001', 'all')
     """
+    builder = CHART_BUILDERS.get(chart_type)
+    if builder is None:
+        return json.dumps({"error": f"Unknown chart type: {chart_type}. Available: {', '.join(CHART_BUILDERS)}"})
     try:
-        if chart_type == "material_comparison":
-            return _material_comparison_chart(subject)
-        elif chart_type == "work_order_performance":
-            return _work_order_performance_chart(subject)
-        elif chart_type == "equipment_utilization":
-            return _equipment_utilization_chart(subject)
-        elif chart_type == "equipment_oee_trend":
-            return _equipment_oee_trend_chart(subject)
-        elif chart_type == "defect_analysis":
-            return _defect_analysis_chart(subject)
-        else:
-            return json.dumps({"error": f"Unknown chart type: {chart_type}. Available: material_comparison, work_order_performance, equipment_utilization, equipment_oee_trend, defect_analysis"})
+        check_cancelled("chart_renders")
+        if chart_mode.get() == "spec" and chart_type in SPEC_BUILDERS:
+            spec, summary = SPEC_BUILDERS[chart_type](subject)
+            return _store_chart_spec(spec, chart_type, summary)
+        inputs = {}
+        fig, summary = _build_chart(chart_type, subject, inputs)
+        # Building the figure is cheap next to rasterizing it; skip the render if the client left
+        if is_cancelled():
+            _close_figure(fig)
+            check_cancelled("chart_renders")
+        return _store_chart(fig, chart_type, subject, summary, inputs)
+    except RequestCancelled:
+        raise
     except Exception as e:
         return json.dumps({"error": f"Chart generation failed: {str(e)}"})
 
 
-def _material_comparison_chart(subject: str) -> str:
-    materials = _load_json("materials.json")
+def _material_comparison_chart(subject: str):
+    materials = _records("materials")
 
     subject_lower = subject.lower()
     if subject_lower not in ("all", ""):
@@ -108,6 +475,7 @@ def _material_comparison_chart(subject: str) -> str:
 
     short_names = [m["name"].split(" ")[0] for m in materials]
 
+    plt = _pyplot()
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     fig.suptitle("Material Properties Comparison", fontsize=16, fontweight='bold', color='#a78bfa')
 
@@ -140,13 +508,12 @@ def _material_comparison_chart(subject: str) -> str:
         axes[1, 1].text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2, f'{val}', va='center', fontsize=9, color='#94a3b8')
 
     fig.tight_layout()
-    img_b64 = _fig_to_base64(fig)
     summary = f"Generated material comparison chart for {len(materials)} materials showing tensile strength, hardness, cost, and machinability."
-    return _store_chart(img_b64, "material_comparison", summary)
+    return fig, summary
 
 
-def _work_order_performance_chart(subject: str) -> str:
-    work_orders = _load_json("work_orders.json")
+def _work_order_performance_chart(subject: str):
+    work_orders = _records("work_orders")
     active_wos = [wo for wo in work_orders if wo["performance_metrics"]["oee_pct"] is not None]
 
     ids = [wo["work_order_id"] for wo in active_wos]
@@ -155,82 +522,58 @@ def _work_order_performance_chart(subject: str) -> str:
     cycle_actual = [wo["performance_metrics"]["cycle_time_min"] for wo in active_wos]
     cycle_target = [wo["performance_metrics"]["target_cycle_time_min"] for wo in active_wos]
 
-    fig, axes = plt.subplots(1, 3, figsize=(16, 5))
-    fig.suptitle("Work Order Performance Dashboard", fontsize=16, fontweight='bold', color='#a78bfa')
-
-    bar_colors = ['#22c55e' if v >= 80 else '#f59e0b' if v >= 65 else '#ef4444' for v in oee]
-    axes[0].bar(ids, oee, color=bar_colors, edgecolor='none')
-    axes[0].axhline(y=85, color='#22c55e', linestyle='--', alpha=0.5, label='Target 85%')
-    axes[0].set_ylabel("OEE %")
-    axes[0].set_title("Overall Equipment Effectiveness")
-    axes[0].legend(fontsize=9)
-    axes[0].tick_params(axis='x', rotation=45)
-
-    bar_colors = ['#22c55e' if v <= 2 else '#f59e0b' if v <= 5 else '#ef4444' for v in scrap]
-    axes[1].bar(ids, scrap, color=bar_colors, edgecolor='none')
-    axes[1].axhline(y=2.0, color='#22c55e', linestyle='--', alpha=0.5, label='Target ≤2%')
-    axes[1].set_ylabel("Scrap Rate %")
-    axes[1].set_title("Scrap Rate")
-    axes[1].legend(fontsize=9)
-    axes[1].tick_params(axis='x', rotation=45)
-
-    x_pos = range(len(ids))
-    axes[2].bar([p - 0.15 for p in x_pos], cycle_actual, 0.3, label='Actual', color='#6366f1')
-    axes[2].bar([p + 0.15 for p in x_pos], cycle_target, 0.3, label='Target', color='#374151', alpha=0.7)
-    axes[2].set_xticks(list(x_pos))
-    axes[2].set_xticklabels(ids, rotation=45)
-    axes[2].set_ylabel("Minutes")
-    axes[2].set_title("Cycle Time vs Target")
-    axes[2].legend(fontsize=9)
-
-    fig.tight_layout()
-    img_b64 = _fig_to_base64(fig)
+    fig = _dashboard(_WorkOrderPerformanceTemplate).render(
+        ids=ids, oee=oee, scrap=scrap, cycle_actual=cycle_actual, cycle_target=cycle_target,
+    )
     summary = f"Generated work order performance dashboard showing OEE, scrap rate, and cycle time for {len(active_wos)} work orders."
-    return _store_chart(img_b64, "work_order_performance", summary)
+    return fig, summary
 
 
-def _equipment_utilization_chart(subject: str) -> str:
-    equipment = _load_json("equipment.json")
-
+def equipment_utilization_figure(equipment: list[dict]):
+    """Utilization and 7-day average OEE of the given machines, in the given order."""
     names = [e["machine_id"] for e in equipment]
     utilization = [e["utilization_pct"] for e in equipment]
     avg_oee = [sum(e["performance_history"]["daily_oee"]) / max(len(e["performance_history"]["daily_oee"]), 1) for e in equipment]
+    return _dashboard(_EquipmentUtilizationTemplate).render(names=names, utilization=utilization, avg_oee=avg_oee)
 
-    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-    fig.suptitle("Equipment Performance Overview", fontsize=16, fontweight='bold', color='#a78bfa')
-
-    bar_colors = ['#22c55e' if v >= 70 else '#f59e0b' if v >= 40 else '#ef4444' for v in utilization]
-    bars = axes[0].bar(names, utilization, color=bar_colors, edgecolor='none')
-    axes[0].set_ylabel("Utilization %")
-    axes[0].set_title("Current Utilization")
-    axes[0].set_ylim(0, 100)
-    for bar, val in zip(bars, utilization):
-        axes[0].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'{val}%', ha='center', fontsize=10, color='#e2e8f0')
-
-    bar_colors = ['#22c55e' if v >= 80 else '#f59e0b' if v >= 60 else '#ef4444' for v in avg_oee]
-    bars = axes[1].bar(names, avg_oee, color=bar_colors, edgecolor='none')
-    axes[1].axhline(y=85, color='#22c55e', linestyle='--', alpha=0.5, label='World-class 85%')
-    axes[1].set_ylabel("Average OEE %")
-    axes[1].set_title("7-Day Average OEE")
-    axes[1].set_ylim(0, 100)
-    axes[1].legend(fontsize=9)
-    for bar, val in zip(bars, avg_oee):
-        axes[1].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'{val:.1f}%', ha='center', fontsize=10, color='#e2e8f0')
 
-    fig.tight_layout()
-    img_b64 = _fig_to_base64(fig)
+def _equipment_utilization_chart(subject: str):
+    equipment = _records("equipment")
+    fig = equipment_utilization_figure(equipment)
     summary = f"Generated equipment utilization dashboard for {len(equipment)} machines."
-    return _store_chart(img_b64, "equipment_utilization", summary)
+    return fig, summary
 
 
-def _equipment_oee_trend_chart(subject: str) -> str:
-    equipment = _load_json("equipment.json")
-
-    machine = None
+def _find_machine(equipment: list[dict], subject: str) -> Optional[dict]:
     for e in equipment:
         if subject.upper() in e["machine_id"].upper() or subject.lower() in e["name"].lower():
-            machine = e
-            break
+            return e
+    return None
+
+
+def _live_sensors(machine_id: str) -> Optional[dict]:
+    from app.sensors import live_sensor_snapshot
+    return live_sensor_snapshot(machine_id)
+
+
+def _live_sensor_note(machine_id: str) -> str:
+    """One-line summary of the machine's live sensor window, if any samples were ingested."""
+    live = _live_sensors(machine_id)
+    if not live:
+        return ""
+    window = live["window"]
+    parts = [
+        f"{name} avg {stats['mean']} (σ {stats['std']})"
+        for name, stats in window["channels"].items() if stats["count"]
+    ]
+    return f" Live sensors over last {window['window_samples']} samples: " + ", ".join(parts) + "."
+
+
+def _equipment_oee_trend_chart(subject: str):
+    equipment = _records("equipment")
+    plt = _pyplot()
+
+    machine = _find_machine(equipment, subject)
 
     if not machine:
         fig, ax = plt.subplots(figsize=(12, 6))
@@ -244,9 +587,8 @@ def _equipment_oee_trend_chart(subject: str) -> str:
         ax.set_ylim(0, 100)
         ax.legend(fontsize=9)
         fig.tight_layout()
-        img_b64 = _fig_to_base64(fig)
         summary = f"Generated OEE trend chart for all {len(equipment)} machines."
-        return _store_chart(img_b64, "equipment_oee_trend", summary)
+        return fig, summary
 
     history = machine["performance_history"]
     fig, axes = plt.subplots(2, 1, figsize=(12, 8))
@@ -265,47 +607,176 @@ def _equipment_oee_trend_chart(subject: str) -> str:
     axes[1].set_title("Daily Downtime")
 
     fig.tight_layout()
-    img_b64 = _fig_to_base64(fig)
-    summary = f"Generated OEE trend and downtime chart for {machine['machine_id']}."
-    return _store_chart(img_b64, "equipment_oee_trend", summary)
+    summary = f"Generated OEE trend and downtime chart for {machine['machine_id']}." + _live_sensor_note(machine["machine_id"])
+    return fig, summary
 
 
-def _defect_analysis_chart(subject: str) -> str:
-    work_orders = _load_json("work_orders.json")
+def defect_analysis_figure(work_orders: list[dict]):
+    """Defects, quality rate and scrap vs quality of the given work orders that have started."""
     active_wos = [wo for wo in work_orders if wo["performance_metrics"]["oee_pct"] is not None]
-
     ids = [wo["work_order_id"] for wo in active_wos]
     defects = [wo["defects_found"] for wo in active_wos]
     scrap = [wo["performance_metrics"]["scrap_rate_pct"] for wo in active_wos]
     quality = [wo["performance_metrics"]["quality_pct"] for wo in active_wos]
+    return _dashboard(_DefectAnalysisTemplate).render(ids=ids, defects=defects, scrap=scrap, quality=quality)
+
+
+def _defect_analysis_chart(subject: str):
+    work_orders = _records("work_orders", with_logged_defects=True)
+    fig = defect_analysis_figure(work_orders)
+    active = sum(1 for wo in work_orders if wo["performance_metrics"]["oee_pct"] is not None)
+    summary = f"Generated defect analysis dashboard showing defects, quality rate, and scrap vs quality for {active} work orders."
+    return fig, summary
+
+
+def overdue_orders_figure(rows: list[dict]):
+    """Days overdue and progress of the overdue work orders in a shift digest."""
+    ids = [r["work_order_id"] for r in rows]
+    days = [r["days_overdue"] for r in rows]
+    progress = [r["progress_pct"] for r in rows]
+
+    fig, (days_ax, progress_ax) = _pyplot().subplots(1, 2, figsize=(14, 5))
+    fig.suptitle("Overdue Work Orders", fontsize=16, fontweight='bold', color='#a78bfa')
+    days_ax.bar(ids, days, color=_band_colors(days, 3, 7, higher_is_better=False), edgecolor='none')
+    days_ax.set_ylabel("Days overdue")
+    days_ax.set_title("Days Past Due Date")
+    progress_ax.bar(ids, progress, color=_band_colors(progress, 75, 40), edgecolor='none')
+    progress_ax.set_ylabel("Completed %")
+    progress_ax.set_title("Progress")
+    progress_ax.set_ylim(0, 100)
+    for ax in (days_ax, progress_ax):
+        ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    return fig
 
-    fig, axes = plt.subplots(1, 3, figsize=(16, 5))
-    fig.suptitle("Quality & Defect Analysis", fontsize=16, fontweight='bold', color='#a78bfa')
-
-    bar_colors = ['#22c55e' if v <= 1 else '#f59e0b' if v <= 3 else '#ef4444' for v in defects]
-    axes[0].bar(ids, defects, color=bar_colors, edgecolor='none')
-    axes[0].set_ylabel("Defects Found")
-    axes[0].set_title("Defects per Work Order")
-    axes[0].tick_params(axis='x', rotation=45)
-
-    bar_colors = ['#22c55e' if v >= 98 else '#f59e0b' if v >= 95 else '#ef4444' for v in quality]
-    axes[1].bar(ids, quality, color=bar_colors, edgecolor='none')
-    axes[1].axhline(y=99, color='#22c55e', linestyle='--', alpha=0.5, label='Target 99%')
-    axes[1].set_ylabel("Quality %")
-    axes[1].set_title("Quality Rate")
-    axes[1].set_ylim(90, 101)
-    axes[1].legend(fontsize=9)
-    axes[1].tick_params(axis='x', rotation=45)
-
-    axes[2].scatter(scrap, quality, c=COLORS[:len(active_wos)], s=120, edgecolors='white', linewidth=1, zorder=5)
-    for i, wo_id in enumerate(ids):
-        axes[2].annotate(wo_id, (scrap[i], quality[i]), fontsize=8, color='#94a3b8',
-                         textcoords="offset points", xytext=(5, 5))
-    axes[2].set_xlabel("Scrap Rate %")
-    axes[2].set_ylabel("Quality %")
-    axes[2].set_title("Scrap Rate vs Quality")
 
-    fig.tight_layout()
-    img_b64 = _fig_to_base64(fig)
-    summary = f"Generated defect analysis dashboard showing defects, quality rate, and scrap vs quality for {len(active_wos)} work orders."
-    return _store_chart(img_b64, "defect_analysis", summary)
+# ---- Client-side chart specs ----
+# Same data, thresholds and palette as the matplotlib dashboards above, emitted as
+# plain series so the frontend can draw (and zoom) them without a server render.
+
+def _threshold(value: float, label: str, color: str = '#22c55e') -> dict:
+    return {"value": value, "label": label, "color": color}
+
+
+def _work_order_performance_spec(subject: str):
+    work_orders = load_records("work_orders")
+    active_wos = [wo for wo in work_orders if wo["performance_metrics"]["oee_pct"] is not None]
+
+    ids = [wo["work_order_id"] for wo in active_wos]
+    oee = [wo["performance_metrics"]["oee_pct"] for wo in active_wos]
+    scrap = [wo["performance_metrics"]["scrap_rate_pct"] for wo in active_wos]
+    cycle_actual = [wo["performance_metrics"]["cycle_time_min"] for wo in active_wos]
+    cycle_target = [wo["performance_metrics"]["target_cycle_time_min"] for wo in active_wos]
+
+    spec = {
+        "title": "Work Order Performance Dashboard",
+        "panels": [
+            {
+                "title": "Overall Equipment Effectiveness", "kind": "bar", "x": ids, "y_label": "OEE %",
+                "series": [{"name": "OEE", "values": oee, "colors": _band_colors(oee, 80, 65)}],
+                "thresholds": [_threshold(85, "Target 85%")],
+            },
+            {
+                "title": "Scrap Rate", "kind": "bar", "x": ids, "y_label": "Scrap Rate %",
+                "series": [{"name": "Scrap", "values": scrap, "colors": _band_colors(scrap, 2, 5, higher_is_better=False)}],
+                "thresholds": [_threshold(2.0, "Target ≤2%")],
+            },
+            {
+                "title": "Cycle Time vs Target", "kind": "bar", "x": ids, "y_label": "Minutes",
+                "series": [
+                    {"name": "Actual", "values": cycle_actual, "color": '#6366f1'},
+                    {"name": "Target", "values": cycle_target, "color": '#374151'},
+                ],
+                "thresholds": [],
+            },
+        ],
+    }
+    summary = f"Generated work order performance dashboard showing OEE, scrap rate, and cycle time for {len(active_wos)} work orders."
+    return spec, summary
+
+
+def _equipment_utilization_spec(subject: str):
+    equipment = load_records("equipment")
+
+    names = [e["machine_id"] for e in equipment]
+    utilization = [e["utilization_pct"] for e in equipment]
+    avg_oee = [round(sum(e["performance_history"]["daily_oee"]) / max(len(e["performance_history"]["daily_oee"]), 1), 1) for e in equipment]
+
+    spec = {
+        "title": "Equipment Performance Overview",
+        "panels": [
+            {
+                "title": "Current Utilization", "kind": "bar", "x": names, "y_label": "Utilization %", "y_range": [0, 100],
+                "series": [{"name": "Utilization", "values": utilization, "colors": _band_colors(utilization, 70, 40)}],
+                "thresholds": [],
+            },
+            {
+                "title": "7-Day Average OEE", "kind": "bar", "x": names, "y_label": "Average OEE %", "y_range": [0, 100],
+                "series": [{"name": "Average OEE", "values": avg_oee, "colors": _band_colors(avg_oee, 80, 60)}],
+                "thresholds": [_threshold(85, "World-class 85%")],
+            },
+        ],
+    }
+    summary = f"Generated equipment utilization dashboard for {len(equipment)} machines."
+    return spec, summary
+
+
+def _equipment_oee_trend_spec(subject: str):
+    equipment = load_records("equipment")
+    machine = _find_machine(equipment, subject)
+
+    if not machine:
+        spec = {
+            "title": "Daily OEE Trend — All Machines",
+            "panels": [{
+                "title": "Daily OEE", "kind": "line", "x": equipment[0]["performance_history"]["labels"] if equipment else [],
+                "y_label": "OEE %", "y_range": [0, 100],
+                "series": [
+                    {"name": e["machine_id"], "values": e["performance_history"]["daily_oee"], "color": COLORS[i % len(COLORS)]}
+                    for i, e in enumerate(equipment)
+                ],
+                "thresholds": [_threshold(85, "Target 85%")],
+            }],
+        }
+        summary = f"Generated OEE trend chart for all {len(equipment)} machines."
+        return spec, summary
+
+    history = machine["performance_history"]
+    spec = {
+        "title": f"{machine['machine_id']} — {machine['name']} Performance Trend",
+        "panels": [
+            {
+                "title": "Daily OEE", "kind": "line", "x": history["labels"], "y_label": "OEE %", "y_range": [0, 100],
+                "series": [{"name": "OEE", "values": history["daily_oee"], "color": '#6366f1', "fill": True}],
+                "thresholds": [_threshold(85, "Target 85%")],
+            },
+            {
+                "title": "Daily Downtime", "kind": "bar", "x": history["labels"], "y_label": "Downtime (hours)",
+                "series": [{"name": "Downtime", "values": history["weekly_downtime_hours"], "color": '#ef4444'}],
+                "thresholds": [],
+            },
+        ],
+    }
+    live = _live_sensors(machine["machine_id"])
+    if live:
+        spec["live_sensors"] = live
+    summary = f"Generated OEE trend and downtime chart for {machine['machine_id']}." + _live_sensor_note(machine["machine_id"])
+    return spec, summary
+
+
+# chart_type → builder returning (spec, summary), for chart types that support client-side rendering
+SPEC_BUILDERS = {
+    "work_order_performance": _work_order_performance_spec,
+    "equipment_utilization": _equipment_utilization_spec,
+    "equipment_oee_trend": _equipment_oee_trend_spec,
+}
+
+
+# chart_type → builder returning (figure, summary)
+CHART_BUILDERS = {
+    "material_comparison": _material_comparison_chart,
+    "work_order_performance": _work_order_performance_chart,
+    "equipment_utilization": _equipment_utilization_chart,
+    "equipment_oee_trend": _equipment_oee_trend_chart,
+    "defect_analysis": _defect_analysis_chart,
+}
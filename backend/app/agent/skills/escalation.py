@@ -4,8 +4,14 @@ from datetime import datetime
 from langchain_core.tools import tool
 
 
+def _sensor_alerts(machine_id: str) -> list[dict]:
+    from app.anomaly import get_anomaly_detector
+    return get_anomaly_detector().alerts(machine_id)
+
+
 @tool
-def escalate_to_engineer(reason: str, priority: str = "medium", department: str = "Manufacturing Engineering") -> str:
+def escalate_to_engineer(reason: str, priority: str = "medium", department: str = "Manufacturing Engineering",
+                         machine_id: str = "") -> str:
     """Escalate an issue to a specialist engineer or supervisor.
     Use this tool when:
     - The issue requires engineering expertise (tooling, process, design)
@@ -14,7 +20,14 @@ def escalate_to_engineer(reason: str, priority: str = "medium", department: str
     - The operator or user requests specialized support
     Provide a clear reason, priority level (low/medium/high/critical),
     and target department (Manufacturing Engineering, Quality Engineering, Maintenance, Production Management).
+    If the issue concerns a specific machine, pass its machine_id (e.g., 'CNC-002') so active
+    sensor drift alerts are attached to the ticket.
     """
+    alerts = _sensor_alerts(machine_id) if machine_id.strip() else []
+    # A critical sensor alert means the ticket is at least high priority
+    if any(a["severity"] == "critical" for a in alerts) and priority.lower() in ("low", "medium"):
+        priority = "high"
+
     ticket_number = f"ESC-{random.randint(10000, 99999)}"
 
     response_times = {
@@ -32,6 +45,8 @@ def escalate_to_engineer(reason: str, priority: str = "medium", department: str
         "department": department,
         "priority": priority,
         "reason": reason,
+        "machine_id": machine_id.upper() or None,
+        "sensor_alerts": alerts,
         "estimated_response_time": estimated_response,
         "created_at": datetime.now().isoformat(),
         "summary": (
@@ -39,6 +54,7 @@ def escalate_to_engineer(reason: str, priority: str = "medium", department: str
             f"Department: {department}. Priority: {priority.upper()}. "
             f"Estimated response: {estimated_response}. "
             f"Reason: {reason}. "
-            f"An engineer will be dispatched to assist."
+            + (f"{len(alerts)} active sensor alert(s) on {machine_id.upper()} attached. " if alerts else "")
+            + "An engineer will be dispatched to assist."
         )
     }, indent=2)
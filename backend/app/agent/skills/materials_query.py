@@ -0,0 +1,211 @@
+import json
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Optional
+from langchain_core.tools import tool
+
+from app.storage import dataset_version, load_records
+
+# Short names accepted in filters and rank_by
+PROPERTY_ALIASES = {
+    "tensile": "tensile_strength_mpa",
+    "yield": "yield_strength_mpa",
+    "hardness": "hardness_hrc",
+    "density": "density_g_cm3",
+    "melting_point": "melting_point_c",
+    "thermal_conductivity": "thermal_conductivity_w_mk",
+    "cost": "cost_per_kg_usd",
+    "machinability": "machinability_rating",
+}
+
+DEFAULT_TOP_K = 10
+
+_RANGE_RE = re.compile(r"^\s*([a-z0-9_]+)\s*(>=|<=|=|>|<|~)\s*\$?(.*?)\s*$", re.IGNORECASE)
+_RANK_RE = re.compile(r"^\s*(-?)([a-z0-9_]+)\s*(?:\*\s*([0-9.]+))?\s*$", re.IGNORECASE)
+
+
+class MaterialIndex:
+    """Materials with one sorted (value, position) list per numeric property.
+
+    Range filters bisect the property's list; materials missing a property are
+    left out of its index, so they never match a filter on it.
+    """
+
+    def __init__(self, materials: list[dict]):
+        self.materials = materials
+        self.sorted: dict[str, list[tuple[float, int]]] = {}
+        for pos, m in enumerate(materials):
+            for prop, value in m["properties"].items():
+                if isinstance(value, (int, float)):
+                    self.sorted.setdefault(prop, []).append((float(value), pos))
+        for entries in self.sorted.values():
+            entries.sort()
+        self._keys = {prop: [v for v, _ in entries] for prop, entries in self.sorted.items()}
+
+    def range(self, prop: str, op: str, value: float) -> set[int]:
+        """Positions of materials whose `prop` satisfies `op value`."""
+        keys, entries = self._keys[prop], self.sorted[prop]
+        if op == ">=":
+            lo, hi = bisect_left(keys, value), len(keys)
+        elif op == ">":
+            lo, hi = bisect_right(keys, value), len(keys)
+        elif op == "<=":
+            lo, hi = 0, bisect_right(keys, value)
+        elif op == "<":
+            lo, hi = 0, bisect_left(keys, value)
+        else:
+            lo, hi = bisect_left(keys, value), bisect_right(keys, value)
+        return {pos for _, pos in entries[lo:hi]}
+
+    def ordered(self, prop: str, descending: bool) -> list[int]:
+        """Positions of materials that have `prop`, best first."""
+        entries = self.sorted[prop]
+        return [pos for _, pos in (reversed(entries) if descending else entries)]
+
+
+_index: Optional[MaterialIndex] = None
+_index_version: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def get_material_index() -> MaterialIndex:
+    """The index for the current materials data, rebuilt when the data file changes."""
+    global _index, _index_version
+    version = dataset_version("materials")
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = MaterialIndex(load_records("materials"))
+            _index_version = version
+        return _index
+
+
+def _property(name: str, index: MaterialIndex) -> str:
+    prop = PROPERTY_ALIASES.get(name.lower(), name.lower())
+    if prop not in index.sorted:
+        raise ValueError(
+            f"Unknown property '{name}'. Available: {', '.join(sorted(index.sorted))} "
+            f"(or {', '.join(PROPERTY_ALIASES)})"
+        )
+    return prop
+
+
+def _filter(index: MaterialIndex, filters: str) -> tuple[set[int], list[str]]:
+    """Positions matching every comma-separated condition, and the properties filtered on."""
+    matched = set(range(len(index.materials)))
+    props = []
+    for part in filters.split(","):
+        if not part.strip():
+            continue
+        match = _RANGE_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid filter '{part.strip()}'. Use property>=number, property<number, or name~text.")
+        field, op, value = match.group(1).lower(), match.group(2), match.group(3)
+        if op == "~" or field in ("name", "category"):
+            if field not in ("name", "category"):
+                raise ValueError(f"Text filters apply to name or category, not '{field}'.")
+            matched &= {pos for pos, m in enumerate(index.materials) if value.lower() in m[field].lower()}
+            continue
+        prop = _property(field, index)
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"Filter on {prop} needs a number, got '{value}'.")
+        matched &= index.range(prop, op, number)
+        props.append(prop)
+    return matched, props
+
+
+def _rank(index: MaterialIndex, candidates: set[int], rank_by: str) -> tuple[list[int], list[str], dict[int, float]]:
+    """Order candidates by one property, or by a weighted score over several.
+
+    Each criterion is `property` (higher is better), `-property` (lower is better)
+    and an optional `*weight`. With several criteria, each property is min-max
+    scaled over the candidates to 0..1 (1 = best) and the weighted sum is the
+    score; a material missing a property scores 0 on it.
+    """
+    criteria = []
+    for part in rank_by.split(","):
+        if not part.strip():
+            continue
+        match = _RANK_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid rank_by '{part.strip()}'. Use property, -property, or property*weight.")
+        criteria.append((_property(match.group(2), index), match.group(1) != "-", float(match.group(3) or 1)))
+    if not criteria:
+        return sorted(candidates), [], {}
+
+    if len(criteria) == 1:
+        prop, descending, _ = criteria[0]
+        ordered = [pos for pos in index.ordered(prop, descending) if pos in candidates]
+        # Materials without the property go last
+        ordered += sorted(candidates.difference(ordered))
+        return ordered, [prop], {}
+
+    scores = dict.fromkeys(candidates, 0.0)
+    total_weight = sum(w for _, _, w in criteria) or 1.0
+    for prop, higher_is_better, weight in criteria:
+        values = {pos: v for v, pos in index.sorted[prop] if pos in candidates}
+        if not values:
+            continue
+        lo, hi = min(values.values()), max(values.values())
+        for pos, v in values.items():
+            scaled = 1.0 if hi == lo else (v - lo) / (hi - lo)
+            scores[pos] += weight / total_weight * (scaled if higher_is_better else 1 - scaled)
+    ordered = sorted(candidates, key=lambda pos: (-scores[pos], pos))
+    return ordered, [prop for prop, _, _ in criteria], {pos: round(s, 3) for pos, s in scores.items()}
+
+
+@tool
+def materials_query(filters: str = "", rank_by: str = "", top_k: int = DEFAULT_TOP_K, fields: str = "") -> str:
+    """Find and rank materials by their properties and return a compact table (no chart).
+    Use this tool for questions like "which materials exceed 900 MPa tensile and cost
+    under $20/kg?" or "best machinable material harder than 30 HRC".
+
+    filters: comma-separated conditions, e.g. 'tensile>=900,cost<20' or 'category~steel'.
+        Properties: tensile_strength_mpa (tensile), yield_strength_mpa (yield),
+        hardness_hrc (hardness), density_g_cm3 (density), cost_per_kg_usd (cost),
+        machinability_rating (machinability), melting_point_c, thermal_conductivity_w_mk
+    rank_by: property to sort by, highest first; prefix '-' for lowest first (e.g. '-cost').
+        Several comma-separated properties rank by a weighted score, e.g. 'tensile*2,-cost,machinability'
+    top_k: number of materials to return (default 10)
+    fields: optional extra comma-separated properties to include as columns
+    """
+    index = get_material_index()
+    try:
+        candidates, filter_props = _filter(index, filters)
+        ordered, rank_props, scores = _rank(index, candidates, rank_by)
+        extra = [_property(f.strip(), index) for f in fields.split(",") if f.strip()]
+    except ValueError as e:
+        return json.dumps({"found": False, "error": str(e)})
+
+    top_k = max(1, top_k) if top_k else DEFAULT_TOP_K
+    page = ordered[:top_k]
+    props = list(dict.fromkeys(rank_props + filter_props + extra)) or [
+        "tensile_strength_mpa", "hardness_hrc", "cost_per_kg_usd", "machinability_rating",
+    ]
+    columns = ["material_id", "name", "category", *props] + (["score"] if scores else [])
+    rows = []
+    for pos in page:
+        m = index.materials[pos]
+        row = [m["material_id"], m["name"], m["category"], *(m["properties"].get(p) for p in props)]
+        rows.append(row + [scores[pos]] if scores else row)
+
+    if page:
+        leader = index.materials[page[0]]["name"]
+        summary = (
+            f"{len(candidates)} of {len(index.materials)} material(s) match"
+            + (f" '{filters}'" if filters else "")
+            + (f"; ranked by {rank_by}, top: {leader}" if rank_by else "")
+            + f". Showing {len(rows)}."
+        )
+    else:
+        summary = f"No materials match '{filters}'."
+    return json.dumps({
+        "found": bool(rows),
+        "matched": len(candidates),
+        "total_materials": len(index.materials),
+        "columns": columns,
+        "rows": rows,
+        "summary": summary,
+    })
@@ -1,91 +1,109 @@
 import json
-import os
 from langchain_core.tools import tool
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+from app.ncr_journal import apply_logged_defects
+from app.storage import find_records, get_record, load_records
+from app.agent.skills.pagination import (
+    DEFAULT_PAGE_SIZE, paginate, page_summary, parse_fields, scope_hash, sort_records,
+)
+
+PRIORITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+SORT_KEYS = {
+    "due_date": lambda r: r.get("due_date"),
+    "priority": lambda r: PRIORITY_RANK.get(r.get("priority"), len(PRIORITY_RANK)),
+    "progress": lambda r: r.get("progress_pct"),
+    "work_order_id": lambda r: r.get("work_order_id"),
+}
 
 
 def _load_work_orders() -> list[dict]:
-    with open(os.path.join(DATA_DIR, "work_orders.json"), "r") as f:
-        return json.load(f)
+    return apply_logged_defects(load_records("work_orders"))
+
+
+def _progress_pct(wo: dict) -> float:
+    progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
+    return round(progress, 1)
+
+
+def _list_result(matches: list[dict], default_fields: list[str], fields: str,
+                 sort_by: str, limit: int, cursor: str, description: str) -> str:
+    """Sort, page, and project a list of matching work orders."""
+    rows = [{**wo, "progress_pct": _progress_pct(wo)} for wo in matches]
+    try:
+        selected = parse_fields(fields, set(rows[0])) or default_fields
+        rows = sort_records(rows, sort_by, SORT_KEYS)
+        scope = scope_hash("work_orders", description.lower(), sort_by.strip().lower())
+        page, meta = paginate(rows, limit, cursor, scope)
+    except ValueError as e:
+        return json.dumps({"found": False, "error": str(e)})
+    return json.dumps({
+        "found": True,
+        **meta,
+        "work_orders": [{f: wo.get(f) for f in selected} for wo in page],
+        "summary": f"Found {meta['total']} work order(s) {description}. {page_summary(meta)}"
+    }, indent=2)
 
 
 @tool
-def work_order_lookup(query: str) -> str:
+def work_order_lookup(query: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = "",
+                      sort_by: str = "", fields: str = "") -> str:
     """Look up work order information by work order ID, product name, customer, or status.
     Use this tool when someone asks about production status, work order details,
     due dates, or progress on manufacturing jobs.
     The query can be a work order ID (e.g., 'WO-2001'), product name, customer name,
     or a status filter (e.g., 'in_progress', 'on_hold', 'completed').
+    List results are paged: 'total' is the number of matches and 'next_cursor'
+    can be passed as cursor to fetch the next page (only request more if needed).
+    limit: max results per page (default 20, max 100)
+    sort_by: 'due_date', 'priority', 'progress', or 'work_order_id'; prefix '-' for descending
+    fields: optional comma-separated fields to return, e.g. 'work_order_id,due_date,performance_metrics'
     """
-    work_orders = _load_work_orders()
     query_lower = query.lower().strip()
 
     # Search by work order ID
-    for wo in work_orders:
-        if wo["work_order_id"].lower() == query_lower:
-            progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
-            return json.dumps({
-                "found": True,
-                "work_order": wo,
-                "progress_pct": round(progress, 1),
-                "summary": (
-                    f"Work Order {wo['work_order_id']}: {wo['product_name']} for {wo['customer']}. "
-                    f"Status: {wo['status'].upper()}. Priority: {wo['priority']}. "
-                    f"Progress: {wo['completed_quantity']}/{wo['quantity']} ({progress:.0f}%). "
-                    f"Machine: {wo['machine_assigned']}. Operator: {wo['operator']}. "
-                    f"Material: {wo['material']}. "
-                    + (f"Due: {wo['due_date']}. " if wo['due_date'] else "")
-                    + (f"Defects: {wo['defects_found']}. " if wo['defects_found'] > 0 else "No defects. ")
-                    + (f"Notes: {wo['notes']}" if wo['notes'] else "")
-                )
-            }, indent=2)
-
-    # Search by status
-    status_matches = [wo for wo in work_orders if query_lower == wo["status"].lower()]
-    if status_matches:
-        results = []
-        for wo in status_matches:
-            progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
-            results.append({
-                "work_order_id": wo["work_order_id"],
-                "product_name": wo["product_name"],
-                "customer": wo["customer"],
-                "priority": wo["priority"],
-                "progress_pct": round(progress, 1),
-                "due_date": wo["due_date"]
-            })
+    wo = get_record("work_orders", query_lower)
+    if wo is not None:
+        apply_logged_defects([wo])
+        progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
         return json.dumps({
             "found": True,
-            "count": len(results),
-            "work_orders": results,
-            "summary": f"Found {len(results)} work order(s) with status '{query}'."
+            "work_order": wo,
+            "progress_pct": round(progress, 1),
+            "summary": (
+                f"Work Order {wo['work_order_id']}: {wo['product_name']} for {wo['customer']}. "
+                f"Status: {wo['status'].upper()}. Priority: {wo['priority']}. "
+                f"Progress: {wo['completed_quantity']}/{wo['quantity']} ({progress:.0f}%). "
+                f"Machine: {wo['machine_assigned']}. Operator: {wo['operator']}. "
+                f"Material: {wo['material']}. "
+                + (f"Due: {wo['due_date']}. " if wo['due_date'] else "")
+                + (f"Defects: {wo['defects_found']}. " if wo['defects_found'] > 0 else "No defects. ")
+                + (f"Notes: {wo['notes']}" if wo['notes'] else "")
+            )
         }, indent=2)
 
+    # Search by status
+    status_matches = apply_logged_defects(find_records("work_orders", "status", query_lower))
+    if status_matches:
+        return _list_result(
+            status_matches,
+            ["work_order_id", "product_name", "customer", "priority", "progress_pct", "due_date"],
+            fields, sort_by, limit, cursor, f"with status '{query}'",
+        )
+
     # Search by customer or product name
+    work_orders = _load_work_orders()
     text_matches = [
         wo for wo in work_orders
         if query_lower in wo["customer"].lower()
         or query_lower in wo["product_name"].lower()
     ]
     if text_matches:
-        results = []
-        for wo in text_matches:
-            progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
-            results.append({
-                "work_order_id": wo["work_order_id"],
-                "product_name": wo["product_name"],
-                "customer": wo["customer"],
-                "status": wo["status"],
-                "priority": wo["priority"],
-                "progress_pct": round(progress, 1)
-            })
-        return json.dumps({
-            "found": True,
-            "count": len(results),
-            "work_orders": results,
-            "summary": f"Found {len(results)} work order(s) matching '{query}'."
-        }, indent=2)
+        return _list_result(
+            text_matches,
+            ["work_order_id", "product_name", "customer", "status", "priority", "progress_pct"],
+            fields, sort_by, limit, cursor, f"matching '{query}'",
+        )
 
     return json.dumps({
         "found": False,
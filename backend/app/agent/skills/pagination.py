@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def scope_hash(*parts: str) -> str:
+    """Short fingerprint of the query and sort a cursor was issued for."""
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:16]
+
+
+def encode_cursor(offset: int, scope: str) -> str:
+    """Encode a result offset, bound to a query/sort fingerprint, as an opaque cursor token."""
+    payload = {"offset": offset, "scope": scope}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, scope: str) -> int:
+    """Decode a cursor token back to a result offset (empty cursor = first page).
+    A cursor issued for a different query or sort is rejected: its offset would
+    point into another result list."""
+    if not cursor or not cursor.strip():
+        return 0
+    token = cursor.strip()
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        offset = int(payload["offset"])
+        cursor_scope = payload["scope"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'. Use the next_cursor value from a previous result.")
+    if offset < 0:
+        raise ValueError(f"Invalid cursor '{cursor}'. Use the next_cursor value from a previous result.")
+    if cursor_scope != scope:
+        raise ValueError(
+            f"Cursor '{cursor}' was issued for a different query or sort. "
+            "Repeat the original query and sort_by with it, or omit the cursor to start over."
+        )
+    return offset
+
+
+def parse_fields(fields: str, available: set[str]) -> list[str]:
+    """Parse a comma-separated field projection, rejecting unknown fields."""
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(sorted(available))}")
+    return selected
+
+
+def sort_records(records: list[dict], sort_by: str, sort_keys: dict) -> list[dict]:
+    """Sort records by a named key; a leading '-' reverses the order.
+    Records whose key is None always sort last.
+    """
+    if not sort_by or not sort_by.strip():
+        return records
+    name = sort_by.strip().lower()
+    descending = name.startswith("-")
+    name = name.lstrip("-")
+    key_fn = sort_keys.get(name)
+    if key_fn is None:
+        raise ValueError(f"Unknown sort '{sort_by}'. Available: {', '.join(sort_keys)} (prefix with '-' for descending)")
+    present = [r for r in records if key_fn(r) is not None]
+    missing = [r for r in records if key_fn(r) is None]
+    return sorted(present, key=key_fn, reverse=descending) + missing
+
+
+def paginate(records: list[dict], limit: int, cursor: str, scope: str) -> tuple[list[dict], dict]:
+    """Slice one page of records and return it with paging metadata for the LLM.
+    `scope` (see scope_hash) identifies the query and sort the cursor belongs to."""
+    offset = decode_cursor(cursor, scope)
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    page = records[offset:offset + limit]
+    end = offset + len(page)
+    has_more = end < len(records)
+    return page, {
+        "total": len(records),
+        "count": len(page),
+        "offset": offset,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(end, scope) if has_more else None,
+    }
+
+
+def page_summary(meta: dict) -> str:
+    """Describe which slice of the results is being shown."""
+    if not meta["count"]:
+        return "No results on this page."
+    text = f"Showing {meta['offset'] + 1}-{meta['offset'] + meta['count']} of {meta['total']}."
+    if meta["has_more"]:
+        text += f" Pass cursor='{meta['next_cursor']}' for more."
+    return text
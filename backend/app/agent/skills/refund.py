@@ -1,20 +1,13 @@
 import json
-import os
-import random
 from datetime import datetime
 from langchain_core.tools import tool
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-
-
-def _load_work_orders() -> list[dict]:
-    with open(os.path.join(DATA_DIR, "work_orders.json"), "r") as f:
-        return json.load(f)
+from app.ncr_journal import get_ncr_journal
+from app.storage import get_record, load_records
 
 
 def _load_policies() -> dict:
-    with open(os.path.join(DATA_DIR, "manufacturing_policies.json"), "r") as f:
-        return json.load(f)
+    return load_records("manufacturing_policies")
 
 
 @tool
@@ -25,16 +18,11 @@ def defect_report(work_order_id: str, defect_description: str, severity: str = "
     Provide the work order ID (e.g., 'WO-2001'), a description of the defect,
     and the severity level: 'critical', 'major', or 'minor'.
     """
-    work_orders = _load_work_orders()
     policies = _load_policies()
     quality_policy = policies["quality_policy"]
 
     # Find the work order
-    wo = None
-    for w in work_orders:
-        if w["work_order_id"].upper() == work_order_id.upper():
-            wo = w
-            break
+    wo = get_record("work_orders", work_order_id.strip())
 
     if not wo:
         return json.dumps({
@@ -48,7 +36,6 @@ def defect_report(work_order_id: str, defect_description: str, severity: str = "
             "reason": f"Work order {work_order_id} has been cancelled. Cannot log defects against cancelled orders."
         })
 
-    ncr_number = f"NCR-{random.randint(10000, 99999)}"
     severity_lower = severity.lower()
     defect_class = quality_policy["defect_classes"].get(severity_lower, quality_policy["defect_classes"]["major"])
 
@@ -60,8 +47,25 @@ def defect_report(work_order_id: str, defect_description: str, severity: str = "
     }
     action = actions.get(severity_lower, actions["major"])
 
+    # Persist the NCR; the journal assigns the number and counts reports per work order
+    try:
+        entry = get_ncr_journal().append({
+            "work_order_id": wo["work_order_id"],
+            "severity": severity_lower,
+            "defect_description": defect_description,
+            "machine": wo["machine_assigned"],
+            "operator": wo["operator"],
+            "created_at": datetime.now().isoformat(),
+        })
+    except OSError as e:
+        return json.dumps({
+            "logged": False,
+            "reason": f"Defect report could not be saved ({e}). Please retry or record it manually."
+        })
+    ncr_number = entry["ncr_number"]
+
     # Check if corrective action threshold is reached
-    total_defects = wo["defects_found"] + 1
+    total_defects = wo["defects_found"] + entry["defects_logged_on_wo"]
     threshold_reached = total_defects >= 3
 
     return json.dumps({
@@ -77,7 +81,7 @@ def defect_report(work_order_id: str, defect_description: str, severity: str = "
         "action_required": action,
         "total_defects_on_wo": total_defects,
         "corrective_action_triggered": threshold_reached,
-        "created_at": datetime.now().isoformat(),
+        "created_at": entry["created_at"],
         "summary": (
             f"Defect report {ncr_number} logged against {work_order_id}. "
             f"Severity: {severity_lower.upper()}. {action} "
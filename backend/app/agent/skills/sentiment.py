@@ -1,88 +1,119 @@
 import json
-import os
 from langchain_core.tools import tool
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+from app.storage import find_records, get_record, load_records
+from app.agent.skills.pagination import (
+    DEFAULT_PAGE_SIZE, paginate, page_summary, parse_fields, scope_hash, sort_records,
+)
 
 
-def _load_equipment() -> list[dict]:
-    with open(os.path.join(DATA_DIR, "equipment.json"), "r") as f:
-        return json.load(f)
+def _live_sensors(machine_id: str):
+    # Imported lazily so numpy is only loaded once live data is actually queried
+    from app.sensors import live_sensor_snapshot
+    return live_sensor_snapshot(machine_id)
+
+
+def _sensor_alerts(machine_id: str) -> list[dict]:
+    from app.anomaly import get_anomaly_detector
+    return get_anomaly_detector().alerts(machine_id)
+
+
+SORT_KEYS = {
+    "utilization": lambda m: m.get("utilization_pct"),
+    "next_maintenance": lambda m: m.get("next_maintenance"),
+    "hours_run": lambda m: m.get("hours_run"),
+    "machine_id": lambda m: m.get("machine_id"),
+}
+
+
+def _list_result(matches: list[dict], default_fields: list[str], fields: str,
+                 sort_by: str, limit: int, cursor: str, description: str) -> str:
+    """Sort, page, and project a list of matching machines."""
+    try:
+        selected = parse_fields(fields, set(matches[0])) or default_fields
+        rows = sort_records(matches, sort_by, SORT_KEYS)
+        scope = scope_hash("equipment", description.lower(), sort_by.strip().lower())
+        page, meta = paginate(rows, limit, cursor, scope)
+    except ValueError as e:
+        return json.dumps({"found": False, "error": str(e)})
+    return json.dumps({
+        "found": True,
+        **meta,
+        "machines": [{f: m.get(f) for f in selected} for m in page],
+        "summary": f"Found {meta['total']} machine(s) {description}. {page_summary(meta)}"
+    }, indent=2)
 
 
 @tool
-def equipment_status(query: str) -> str:
+def equipment_status(query: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = "",
+                     sort_by: str = "", fields: str = "") -> str:
     """Check the status, health, and sensor readings of manufacturing equipment.
     Use this tool when someone asks about machine status, sensor data,
     maintenance schedules, or equipment availability.
     The query can be a machine ID (e.g., 'CNC-001'), machine type (e.g., 'CNC'),
     or a status filter (e.g., 'operational', 'maintenance', 'warning', 'offline').
+    List results are paged: 'total' is the number of matches and 'next_cursor'
+    can be passed as cursor to fetch the next page (only request more if needed).
+    limit: max results per page (default 20, max 100)
+    sort_by: 'utilization', 'next_maintenance', 'hours_run', or 'machine_id'; prefix '-' for descending
+    fields: optional comma-separated fields to return, e.g. 'machine_id,status,sensor_readings'
     """
-    equipment = _load_equipment()
     query_lower = query.lower().strip()
 
     # Search by machine ID
-    for machine in equipment:
-        if machine["machine_id"].lower() == query_lower:
-            sensors = machine["sensor_readings"]
-            sensor_summary = ", ".join(
-                f"{k}: {v}" for k, v in sensors.items()
+    machine = get_record("equipment", query_lower)
+    if machine is not None:
+        # Prefer live ingested readings over the static snapshot in equipment.json
+        live = _live_sensors(machine["machine_id"])
+        if live:
+            reported = {k: v for k, v in live["readings"].items() if v is not None}
+            machine = {**machine, "sensor_readings": {**machine["sensor_readings"], **reported}, "live_sensors": live}
+        alerts = _sensor_alerts(machine["machine_id"])
+        if alerts:
+            machine = {**machine, "active_alerts": alerts}
+        alert_summary = ", ".join(
+            f"{a['channel']} {a['direction']} (z={a['z_score']}, {a['severity']})" for a in alerts
+        )
+        sensors = machine["sensor_readings"]
+        sensor_summary = ", ".join(
+            f"{k}: {v}" for k, v in sensors.items()
+        )
+        return json.dumps({
+            "found": True,
+            "machine": machine,
+            "summary": (
+                f"Machine {machine['machine_id']} ({machine['name']}). "
+                f"Type: {machine['type']}. Status: {machine['status'].upper()}. "
+                f"Location: {machine['location']}. "
+                f"Utilization: {machine['utilization_pct']}%. "
+                f"Hours: {machine['hours_run']}. "
+                f"Last maintenance: {machine['last_maintenance']}. "
+                f"Next maintenance: {machine['next_maintenance']}. "
+                f"Sensors: {sensor_summary}. "
+                + (f"⚠️ Sensor drift alerts: {alert_summary}. " if alerts else "")
+                + (f"Active WOs: {', '.join(machine['active_work_orders'])}. " if machine['active_work_orders'] else "No active work orders. ")
+                + (f"Notes: {machine['notes']}" if machine['notes'] else "")
             )
-            return json.dumps({
-                "found": True,
-                "machine": machine,
-                "summary": (
-                    f"Machine {machine['machine_id']} ({machine['name']}). "
-                    f"Type: {machine['type']}. Status: {machine['status'].upper()}. "
-                    f"Location: {machine['location']}. "
-                    f"Utilization: {machine['utilization_pct']}%. "
-                    f"Hours: {machine['hours_run']}. "
-                    f"Last maintenance: {machine['last_maintenance']}. "
-                    f"Next maintenance: {machine['next_maintenance']}. "
-                    f"Sensors: {sensor_summary}. "
-                    + (f"Active WOs: {', '.join(machine['active_work_orders'])}. " if machine['active_work_orders'] else "No active work orders. ")
-                    + (f"Notes: {machine['notes']}" if machine['notes'] else "")
-                )
-            }, indent=2)
+        }, indent=2)
 
     # Search by status
-    status_matches = [m for m in equipment if query_lower == m["status"].lower()]
+    status_matches = find_records("equipment", "status", query_lower)
     if status_matches:
-        results = []
-        for m in status_matches:
-            results.append({
-                "machine_id": m["machine_id"],
-                "name": m["name"],
-                "type": m["type"],
-                "utilization_pct": m["utilization_pct"],
-                "next_maintenance": m["next_maintenance"],
-                "active_work_orders": m["active_work_orders"]
-            })
-        return json.dumps({
-            "found": True,
-            "count": len(results),
-            "machines": results,
-            "summary": f"Found {len(results)} machine(s) with status '{query}'."
-        }, indent=2)
+        return _list_result(
+            status_matches,
+            ["machine_id", "name", "type", "utilization_pct", "next_maintenance", "active_work_orders"],
+            fields, sort_by, limit, cursor, f"with status '{query}'",
+        )
 
     # Search by type
+    equipment = load_records("equipment")
     type_matches = [m for m in equipment if query_lower in m["type"].lower() or query_lower in m["name"].lower()]
     if type_matches:
-        results = []
-        for m in type_matches:
-            results.append({
-                "machine_id": m["machine_id"],
-                "name": m["name"],
-                "status": m["status"],
-                "utilization_pct": m["utilization_pct"],
-                "active_work_orders": m["active_work_orders"]
-            })
-        return json.dumps({
-            "found": True,
-            "count": len(results),
-            "machines": results,
-            "summary": f"Found {len(results)} machine(s) matching '{query}'."
-        }, indent=2)
+        return _list_result(
+            type_matches,
+            ["machine_id", "name", "status", "utilization_pct", "active_work_orders"],
+            fields, sort_by, limit, cursor, f"matching '{query}'",
+        )
 
     return json.dumps({
         "found": False,
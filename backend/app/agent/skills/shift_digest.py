@@ -0,0 +1,32 @@
+import json
+from langchain_core.tools import tool
+
+from app.agent.skills.chart_generator import store_rendered_chart
+from app.digests import DIGESTS, get_digest, get_digest_cache
+
+
+@tool
+def shift_digest(name: str) -> str:
+    """Return a precomputed shift digest instantly, with its chart, instead of querying
+    and charting the data yourself. Use this tool for shift-change overviews like
+    "which machines are down for maintenance?", "what's overdue?", or "show the defect dashboard".
+
+    name: 'machines_in_maintenance' (machines in maintenance, warning or offline and the
+        work orders they hold up), 'overdue_orders' (open work orders past their due date),
+        or 'defect_dashboard' (defects per work order including logged NCRs)
+    """
+    key = name.strip().lower()
+    if key not in DIGESTS:
+        return json.dumps({"found": False, "error": f"Unknown digest '{name}'. Available: {', '.join(DIGESTS)}"})
+    digest = get_digest(key)
+    if digest is None:
+        return json.dumps({"found": False, "error": f"Digest '{key}' is not available yet."})
+
+    result = {k: v for k, v in digest.items() if k not in ("source_versions", "chart_format", "compute_ms")}
+    image = get_digest_cache().chart(key, digest["version"]) if digest["chart_type"] else None
+    if image is not None:
+        # The SSE handler streams charts found in the chart store by chart_id
+        result["chart_id"] = store_rendered_chart(image, digest["chart_format"], "standard")
+        result["note"] = "The digest chart has been displayed to the user."
+    result["found"] = True
+    return json.dumps(result, indent=2)
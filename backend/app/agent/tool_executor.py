@@ -0,0 +1,76 @@
+"""Start tool calls while the agent's message is still streaming.
+
+The model emits tool calls as `tool_call_chunks` whose JSON arguments arrive a
+few tokens at a time. A call's arguments are complete as soon as they parse as
+a JSON object (the closing brace is the last thing streamed), so each call is
+launched right then, overlapping its latency with the generation of later calls
+instead of waiting for the whole message as ToolNode does.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+
+from app import metrics
+
+
+class StreamingToolExecutor:
+    """Launches tool calls from a streaming AI message and collects their ToolMessages."""
+
+    def __init__(self, tools: list[BaseTool], config: Optional[RunnableConfig] = None):
+        self._tools = {t.name: t for t in tools}
+        self._config = config
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._launched_indexes: set[int] = set()
+
+    def feed(self, message: AIMessageChunk) -> None:
+        """Inspect the message accumulated so far and launch newly completed tool calls."""
+        for chunk in message.tool_call_chunks:
+            index = chunk.get("index")
+            if index in self._launched_indexes or not chunk.get("id") or not chunk.get("name"):
+                continue
+            try:
+                args = json.loads(chunk.get("args") or "")
+            except json.JSONDecodeError:
+                continue
+            if isinstance(args, dict):
+                self._launched_indexes.add(index)
+                self._launch({"name": chunk["name"], "args": args, "id": chunk["id"], "type": "tool_call"})
+                metrics.incr("tool_calls_started_during_stream")
+
+    async def results(self, message: AIMessage) -> list[ToolMessage]:
+        """Await every tool call of the finished message (launching any not yet started),
+        in the order the model emitted them."""
+        for call in message.tool_calls:
+            if call["id"] not in self._tasks:
+                self._launch({**call, "type": "tool_call"})
+                metrics.incr("tool_calls_started_after_stream")
+        return [await self._tasks[call["id"]] for call in message.tool_calls]
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    def _launch(self, call: dict) -> None:
+        self._tasks[call["id"]] = asyncio.create_task(self._run(call))
+
+    async def _run(self, call: dict) -> ToolMessage:
+        tool = self._tools.get(call["name"])
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self._tools)}].",
+                name=call["name"], tool_call_id=call["id"], status="error",
+            )
+        try:
+            # A ToolCall input makes the tool return a ToolMessage, like ToolNode does
+            return await tool.ainvoke(call, self._config)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                name=call["name"], tool_call_id=call["id"], status="error",
+            )
@@ -0,0 +1,128 @@
+"""Background drift detection over all machines' live sensor buffers.
+
+Each cycle takes one vectorized pass over the sensor store: the mean of the
+newest samples is compared to the buffer-window baseline as a z-score, which is
+smoothed with an EWMA across cycles so a single noisy sample does not raise an
+alert. Alerts clear with hysteresis once the smoothed score falls back.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from app.config import (
+    ANOMALY_INTERVAL_SECONDS, ANOMALY_RECENT_SAMPLES, ANOMALY_MIN_SAMPLES,
+    ANOMALY_Z_THRESHOLD, ANOMALY_EWMA_ALPHA,
+)
+from app.sensors import CHANNELS, SensorStore, get_sensor_store
+
+logger = logging.getLogger(__name__)
+
+
+class AnomalyDetector:
+    """Keeps per-(machine, channel) EWMA z-scores and the set of active alerts."""
+
+    def __init__(self, store: SensorStore, recent: int = 10, min_samples: int = 30,
+                 z_threshold: float = 3.0, alpha: float = 0.3):
+        self.store = store
+        self.recent = recent
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.alpha = alpha
+        self._ewma_z = np.zeros((0, len(CHANNELS)))
+        self._lock = threading.Lock()
+        self._alerts: dict[tuple[str, str], dict] = {}
+        self.last_cycle_ms: Optional[float] = None
+
+    def run_cycle(self) -> list[dict]:
+        """Score every machine and channel in one pass; returns the active alerts."""
+        started = time.perf_counter()
+        machine_ids, recent_mean, mean, std, counts = self.store.drift_view(self.recent)
+
+        n = len(machine_ids)
+        if self._ewma_z.shape[0] < n:
+            grown = np.zeros((n, len(CHANNELS)))
+            grown[:self._ewma_z.shape[0]] = self._ewma_z
+            self._ewma_z = grown
+        ewma = self._ewma_z[:n]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (recent_mean - mean) / std
+        # Flat or sparse channels carry no signal yet
+        z[~np.isfinite(z) | (counts < self.min_samples)] = 0.0
+        ewma *= 1 - self.alpha
+        ewma += self.alpha * z
+
+        magnitude = np.abs(ewma)
+        raise_mask = magnitude >= self.z_threshold
+        # Hysteresis: keep an existing alert until it drops below 80% of the threshold
+        keep_mask = magnitude >= self.z_threshold * 0.8
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            active = {}
+            for row, col in zip(*np.nonzero(keep_mask)):
+                key = (machine_ids[row], CHANNELS[col])
+                previous = self._alerts.get(key)
+                if previous is None and not raise_mask[row, col]:
+                    continue
+                score = float(ewma[row, col])
+                active[key] = {
+                    "machine_id": key[0],
+                    "channel": key[1],
+                    "z_score": round(score, 2),
+                    "direction": "high" if score > 0 else "low",
+                    "severity": "critical" if abs(score) >= 2 * self.z_threshold else "warning",
+                    "recent_mean": round(float(recent_mean[row, col]), 3),
+                    "baseline_mean": round(float(mean[row, col]), 3),
+                    "baseline_std": round(float(std[row, col]), 3),
+                    "since": previous["since"] if previous else now,
+                    "updated_at": now,
+                }
+            self._alerts = active
+            self.last_cycle_ms = (time.perf_counter() - started) * 1000
+            return list(active.values())
+
+    def alerts(self, machine_id: Optional[str] = None) -> list[dict]:
+        """Active alerts, optionally for one machine, most severe first."""
+        with self._lock:
+            alerts = [
+                a for a in self._alerts.values()
+                if machine_id is None or a["machine_id"] == machine_id.upper()
+            ]
+        return sorted(alerts, key=lambda a: abs(a["z_score"]), reverse=True)
+
+
+_detector: Optional[AnomalyDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """Return the process-wide detector bound to the live sensor store."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = AnomalyDetector(
+                    get_sensor_store(),
+                    recent=ANOMALY_RECENT_SAMPLES,
+                    min_samples=ANOMALY_MIN_SAMPLES,
+                    z_threshold=ANOMALY_Z_THRESHOLD,
+                    alpha=ANOMALY_EWMA_ALPHA,
+                )
+    return _detector
+
+
+async def run_anomaly_job() -> None:
+    """Background loop: run a detection cycle every ANOMALY_INTERVAL_SECONDS."""
+    detector = get_anomaly_detector()
+    while True:
+        try:
+            await asyncio.to_thread(detector.run_cycle)
+        except Exception:
+            logger.exception("Anomaly detection cycle failed")
+        await asyncio.sleep(ANOMALY_INTERVAL_SECONDS)
@@ -0,0 +1,30 @@
+"""Cooperative cancellation for a chat request's in-flight work.
+
+Async work (graph nodes, LLM HTTP streams) is stopped by cancelling the task
+that drives the graph. Sync tools run in executor threads that cannot be
+interrupted, so they poll the request's cancel token at expensive checkpoints;
+the token is a ContextVar, which ToolNode copies into the tool's thread.
+"""
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from app import metrics
+
+cancel_token: ContextVar[Optional[threading.Event]] = ContextVar("cancel_token", default=None)
+
+
+class RequestCancelled(Exception):
+    """Raised inside a tool when the client that requested its result has gone away."""
+
+
+def is_cancelled() -> bool:
+    token = cancel_token.get()
+    return token is not None and token.is_set()
+
+
+def check_cancelled(work: str) -> None:
+    """Raise RequestCancelled (counting it as cancelled `work`) if the request was cancelled."""
+    if is_cancelled():
+        metrics.incr(f"cancelled_{work}")
+        raise RequestCancelled(f"Request cancelled before {work.replace('_', ' ')} completed")
@@ -4,16 +4,167 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # ---- LLM Provider ----
-# Set LLM_PROVIDER to "azure" to use Azure OpenAI, or "openai" (default)
+# Set LLM_PROVIDER to "azure" to use Azure OpenAI, "openai" (default), or "pool" to
+# spread calls over both with hedging and retries (see Provider Pool below)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
 
 # ---- OpenAI Settings ----
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+# Smaller model for the fast tier (planning, tool selection, short answers); empty = OPENAI_MODEL
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "")
+# Override the API base URL (e.g. an OpenAI-compatible gateway or a local mock server)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.3"))
 
 # ---- Azure OpenAI Settings ----
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "")
+# Deployment for the fast tier; empty = AZURE_OPENAI_DEPLOYMENT
+AZURE_OPENAI_FAST_DEPLOYMENT = os.getenv("AZURE_OPENAI_FAST_DEPLOYMENT", "")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
+
+# ---- Provider Pool (LLM_PROVIDER=pool) ----
+LLM_POOL_PROVIDERS = [p.strip().lower() for p in os.getenv("LLM_POOL_PROVIDERS", "openai,azure").split(",") if p.strip()]
+# Send a hedged request to the next-fastest provider once the chosen one is slower than
+# this percentile of its recent latencies (LLM_HEDGE_DEFAULT_MS until enough samples)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "300"))
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "2000"))
+# Retries on 429/5xx/connection errors with full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "250"))
+LLM_RETRY_MAX_MS = float(os.getenv("LLM_RETRY_MAX_MS", "4000"))
+# Smoothing factor for per-provider latency EWMA used to pick the fastest provider
+LLM_POOL_EWMA_ALPHA = float(os.getenv("LLM_POOL_EWMA_ALPHA", "0.2"))
+
+# ---- Agent ----
+# Start each tool call as soon as its streamed arguments are complete, overlapping tool
+# latency with the rest of the LLM response (false = run tools after the full message)
+STREAMING_TOOL_EXECUTION = os.getenv("STREAMING_TOOL_EXECUTION", "true").lower() == "true"
+
+# ---- Model Routing ----
+# Send planning, tool selection and short answers to the fast tier; escalate synthesis
+# turns to the large model when any of the limits below is exceeded
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+ROUTER_LONG_MESSAGE_CHARS = int(os.getenv("ROUTER_LONG_MESSAGE_CHARS", "600"))
+ROUTER_MAX_FAST_PLAN_STEPS = int(os.getenv("ROUTER_MAX_FAST_PLAN_STEPS", "3"))
+ROUTER_MAX_FAST_TOOL_RESULTS = int(os.getenv("ROUTER_MAX_FAST_TOOL_RESULTS", "2"))
+ROUTER_MULTI_CHART_COUNT = int(os.getenv("ROUTER_MULTI_CHART_COUNT", "2"))
+
+# ---- Charts ----
+# Default output format (png, webp, svg) and size preset (thumbnail, standard, print);
+# clients can override both per chat request
+CHART_DEFAULT_FORMAT = os.getenv("CHART_DEFAULT_FORMAT", "png").lower()
+CHART_DEFAULT_SIZE = os.getenv("CHART_DEFAULT_SIZE", "standard").lower()
+# Default delivery mode: "image" (server-rendered) or "spec" (series data rendered by the client)
+CHART_DEFAULT_MODE = os.getenv("CHART_DEFAULT_MODE", "image").lower()
+# Stream a thumbnail first; the full-size image is rendered when fetched from /api/charts/{id}
+CHART_THUMBNAIL_FIRST = os.getenv("CHART_THUMBNAIL_FIRST", "true").lower() == "true"
+# Number of recent charts that can still be re-rendered at full size
+CHART_SOURCE_CACHE_SIZE = int(os.getenv("CHART_SOURCE_CACHE_SIZE", "256"))
+# Reuse one pre-built figure per dashboard type per worker thread, replacing only the data
+CHART_TEMPLATES = os.getenv("CHART_TEMPLATES", "true").lower() == "true"
+
+# ---- Plant Data Storage ----
+# "json" reads app/data/*.json on every call; "sqlite" reads an indexed, memory-mapped
+# database built from them by scripts/convert_data_to_sqlite.py
+DATA_BACKEND = os.getenv("DATA_BACKEND", "json").lower()
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+SQLITE_DATA_PATH = os.getenv("SQLITE_DATA_PATH", os.path.join(DATA_DIR, "plant.sqlite3"))
+# Bytes of the database each connection memory-maps (pages are shared across workers)
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# ---- Knowledge Base Search ----
+# Hashed n-gram embedding width, weight of the embedding score against the lexical (BM25)
+# score, and answer sentences returned per entry. A best match scoring KB_MIN_SCORE or
+# more comes with the runners-up within KB_RELATIVE_SCORE of it; below that only the
+# best entry is returned, and only if it shares a word with the query
+KB_EMBEDDING_DIM = int(os.getenv("KB_EMBEDDING_DIM", "4096"))
+KB_EMBEDDING_WEIGHT = float(os.getenv("KB_EMBEDDING_WEIGHT", "0.5"))
+KB_MIN_SCORE = float(os.getenv("KB_MIN_SCORE", "0.3"))
+KB_RELATIVE_SCORE = float(os.getenv("KB_RELATIVE_SCORE", "0.75"))
+KB_SNIPPET_SENTENCES = int(os.getenv("KB_SNIPPET_SENTENCES", "3"))
+
+# ---- NCR Journal ----
+# Append-only log of defect reports; NCR numbers and per-work-order defect counts come from it
+NCR_JOURNAL_PATH = os.getenv(
+    "NCR_JOURNAL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ncr_journal.jsonl")
+)
+# How long the writer waits to gather concurrent reports into one fsync, and the batch cap
+NCR_GROUP_COMMIT_MS = float(os.getenv("NCR_GROUP_COMMIT_MS", "2"))
+NCR_MAX_BATCH = int(os.getenv("NCR_MAX_BATCH", "256"))
+
+# ---- Live Sensors ----
+# Samples kept per machine ring buffer (3600 = one hour at 1 Hz), initial machine slots,
+# and the most machines ingest accepts (~86 KB each); batches with more new IDs are rejected
+SENSOR_BUFFER_SIZE = int(os.getenv("SENSOR_BUFFER_SIZE", "3600"))
+SENSOR_INITIAL_MACHINES = int(os.getenv("SENSOR_INITIAL_MACHINES", "64"))
+SENSOR_MAX_MACHINES = int(os.getenv("SENSOR_MAX_MACHINES", "1024"))
+
+# ---- Sensor Anomaly Detection ----
+ANOMALY_DETECTION_ENABLED = os.getenv("ANOMALY_DETECTION_ENABLED", "true").lower() == "true"
+ANOMALY_INTERVAL_SECONDS = float(os.getenv("ANOMALY_INTERVAL_SECONDS", "5"))
+# Newest samples averaged and compared against the buffer-window baseline
+ANOMALY_RECENT_SAMPLES = int(os.getenv("ANOMALY_RECENT_SAMPLES", "10"))
+# Minimum samples in the window before a channel is scored
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "30"))
+# Smoothed |z| at which an alert is raised (2x = critical), and the EWMA smoothing factor
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+ANOMALY_EWMA_ALPHA = float(os.getenv("ANOMALY_EWMA_ALPHA", "0.3"))
+
+# ---- Chat Streaming ----
+# How often an idle SSE stream checks whether the client is still connected
+SSE_DISCONNECT_POLL_SECONDS = float(os.getenv("SSE_DISCONNECT_POLL_SECONDS", "0.5"))
+# Events kept per conversation for Last-Event-ID replay (one per streamed token, plus skill events)
+SSE_REPLAY_BUFFER_SIZE = int(os.getenv("SSE_REPLAY_BUFFER_SIZE", "5000"))
+# How long a run with no connected client keeps going before it is cancelled, and how long
+# a finished run stays replayable
+SSE_RESUME_GRACE_SECONDS = float(os.getenv("SSE_RESUME_GRACE_SECONDS", "30"))
+SSE_REPLAY_TTL_SECONDS = float(os.getenv("SSE_REPLAY_TTL_SECONDS", "300"))
+# Directory to record each agent run's event stream into for offline replay (empty = off)
+EVENT_RECORDING_DIR = os.getenv("EVENT_RECORDING_DIR", "")
+# Frames queued per /ws/chat connection before its conversations wait for the client;
+# token events queued behind a slow client are merged into one frame
+WS_MAX_PENDING_FRAMES = int(os.getenv("WS_MAX_PENDING_FRAMES", "256"))
+
+# ---- Change Subscriptions ----
+# How often the change feed checks its sources' versions (data files, NCR journal, sensor
+# ingest) while any subscription exists
+SUBSCRIPTION_POLL_SECONDS = float(os.getenv("SUBSCRIPTION_POLL_SECONDS", "0.5"))
+# Changes kept for clients resuming after a version, and how long a subscription with no
+# attached stream is kept
+SUBSCRIPTION_HISTORY = int(os.getenv("SUBSCRIPTION_HISTORY", "1000"))
+SUBSCRIPTION_IDLE_TTL_SECONDS = float(os.getenv("SUBSCRIPTION_IDLE_TTL_SECONDS", "3600"))
+
+# ---- Shift Digests ----
+# Precompute the shift-change digests (machines in maintenance, overdue orders, defect
+# dashboard) and their charts in the background
+DIGESTS_ENABLED = os.getenv("DIGESTS_ENABLED", "true").lower() == "true"
+# Cron (minute hour day month weekday, server local time) for full recomputation
+DIGEST_SCHEDULE = os.getenv("DIGEST_SCHEDULE", "45 5,13,21 * * *")
+# How often data-file and NCR versions are checked to recompute stale digests in between
+DIGEST_CHECK_SECONDS = float(os.getenv("DIGEST_CHECK_SECONDS", "30"))
+# Earlier versions kept per digest (GET /api/digests/{name}?version=N)
+DIGEST_HISTORY = int(os.getenv("DIGEST_HISTORY", "5"))
+
+# ---- Fast Path ----
+# Answer exact WO/machine ID lookups and simple status filters directly, without the LLM
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# ---- Admin Diagnostics ----
+# Token for X-Admin-Token on /api/admin/* and profiled chat requests (empty = disabled)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Where per-request collapsed-stack profiles are written, and the sampling interval
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles")
+)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# tracemalloc snapshots kept in memory for diffing
+TRACEMALLOC_MAX_SNAPSHOTS = int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", "10"))
+
+# ---- Startup ----
+# Import matplotlib/seaborn in a background thread at startup instead of on the first chart request
+CHART_WARMUP = os.getenv("CHART_WARMUP", "true").lower() == "true"
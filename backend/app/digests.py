@@ -0,0 +1,324 @@
+"""Precomputed shift digests: the heavy questions everyone asks at shift change.
+
+Each digest (machines in maintenance, overdue work orders, defect dashboard) is
+computed with its chart by a background job on the DIGEST_SCHEDULE cron
+(minute hour day-of-month month day-of-week, local time) and whenever one of
+its data sources changes: the data files' mtimes (storage.dataset_version),
+the NCR journal's sequence number and, for digests relative to today, the
+date, checked every DIGEST_CHECK_SECONDS. Results
+go into a versioned in-memory cache; the shift_digest tool and GET /api/digests
+read from it without touching the data or rendering anything.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional
+
+from app import metrics
+from app.config import CHART_DEFAULT_FORMAT, DIGEST_CHECK_SECONDS, DIGEST_HISTORY, DIGEST_SCHEDULE
+from app.ncr_journal import apply_logged_defects, get_ncr_journal
+from app.storage import dataset_version, load_records
+
+logger = logging.getLogger(__name__)
+
+# ---- Cron schedule ----
+
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(expr: str, lo: int, hi: int) -> set[int]:
+    values = set()
+    for part in expr.split(","):
+        base, _, step = part.partition("/")
+        if base == "*":
+            start, end = lo, hi
+        elif "-" in base:
+            start, end = (int(v) for v in base.split("-", 1))
+        else:
+            start = end = int(base)
+            if step:
+                end = hi
+        if not (lo <= start <= end <= hi):
+            raise ValueError(f"Cron field '{part}' is outside {lo}-{hi}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """A standard five-field cron expression; both day fields restricted means either may match."""
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]  # 0 = Sunday
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expr: str) -> "CronSchedule":
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expr}' needs 5 fields: minute hour day month weekday")
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, _CRON_RANGES)
+        )
+        return cls(frozenset(minutes), frozenset(hours), frozenset(days), frozenset(months),
+                   frozenset(d % 7 for d in weekdays), fields[2] == "*", fields[4] == "*")
+
+    def _day_matches(self, t: datetime) -> bool:
+        day_ok = t.day in self.days
+        weekday_ok = (t.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """The first matching minute strictly after `after`."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError("Cron expression never matches")
+
+
+# ---- Digests ----
+# Each builder returns the digest payload and its chart, drawn from the same records
+# (None when there is nothing to plot). The chart functions are imported lazily so
+# the scheduler doesn't load the chart libraries before the first run.
+
+def _machines_in_maintenance() -> tuple[dict, Any]:
+    from app.agent.skills.chart_generator import equipment_utilization_figure
+
+    machines = sorted(
+        (m for m in load_records("equipment") if m["status"] in ("maintenance", "warning", "offline")),
+        key=lambda m: (m["status"] != "maintenance", m["machine_id"]),
+    )
+    rows = [{
+        "machine_id": m["machine_id"],
+        "name": m["name"],
+        "status": m["status"],
+        "next_maintenance": m.get("next_maintenance"),
+        "active_work_orders": m.get("active_work_orders", []),
+    } for m in machines]
+    in_maintenance = sum(1 for m in machines if m["status"] == "maintenance")
+    blocked = sorted({wo for m in machines for wo in m.get("active_work_orders", [])})
+    return {
+        "machines": rows,
+        "summary": (
+            f"{in_maintenance} machine(s) in maintenance, {len(machines) - in_maintenance} in warning/offline"
+            + (f"; work orders affected: {', '.join(blocked)}." if blocked else ".")
+        ),
+    }, equipment_utilization_figure(machines) if machines else None
+
+
+def _overdue_orders() -> tuple[dict, Any]:
+    from app.agent.skills.chart_generator import overdue_orders_figure
+
+    today = date.today().isoformat()
+    overdue = [
+        wo for wo in load_records("work_orders")
+        if wo.get("due_date") and wo["due_date"] < today and wo["status"] not in ("completed", "cancelled")
+    ]
+    rows = []
+    for wo in sorted(overdue, key=lambda w: w["due_date"]):
+        progress = (wo["completed_quantity"] / wo["quantity"] * 100) if wo["quantity"] > 0 else 0
+        rows.append({
+            "work_order_id": wo["work_order_id"],
+            "product_name": wo["product_name"],
+            "customer": wo["customer"],
+            "status": wo["status"],
+            "priority": wo["priority"],
+            "due_date": wo["due_date"],
+            "days_overdue": (date.today() - date.fromisoformat(wo["due_date"])).days,
+            "progress_pct": round(progress, 1),
+        })
+    return {
+        "work_orders": rows,
+        "summary": (
+            f"{len(rows)} overdue work order(s)"
+            + (f"; most overdue: {rows[0]['work_order_id']} ({rows[0]['days_overdue']} days)." if rows else ".")
+        ),
+    }, overdue_orders_figure(rows) if rows else None
+
+
+def _defect_dashboard() -> tuple[dict, Any]:
+    from app.agent.skills.chart_generator import defect_analysis_figure
+
+    work_orders = apply_logged_defects(load_records("work_orders"))
+    rows = []
+    for wo in work_orders:
+        metrics_ = wo.get("performance_metrics", {})
+        rows.append({
+            "work_order_id": wo["work_order_id"],
+            "product_name": wo["product_name"],
+            "defects_found": wo["defects_found"],
+            "scrap_rate_pct": metrics_.get("scrap_rate_pct"),
+            "quality_pct": metrics_.get("quality_pct"),
+        })
+    rows.sort(key=lambda r: -r["defects_found"])
+    total = sum(r["defects_found"] for r in rows)
+    return {
+        "total_defects": total,
+        "work_orders": rows,
+        "summary": f"{total} defect(s) across {len(rows)} work orders"
+                   + (f"; most: {rows[0]['work_order_id']} ({rows[0]['defects_found']})." if rows and total else "."),
+    }, defect_analysis_figure(work_orders)
+
+
+# name -> (title, builder, chart type, data sources whose versions it depends on)
+DIGESTS: dict[str, tuple[str, Callable[[], tuple[dict, Any]], str, tuple[str, ...]]] = {
+    "machines_in_maintenance": ("Machines in maintenance", _machines_in_maintenance,
+                                "equipment_utilization", ("equipment",)),
+    "overdue_orders": ("Overdue work orders", _overdue_orders, "overdue_orders", ("work_orders", "date")),
+    "defect_dashboard": ("Defect dashboard", _defect_dashboard, "defect_analysis", ("work_orders", "ncr")),
+}
+
+
+def _source_version(source: str) -> int:
+    if source == "ncr":
+        return get_ncr_journal().last_seq()
+    if source == "date":
+        # Overdue is relative to today: a new day changes the digest without any data change
+        return date.today().toordinal()
+    return dataset_version(source)
+
+
+class DigestCache:
+    """Latest computed digests and their recent versions, with rendered chart images."""
+
+    def __init__(self, history: int = 5):
+        self._history = history
+        self._digests: dict[str, deque[dict]] = {}
+        self._charts: dict[tuple[str, int], bytes] = {}
+        self._lock = threading.Lock()
+        # Serializes recomputation; readers only take _lock
+        self._compute_lock = threading.Lock()
+
+    def _compute(self, name: str, trigger: str, sources: dict[str, int]) -> dict:
+        title, builder, chart_type, _ = DIGESTS[name]
+        start = time.perf_counter()
+        payload, fig = builder()
+        chart = None
+        if fig is not None:
+            from app.agent.skills.chart_generator import render_figure
+            chart = render_figure(fig, CHART_DEFAULT_FORMAT, "standard")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe("digest_compute_ms", elapsed_ms)
+
+        with self._lock:
+            versions = self._digests.setdefault(name, deque(maxlen=self._history))
+            version = versions[-1]["version"] + 1 if versions else 1
+            if len(versions) == versions.maxlen:
+                self._charts.pop((name, versions[0]["version"]), None)
+            digest = {
+                "name": name,
+                "title": title,
+                "version": version,
+                "computed_at": datetime.now().isoformat(timespec="seconds"),
+                "trigger": trigger,
+                "source_versions": sources,
+                "compute_ms": round(elapsed_ms, 1),
+                **payload,
+                "chart_type": chart_type if chart else None,
+                "chart_format": CHART_DEFAULT_FORMAT if chart else None,
+            }
+            versions.append(digest)
+            if chart:
+                self._charts[(name, version)] = chart
+        return digest
+
+    def refresh(self, trigger: str, force: bool = False, names: Optional[list[str]] = None) -> list[str]:
+        """Recompute the digests whose sources changed since their last computation
+        (all of them with force). Returns the names that were recomputed."""
+        recomputed = []
+        with self._compute_lock:
+            for name in names or DIGESTS:
+                sources = {s: _source_version(s) for s in DIGESTS[name][3]}
+                current = self.get(name)
+                if force or current is None or current["source_versions"] != sources:
+                    self._compute(name, trigger, sources)
+                    recomputed.append(name)
+        return recomputed
+
+    def get(self, name: str, version: Optional[int] = None) -> Optional[dict]:
+        """The latest (or a retained earlier) version of a digest, or None."""
+        with self._lock:
+            versions = self._digests.get(name)
+            if not versions:
+                return None
+            if version is None:
+                return versions[-1]
+            return next((d for d in versions if d["version"] == version), None)
+
+    def chart(self, name: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            return self._charts.get((name, version))
+
+    def latest(self) -> list[dict]:
+        with self._lock:
+            return [versions[-1] for versions in self._digests.values() if versions]
+
+
+_cache: Optional[DigestCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_digest_cache() -> DigestCache:
+    """Return the process-wide digest cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DigestCache(DIGEST_HISTORY)
+    return _cache
+
+
+def get_digest(name: str, version: Optional[int] = None) -> Optional[dict]:
+    """A cached digest, computed now if the scheduler hasn't produced it yet.
+    Raises KeyError for unknown digest names."""
+    if name not in DIGESTS:
+        raise KeyError(f"Unknown digest '{name}'. Available: {', '.join(DIGESTS)}")
+    cache = get_digest_cache()
+    digest = cache.get(name, version)
+    if digest is None and version is None:
+        cache.refresh("on_demand", names=[name])
+        digest = cache.get(name)
+    metrics.incr("digest_requests")
+    return digest
+
+
+async def run_digest_job() -> None:
+    """Background loop: compute every digest at startup and on each DIGEST_SCHEDULE tick,
+    and recompute the ones whose data changed every DIGEST_CHECK_SECONDS in between."""
+    cache = get_digest_cache()
+    schedule = CronSchedule.parse(DIGEST_SCHEDULE)
+    next_run = schedule.next_after(datetime.now())
+    try:
+        await asyncio.to_thread(cache.refresh, "startup", True)
+    except Exception:
+        logger.exception("Initial digest computation failed")
+    while True:
+        wait = (next_run - datetime.now()).total_seconds()
+        await asyncio.sleep(max(0.0, min(DIGEST_CHECK_SECONDS, wait)))
+        try:
+            if datetime.now() >= next_run:
+                next_run = schedule.next_after(datetime.now())
+                await asyncio.to_thread(cache.refresh, "schedule", True)
+            else:
+                await asyncio.to_thread(cache.refresh, "data_change")
+        except Exception:
+            logger.exception("Digest refresh failed")
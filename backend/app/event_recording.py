@@ -0,0 +1,164 @@
+"""Record agent event streams and replay them without the LLM.
+
+A recording is a gzipped JSON-lines file: a header line (message, conversation
+id, start time), one line per `astream_events` event with its offset in seconds
+from the start of the run, and a trailer line with the run's outcome. Only what
+_stream_agent_response reads is kept: the event kind, name, LangGraph node and
+data payload. Chain events are kept for timing but without their data (each
+carries the full graph state), and chat model inputs are dropped. Messages are
+stored with messages_to_dict so they come back as the same message classes.
+
+A chart tool's output only carries a chart_id; the rendered chart lives in
+chart_store until the SSE handler pops it. The recorder copies the entry into
+the tool's event, and the replayer puts it back into chart_store just before
+yielding that event, so chart hand-off replays exactly.
+"""
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from app import metrics
+from app.agent.skills.chart_generator import chart_store
+from app.config import EVENT_RECORDING_DIR
+
+FORMAT_VERSION = 1
+_MESSAGE_KEY = "__message__"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, BaseMessage):
+        return {_MESSAGE_KEY: message_to_dict(value)}
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if _MESSAGE_KEY in value:
+            return messages_from_dict([value[_MESSAGE_KEY]])[0]
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _chart_id(output: Any) -> Optional[str]:
+    content = output.content if hasattr(output, "content") else output
+    if not isinstance(content, str) or "chart_id" not in content:
+        return None
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return data.get("chart_id") if isinstance(data, dict) else None
+
+
+def compact_event(event: dict, offset_s: float) -> dict:
+    """The parts of an astream_events event the SSE handler uses, JSON-ready."""
+    kind = event["event"]
+    record = {
+        "t": round(offset_s, 4),
+        "event": kind,
+        "name": event.get("name", ""),
+        "node": event.get("metadata", {}).get("langgraph_node", ""),
+    }
+    data = event.get("data", {})
+    if kind.startswith("on_chain_"):
+        return record
+    if kind == "on_chat_model_start":
+        data = {k: v for k, v in data.items() if k != "input"}
+    record["data"] = _encode(data)
+    if kind == "on_tool_end":
+        chart_id = _chart_id(data.get("output"))
+        if chart_id and chart_id in chart_store:
+            record["chart"] = {"id": chart_id, "entry": chart_store[chart_id]}
+    return record
+
+
+class EventRecorder:
+    """Collects compacted events in memory; `save` writes them in one go at the end."""
+
+    def __init__(self, message: str, conversation_id: str):
+        self.header = {
+            "version": FORMAT_VERSION,
+            "message": message,
+            "conversation_id": conversation_id,
+            "recorded_at": datetime.now().isoformat(),
+        }
+        self.events: list[dict] = []
+        self._started = time.perf_counter()
+
+    def add(self, event: dict) -> None:
+        self.events.append(compact_event(event, time.perf_counter() - self._started))
+
+    def save(self, path: str, status: str) -> None:
+        trailer = {"status": status, "duration_s": round(time.perf_counter() - self._started, 4),
+                   "events": len(self.events)}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for line in (self.header, *self.events, trailer):
+                f.write(json.dumps(line, separators=(",", ":"), default=str))
+                f.write("\n")
+
+
+async def record_events(events: AsyncIterator[dict], message: str, conversation_id: str,
+                        directory: str = EVENT_RECORDING_DIR) -> AsyncIterator[dict]:
+    """Pass `events` through unchanged while recording them to `directory`.
+    The file is written when the stream ends, however it ends (status complete,
+    error or cancelled)."""
+    recorder = EventRecorder(message, conversation_id)
+    status = "error"
+    try:
+        async for event in events:
+            recorder.add(event)
+            yield event
+        status = "complete"
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    finally:
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{conversation_id[:8]}.events.jsonl.gz"
+        # Written synchronously: the stream may be unwinding from a cancellation
+        recorder.save(os.path.join(directory, name), status)
+        metrics.incr("event_recordings_written")
+
+
+def load_recording(path: str) -> tuple[dict, list[dict], Optional[dict]]:
+    """(header, events, trailer) of a recording; trailer is None if the file was cut short."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    header, rest = lines[0], lines[1:]
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported recording version {header.get('version')!r} in {path}")
+    trailer = rest.pop() if rest and "event" not in rest[-1] else None
+    return header, rest, trailer
+
+
+async def replay_events(events: list[dict], speed: float = 1.0) -> AsyncIterator[dict]:
+    """Yield recorded events as astream_events would, at `speed` times the recorded
+    pace (0 = as fast as possible). Chart entries are restored to chart_store first."""
+    started = time.perf_counter()
+    for record in events:
+        if speed > 0:
+            delay = record["t"] / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if "chart" in record:
+            chart_store[record["chart"]["id"]] = dict(record["chart"]["entry"])
+        yield {
+            "event": record["event"],
+            "name": record["name"],
+            "metadata": {"langgraph_node": record["node"]},
+            "data": _decode(record.get("data", {})),
+        }
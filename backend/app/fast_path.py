@@ -0,0 +1,180 @@
+"""Deterministic routing for simple lookups that do not need the LLM.
+
+Exact work-order / machine ID status questions ("status of WO-2001", "CNC-003?")
+and simple status filters ("show on hold work orders", "which machines are in
+maintenance") are matched with a small set of anchored patterns; anything with
+extra intent (charts, reports, comparisons, follow-up wording) falls through to
+the agent graph. The matched tool's JSON output is rendered with fixed Markdown
+templates.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from app import metrics
+
+WORK_ORDER_ID = r"wo-\d{3,5}"
+MACHINE_ID = r"[a-z0-9]{2,4}-\d{3}"
+
+WORK_ORDER_STATUSES = {
+    "in progress": "in_progress", "in_progress": "in_progress", "active": "in_progress",
+    "on hold": "on_hold", "on_hold": "on_hold",
+    "queued": "queued", "completed": "completed", "cancelled": "cancelled",
+}
+MACHINE_STATUSES = {
+    "operational": "operational", "running": "operational",
+    "maintenance": "maintenance", "in maintenance": "maintenance", "under maintenance": "maintenance",
+    "warning": "warning", "in warning": "warning", "offline": "offline",
+}
+
+_LEAD = r"(?:(?:what(?:'s| is)|show(?: me)?|get|check|give me)\s+)?(?:the\s+)?"
+_STATUS_WORD = r"(?:current\s+)?(?:status|state|details?|info)"
+_ID_QUERY = re.compile(
+    rf"^{_LEAD}(?:{_STATUS_WORD}\s+(?:of|for|on)\s+)?(?:work\s+order\s+|machine\s+)?"
+    rf"(?P<id>{WORK_ORDER_ID}|{MACHINE_ID})(?:\s+{_STATUS_WORD})?\s*[?.!]*$"
+)
+_WO_NOUN = r"(?:work\s+orders?|orders?|wos?|jobs?)"
+_MACHINE_NOUN = r"(?:machines?|equipment)"
+_LIST_LEAD = r"(?:(?:show|list|get|give me|what are|which are)(?: me)?\s+)?(?:all\s+)?(?:the\s+)?"
+
+
+def _status_pattern(statuses: dict) -> str:
+    return "|".join(sorted((re.escape(s) for s in statuses), key=len, reverse=True))
+
+
+_WO_FILTER = [
+    re.compile(rf"^{_LIST_LEAD}(?P<status>{_status_pattern(WORK_ORDER_STATUSES)})\s+{_WO_NOUN}\s*[?.!]*$"),
+    re.compile(rf"^(?:which|what)\s+{_WO_NOUN}\s+(?:are\s+)?(?P<status>{_status_pattern(WORK_ORDER_STATUSES)})\s*[?.!]*$"),
+]
+_MACHINE_FILTER = [
+    re.compile(rf"^{_LIST_LEAD}(?P<status>{_status_pattern(MACHINE_STATUSES)})\s+{_MACHINE_NOUN}\s*[?.!]*$"),
+    re.compile(rf"^(?:which|what)\s+{_MACHINE_NOUN}\s+(?:are|is)\s+(?P<status>{_status_pattern(MACHINE_STATUSES)})\s*[?.!]*$"),
+    re.compile(rf"^{_LIST_LEAD}{_MACHINE_NOUN}\s+(?:in|on|under|with status)\s+(?P<status>{_status_pattern(MACHINE_STATUSES)})\s*[?.!]*$"),
+]
+
+metrics.register_rate("fast_path_hit_rate", "fast_path_hits", "fast_path_misses")
+
+
+@dataclass
+class FastPathRoute:
+    tool_name: str  # "work_order_lookup" or "equipment_status"
+    query: str
+
+
+def _classify(message: str) -> Optional[FastPathRoute]:
+    text = " ".join(message.lower().split())
+    match = _ID_QUERY.match(text)
+    if match:
+        entity_id = match.group("id").upper()
+        tool_name = "work_order_lookup" if re.fullmatch(WORK_ORDER_ID, entity_id.lower()) else "equipment_status"
+        return FastPathRoute(tool_name, entity_id)
+    for pattern in _WO_FILTER:
+        match = pattern.match(text)
+        if match:
+            return FastPathRoute("work_order_lookup", WORK_ORDER_STATUSES[match.group("status")])
+    for pattern in _MACHINE_FILTER:
+        match = pattern.match(text)
+        if match:
+            return FastPathRoute("equipment_status", MACHINE_STATUSES[match.group("status")])
+    return None
+
+
+def match_fast_path(message: str) -> Optional[FastPathRoute]:
+    """Route for a message the fast path can answer, or None; counts hits and misses."""
+    route = _classify(message)
+    metrics.incr("fast_path_hits" if route else "fast_path_misses")
+    return route
+
+
+# ---- Markdown templates ----
+
+def _cell(value) -> str:
+    if value is None or value == "":
+        return "—"
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value) or "—"
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {v}" for k, v in value.items())
+    return str(value).replace("|", "\\|")
+
+
+def _header(field: str) -> str:
+    return field.replace("_pct", " %").replace("_", " ").strip().capitalize()
+
+
+def _table(rows: list[dict], columns: list[str]) -> str:
+    lines = [
+        "| " + " | ".join(_header(c) for c in columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    lines += ["| " + " | ".join(_cell(row.get(c)) for c in columns) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _fields_table(pairs: list[tuple[str, object]]) -> str:
+    return _table([{"field": k, "value": v} for k, v in pairs], ["field", "value"])
+
+
+def _work_order_markdown(result: dict) -> str:
+    wo = result["work_order"]
+    metrics_ = wo.get("performance_metrics", {})
+    body = [
+        f"**{wo['work_order_id']} — {wo['product_name']}** for {wo['customer']}",
+        "",
+        _fields_table([
+            ("Status", wo["status"].upper()),
+            ("Priority", wo["priority"]),
+            ("Progress", f"{wo['completed_quantity']}/{wo['quantity']} ({result['progress_pct']:.0f}%)"),
+            ("Machine", wo["machine_assigned"]),
+            ("Operator", wo["operator"]),
+            ("Material", wo["material"]),
+            ("Due date", wo["due_date"]),
+            ("Defects", wo["defects_found"]),
+            ("OEE", f"{metrics_['oee_pct']}%" if "oee_pct" in metrics_ else None),
+            ("Scrap rate", f"{metrics_['scrap_rate_pct']}%" if "scrap_rate_pct" in metrics_ else None),
+        ]),
+    ]
+    if wo.get("notes"):
+        body += ["", f"_Notes: {wo['notes']}_"]
+    return "\n".join(body)
+
+
+def _machine_markdown(result: dict) -> str:
+    machine = result["machine"]
+    body = [
+        f"**{machine['machine_id']} — {machine['name']}** ({machine['type']}, {machine['location']})",
+        "",
+        _fields_table([
+            ("Status", machine["status"].upper()),
+            ("Utilization", f"{machine['utilization_pct']}%"),
+            ("Hours run", machine["hours_run"]),
+            ("Last maintenance", machine["last_maintenance"]),
+            ("Next maintenance", machine["next_maintenance"]),
+            ("Active work orders", machine["active_work_orders"]),
+            *((_header(k), v) for k, v in machine["sensor_readings"].items()),
+        ]),
+    ]
+    alerts = machine.get("active_alerts") or []
+    if alerts:
+        body += ["", "⚠️ **Sensor drift alerts**", "",
+                 _table(alerts, ["channel", "direction", "z_score", "severity", "since"])]
+    if machine.get("notes"):
+        body += ["", f"_Notes: {machine['notes']}_"]
+    return "\n".join(body)
+
+
+def _list_markdown(result: dict, key: str) -> str:
+    rows = result[key]
+    columns = list(rows[0]) if rows else []
+    return f"{result['summary']}\n\n{_table(rows, columns)}"
+
+
+def render_markdown(route: FastPathRoute, result: dict) -> str:
+    """Render a work_order_lookup / equipment_status result as the assistant's reply."""
+    if not result.get("found"):
+        return result.get("error") or result.get("summary", "No matching records found.")
+    if "work_order" in result:
+        return _work_order_markdown(result)
+    if "machine" in result:
+        return _machine_markdown(result)
+    return _list_markdown(result, "work_orders" if route.tool_name == "work_order_lookup" else "machines")
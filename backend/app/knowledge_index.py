@@ -0,0 +1,218 @@
+"""Hybrid lexical + embedding retrieval over the knowledge base.
+
+Every entry is split into passages: its question (with the category) and each
+sentence or numbered step of its answer. Passages are scored two ways:
+
+- BM25 over stemmed words, for exact terminology ("O9000", "PPE").
+- Cosine similarity of hashed n-gram embeddings: word unigrams and bigrams plus
+  character trigrams of each word and of each adjacent word pair, hashed into a
+  fixed-width, IDF-weighted, L2-normalized vector. Character n-grams make
+  "lock out" and "lockout", or "calibrating" and "calibration", overlap without
+  a model download. Passage vectors are one float32 NumPy matrix, and a batch
+  of queries is scored with a single matrix product.
+
+BM25 is scaled to 0..1 by the score a full match of the query would get, and
+mixed with the cosine score by KB_EMBEDDING_WEIGHT.
+An entry scores as its best passage; its snippet is its best-scoring answer
+sentences, kept in document order.
+"""
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.config import (
+    KB_EMBEDDING_DIM, KB_EMBEDDING_WEIGHT, KB_MIN_SCORE, KB_RELATIVE_SCORE, KB_SNIPPET_SENTENCES,
+)
+from app.storage import dataset_version, load_records
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Sentence ends, and the "1) 2) 3)" steps SOP answers are written as
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\s+(?=\d+\)\s)")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it me my of on or "
+    "our should the their there this to what when where which who why with you your".split()
+)
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so inflections share a term ("calibrating",
+    "calibration" and "calibrate" all become "calibrat")."""
+    for suffix in ("ion", "ing", "ed", "es", "e", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix) and not word.endswith("ss"):
+            word = word[: -len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+                word = word[:-1]
+            break
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _features(tokens: list[str]) -> list[str]:
+    feats = [f"w:{t}" for t in tokens]
+    feats += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    for word in tokens + [a + b for a, b in zip(tokens, tokens[1:])]:
+        padded = f"#{word}#"
+        feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return feats
+
+
+def _hash(feature: str, dim: int) -> tuple[int, float]:
+    # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+    h = zlib.crc32(feature.encode())
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+@dataclass
+class _Passage:
+    entry: int
+    text: str
+    is_answer: bool
+
+
+class KnowledgeIndex:
+    """Passage-level BM25 and embedding index over knowledge base entries."""
+
+    def __init__(self, entries: list[dict], dim: int = 4096):
+        self.entries = entries
+        self.dim = dim
+        self.passages: list[_Passage] = []
+        for i, entry in enumerate(entries):
+            self.passages.append(_Passage(i, f"{entry['question']} {entry['category']}", False))
+            for sentence in _SENTENCE_SPLIT_RE.split(entry["answer"].strip()):
+                if sentence.strip():
+                    self.passages.append(_Passage(i, sentence.strip(), True))
+        self._entry_of = np.array([p.entry for p in self.passages])
+
+        tokens = [tokenize(p.text) for p in self.passages]
+        n = len(tokens)
+
+        # BM25 statistics
+        self._tf = [Counter(t) for t in tokens]
+        self._lengths = np.array([len(t) for t in tokens], dtype=np.float32)
+        self._avg_length = float(self._lengths.mean()) if n else 0.0
+        df = Counter(term for tf in self._tf for term in tf)
+        self._bm25_idf = {term: math.log(1 + (n - d + 0.5) / (d + 0.5)) for term, d in df.items()}
+
+        # Hashed embeddings, weighted by per-bucket IDF
+        counts = np.zeros((n, dim), dtype=np.float32)
+        for row, toks in enumerate(tokens):
+            for feature in _features(toks):
+                bucket, sign = _hash(feature, dim)
+                counts[row, bucket] += sign
+        bucket_df = np.count_nonzero(counts, axis=0)
+        self._bucket_idf = (np.log((n + 1) / (bucket_df + 1)) + 1).astype(np.float32)
+        self.vectors = self._normalize(np.sign(counts) * np.log1p(np.abs(counts)) * self._bucket_idf)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embedding matrix (len(texts) x dim) in the index's vector space."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in _features(tokenize(text)):
+                bucket, sign = _hash(feature, self.dim)
+                matrix[row, bucket] += sign
+        return self._normalize(np.sign(matrix) * np.log1p(np.abs(matrix)) * self._bucket_idf)
+
+    def _bm25(self, query_tokens: list[str]) -> np.ndarray:
+        """BM25 per passage, divided by the score of a passage of average length that
+        contains every query term once (unknown terms count with the highest IDF), so
+        1.0 means the whole query matched and a single common word scores low."""
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths / max(self._avg_length, 1e-9))
+        max_idf = max(self._bm25_idf.values(), default=1.0)
+        full_match = 0.0
+        for term in set(query_tokens):
+            idf = self._bm25_idf.get(term)
+            full_match += idf if idf is not None else max_idf
+            if idf is None:
+                continue
+            tf = np.array([t.get(term, 0) for t in self._tf], dtype=np.float32)
+            scores += idf * tf * (_BM25_K1 + 1) / (tf + norm)
+        return np.clip(scores / full_match, 0, 1) if full_match else scores
+
+    def search_many(self, queries: list[str], top_k: int = 3, weight: float = 0.5,
+                    min_score: float = 0.3, snippet_sentences: int = 3,
+                    relative_score: float = 0.75) -> list[list[dict]]:
+        """Best entries per query, each with its fused score and answer snippet.
+
+        A best entry scoring at least `min_score` is returned along with the runners-up
+        scoring at least `relative_score` times its score. A weaker best entry is still
+        returned, alone, if a query term matched it lexically: paraphrases share few
+        words with the entry, while queries sharing none only score on n-gram noise.
+        """
+        if not self.passages:
+            return [[] for _ in queries]
+        dense = self.embed(queries) @ self.vectors.T  # queries x passages
+        results = []
+        for qi, query in enumerate(queries):
+            lexical = self._bm25(tokenize(query))
+            fused = weight * np.clip(dense[qi], 0, None) + (1 - weight) * lexical
+
+            entry_scores = np.zeros(len(self.entries), dtype=np.float32)
+            np.maximum.at(entry_scores, self._entry_of, fused)
+            entry_lexical = np.zeros(len(self.entries), dtype=np.float32)
+            np.maximum.at(entry_lexical, self._entry_of, lexical)
+
+            ranked = np.argsort(-entry_scores, kind="stable")[:top_k]
+            best = float(entry_scores[ranked[0]]) if len(ranked) else 0.0
+            if best >= min_score:
+                cutoff = max(best * relative_score, 1e-9)
+            elif len(ranked) and entry_lexical[ranked[0]] > 0:
+                ranked, cutoff = ranked[:1], 0.0
+            else:
+                ranked, cutoff = ranked[:0], 0.0
+            results.append([
+                self._hit(int(entry), float(entry_scores[entry]), fused, snippet_sentences)
+                for entry in ranked if entry_scores[entry] >= cutoff
+            ])
+        return results
+
+    def _hit(self, entry: int, score: float, fused: np.ndarray, snippet_sentences: int) -> dict:
+        sentences = [i for i, p in enumerate(self.passages) if p.entry == entry and p.is_answer]
+        best = sorted(sorted(sentences, key=lambda i: -fused[i])[:snippet_sentences])
+        data = self.entries[entry]
+        return {
+            "id": data["id"],
+            "question": data["question"],
+            "category": data["category"],
+            "score": round(score, 3),
+            "snippet": " ".join(self.passages[i].text for i in best),
+            "truncated": len(best) < len(sentences),
+        }
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_version: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """The index for the current knowledge base, rebuilt when its data file changes."""
+    global _index, _index_version
+    version = dataset_version("knowledge_base")
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = KnowledgeIndex(load_records("knowledge_base"), KB_EMBEDDING_DIM)
+            _index_version = version
+        return _index
+
+
+def search_knowledge_base(query: str, top_k: int = 3) -> list[dict]:
+    return get_knowledge_index().search_many(
+        [query], top_k, KB_EMBEDDING_WEIGHT, KB_MIN_SCORE, KB_SNIPPET_SENTENCES, KB_RELATIVE_SCORE
+    )[0]
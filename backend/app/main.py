@@ -1,19 +1,67 @@
+import asyncio
 import json
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI
+from typing import AsyncIterator, Callable, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 
-from app.models import ChatRequest, SkillInfo
-from app.agent.graph import agent_graph, SKILL_DESCRIPTIONS
-from app.agent.skills.chart_generator import chart_store
+from app.models import ChatRequest, SkillInfo, SensorBatch, SubscriptionRequest
+from app.agent.graph import get_agent_graph, tools as agent_tools, SKILL_DESCRIPTIONS
+from app.agent.skills.chart_generator import (
+    CHART_FORMATS, chart_mode, chart_store, normalize_chart_mode, normalize_render_options,
+    render_chart, render_options, warm_up_charts,
+)
+from app.config import CHART_WARMUP, ANOMALY_DETECTION_ENABLED, DIGESTS_ENABLED, EVENT_RECORDING_DIR, FAST_PATH_ENABLED
+from app.digests import DIGESTS, get_digest, get_digest_cache, run_digest_job
+from app.event_recording import record_events
+from app.fast_path import FastPathRoute, match_fast_path, render_markdown
+from app.ncr_journal import close_ncr_journal
+from app import metrics
+from app.streaming import ConversationBusy, Execution, cancel_all, get_execution, parse_last_event_id, start_execution
+from app.subscriptions import (
+    create_subscription, delete_subscription, get_subscription, run_change_feed_job, stream_subscription,
+)
+from app.ws_chat import ChatConnection
+from app.profiling import (
+    diff_snapshots, is_admin, list_profiles, list_snapshots, profile_path, require_admin,
+    start_request_profiler, take_snapshot,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile the agent graph at startup, start background jobs (chart warm-up,
+    sensor anomaly detection, change feed, shift digests), and on shutdown cancel running chat executions and
+    flush the NCR journal."""
+    get_agent_graph()
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up_charts)) if CHART_WARMUP else None
+    anomaly_job = None
+    if ANOMALY_DETECTION_ENABLED:
+        from app.anomaly import run_anomaly_job
+        anomaly_job = asyncio.create_task(run_anomaly_job())
+    change_feed_job = asyncio.create_task(run_change_feed_job())
+    digest_job = asyncio.create_task(run_digest_job()) if DIGESTS_ENABLED else None
+    yield
+    change_feed_job.cancel()
+    if digest_job:
+        digest_job.cancel()
+    if warmup and not warmup.done():
+        warmup.cancel()
+    if anomaly_job:
+        anomaly_job.cancel()
+    await cancel_all()
+    close_ncr_journal()
+
 
 app = FastAPI(
     title="AMM Assist API",
     description="AI-powered Advanced Manufacturing operations assistant with observable skill execution",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # CORS for React frontend
@@ -35,8 +83,18 @@ def _format_sse(event_type: str, data: dict) -> str:
     return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
 
 
-async def _stream_agent_response(message: str, conversation_id: str):
-    """Stream agent execution with skill trace events via SSE."""
+async def _stream_agent_response(message: str, conversation_id: str,
+                                 chart_options: tuple[str, str], chart_delivery: str = "image",
+                                 event_source: Optional[Callable[[dict], AsyncIterator[dict]]] = None):
+    """Stream agent execution with skill trace events via SSE.
+
+    `event_source` replaces the agent graph's astream_events (called with the graph
+    inputs); benchmarks use it to replay recorded runs through this handler.
+    """
+    # Tool calls run in copies of this context, so generate_chart sees the request's options
+    render_options.set(chart_options)
+    chart_mode.set(chart_delivery)
+
     if conversation_id not in conversations:
         conversations[conversation_id] = []
 
@@ -48,15 +106,34 @@ async def _stream_agent_response(message: str, conversation_id: str):
         "timestamp": datetime.now().isoformat(),
     })
 
+    # LLM calls and tool calls started but not yet finished, reported if the request is cancelled
+    in_flight = {"llm_calls": 0, "tool_calls": 0}
+
     try:
         inputs = {"messages": list(history)}
         final_assistant_content = ""
 
-        async for event in agent_graph.astream_events(inputs, version="v2"):
+        if event_source is not None:
+            events = event_source(inputs)
+        else:
+            events = get_agent_graph().astream_events(inputs, version="v2")
+            if EVENT_RECORDING_DIR:
+                events = record_events(events, message, conversation_id)
+
+        async for event in events:
             kind = event["event"]
             metadata = event.get("metadata", {})
             langgraph_node = metadata.get("langgraph_node", "")
 
+            if kind == "on_chat_model_start":
+                in_flight["llm_calls"] += 1
+            elif kind == "on_chat_model_end":
+                in_flight["llm_calls"] -= 1
+            elif kind == "on_tool_start":
+                in_flight["tool_calls"] += 1
+            elif kind in ("on_tool_end", "on_tool_error"):
+                in_flight["tool_calls"] -= 1
+
             # --- PLAN: detect plan output from planner node ---
             if kind == "on_chat_model_end" and langgraph_node == "planner":
                 output = event.get("data", {}).get("output")
@@ -115,11 +192,28 @@ async def _stream_agent_response(message: str, conversation_id: str):
                 # Check if this is a chart result (has chart_id from chart_store)
                 if isinstance(output_data, dict) and "chart_id" in output_data:
                     chart_id = output_data["chart_id"]
-                    chart_b64 = chart_store.pop(chart_id, None)
-                    if chart_b64:
+                    chart = chart_store.pop(chart_id, None)
+                    if chart and "spec" in chart:
+                        yield _format_sse("chart_data", {
+                            "skill_name": tool_name,
+                            "chart_id": chart_id,
+                            "spec": chart["spec"],
+                            "chart_type": output_data.get("chart_type", "unknown"),
+                            "summary": output_data.get("summary", ""),
+                            "timestamp": datetime.now().isoformat(),
+                        })
+                    elif chart:
                         yield _format_sse("chart", {
                             "skill_name": tool_name,
-                            "image_base64": chart_b64,
+                            "chart_id": chart_id,
+                            "image_base64": chart["image_base64"],
+                            "mime_type": chart["mime_type"],
+                            "format": chart["format"],
+                            "size": chart["size"],
+                            "full_url": (
+                                f"/api/charts/{chart_id}?format={chart['format']}&size={chart['full_size']}"
+                                if chart["full_size"] else None
+                            ),
                             "chart_type": output_data.get("chart_type", "unknown"),
                             "summary": output_data.get("summary", ""),
                             "timestamp": datetime.now().isoformat(),
@@ -161,6 +255,12 @@ async def _stream_agent_response(message: str, conversation_id: str):
             history.append(AIMessage(content=final_assistant_content))
         conversations[conversation_id] = list(history)
 
+    except asyncio.CancelledError:
+        # Client went away: the graph stream unwinds from here, cancelling its node tasks
+        metrics.incr("chat_requests_cancelled")
+        for work, count in in_flight.items():
+            metrics.incr(f"cancelled_{work}", max(count, 0))
+        raise
     except Exception as e:
         yield _format_sse("error", {
             "message": str(e),
@@ -172,13 +272,141 @@ async def _stream_agent_response(message: str, conversation_id: str):
     })
 
 
-@app.post("/api/chat")
-async def chat(request: ChatRequest):
-    """Chat endpoint that streams agent execution via SSE."""
+async def _stream_fast_path(message: str, conversation_id: str, route: FastPathRoute):
+    """Answer a simple lookup by calling its skill directly and rendering a Markdown
+    template; emits the same SSE events as the agent without any LLM call."""
+    history = conversations.setdefault(conversation_id, [])
+    history.append(HumanMessage(content=message))
+    skill_info = SKILL_DESCRIPTIONS.get(route.tool_name, {})
+    tool_input = {"query": route.query}
+
+    yield _format_sse("agent_thinking", {
+        "status": "analyzing",
+        "route": "fast_path",
+        "timestamp": datetime.now().isoformat(),
+    })
+    yield _format_sse("skill_start", {
+        "skill_name": route.tool_name,
+        "display_name": skill_info.get("name", route.tool_name),
+        "icon": skill_info.get("icon", "🔧"),
+        "input": str(tool_input),
+        "timestamp": datetime.now().isoformat(),
+    })
+
+    try:
+        skill = next(t for t in agent_tools if t.name == route.tool_name)
+        output_data = json.loads(await asyncio.to_thread(skill.invoke, tool_input))
+        yield _format_sse("skill_result", {
+            "skill_name": route.tool_name,
+            "display_name": skill_info.get("name", route.tool_name),
+            "icon": skill_info.get("icon", "🔧"),
+            "output": output_data,
+            "timestamp": datetime.now().isoformat(),
+        })
+        answer = render_markdown(route, output_data)
+        yield _format_sse("message", {
+            "content": answer,
+            "timestamp": datetime.now().isoformat(),
+        })
+        history.append(AIMessage(content=answer))
+    except Exception as e:
+        yield _format_sse("error", {
+            "message": str(e),
+            "timestamp": datetime.now().isoformat(),
+        })
+
+    yield _format_sse("done", {
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+async def _profile_stream(stream, label: str):
+    """Run a response stream under the sampling profiler and report where the profile was written.
+    The `done` event is held back until after the `profile` event: clients stop reading at `done`."""
+    profiler = start_request_profiler()
+    held = []
+    try:
+        async for chunk in stream:
+            if chunk.startswith("event: done\n"):
+                held.append(chunk)
+            else:
+                yield chunk
+    finally:
+        profiler.stop()
+        name = await asyncio.to_thread(profiler.write, label)
+    yield _format_sse("profile", {
+        "name": name,
+        "url": f"/api/admin/profiles/{name}",
+        "samples": profiler.sample_count,
+        "duration_ms": round(profiler.duration_s * 1000, 1),
+        "timestamp": datetime.now().isoformat(),
+    })
+    for chunk in held:
+        yield chunk
+
+
+def _start_chat(request: ChatRequest, profiled: bool = False) -> Execution:
+    """Start a chat request's agent (or fast-path) run as a background execution.
+    Raises ValueError for invalid chart options."""
     conversation_id = request.conversation_id or str(uuid.uuid4())
+    chart_options = normalize_render_options(request.chart_format, request.chart_size)
+    chart_delivery = normalize_chart_mode(request.chart_mode)
+
+    route = match_fast_path(request.message) if FAST_PATH_ENABLED else None
+    if route is not None:
+        stream = _stream_fast_path(request.message, conversation_id, route)
+    else:
+        stream = _stream_agent_response(request.message, conversation_id, chart_options, chart_delivery)
+    if profiled:
+        stream = _profile_stream(stream, conversation_id)
+    return start_execution(conversation_id, stream)
+
+
+@app.post("/api/chat")
+async def chat(request: ChatRequest, http_request: Request, profile: bool = False,
+               x_profile: Optional[str] = Header(default=None),
+               x_admin_token: Optional[str] = Header(default=None)):
+    """Chat endpoint that streams agent execution via SSE.
+    Admins can profile a request with ?profile=true or an X-Profile: 1 header.
+    """
+    profiled = profile or (x_profile or "").lower() in ("1", "true", "yes")
+    if profiled and not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires an admin token")
+    # The agent runs in the background so a dropped connection can resume via the endpoint below
+    try:
+        execution = _start_chat(request, profiled)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ConversationBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return StreamingResponse(
+        execution.subscribe(http_request, execution.first_event_id - 1),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Conversation-Id": execution.conversation_id,
+        }
+    )
+
+
+@app.websocket("/ws/chat")
+async def chat_ws(websocket: WebSocket):
+    """Many conversations and chat requests over one connection, with the same events
+    as the SSE stream (protocol in app.ws_chat)."""
+    await ChatConnection(websocket, _start_chat).run()
+
 
+@app.get("/api/chat/{conversation_id}/stream")
+async def resume_chat(conversation_id: str, http_request: Request,
+                      last_event_id: Optional[str] = Header(default=None)):
+    """Reattach to a conversation's running or recently finished execution, replaying
+    the events after Last-Event-ID (a `replay_gap` event marks any that were evicted)."""
+    execution = get_execution(conversation_id)
+    if execution is None:
+        raise HTTPException(status_code=404, detail=f"No active or recent execution for conversation {conversation_id}")
     return StreamingResponse(
-        _stream_agent_response(request.message, conversation_id),
+        execution.subscribe(http_request, parse_last_event_id(last_event_id)),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -188,6 +416,204 @@ async def chat(request: ChatRequest):
     )
 
 
+@app.get("/api/charts/{chart_id}")
+async def get_chart(chart_id: str, format: Optional[str] = None, size: Optional[str] = None):
+    """Render a previously streamed chart at full resolution (or another format/size)."""
+    try:
+        fmt, size = normalize_render_options(format, size)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    image = await asyncio.to_thread(render_chart, chart_id, fmt, size)
+    if image is None:
+        raise HTTPException(status_code=404, detail=f"Chart {chart_id} not found or expired")
+    return Response(content=image, media_type=CHART_FORMATS[fmt], headers={"Cache-Control": "private, max-age=3600"})
+
+
+@app.post("/api/sensors/ingest")
+async def ingest_sensors(batch: SensorBatch):
+    """Ingest a batch of machine sensor samples into the live ring buffers."""
+    from app.sensors import get_sensor_store
+    try:
+        accepted = get_sensor_store().ingest_samples([s.model_dump() for s in batch.samples])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"accepted": accepted}
+
+
+@app.websocket("/ws/sensors")
+async def ingest_sensors_ws(websocket: WebSocket):
+    """Streaming sensor ingest: each message is one sample or {"samples": [...]}; acked with a count."""
+    from app.sensors import get_sensor_store
+    store = get_sensor_store()
+    await websocket.accept()
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            samples = payload.get("samples", [payload]) if isinstance(payload, dict) else payload
+            try:
+                accepted = store.ingest_samples(samples)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                await websocket.send_json({"error": f"Invalid sample: {e}"})
+                continue
+            await websocket.send_json({"accepted": accepted})
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/api/sensors/{machine_id}")
+async def live_sensors(machine_id: str):
+    """Latest live readings and window stats for a machine."""
+    from app.sensors import live_sensor_snapshot
+    snapshot = live_sensor_snapshot(machine_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No live sensor data for {machine_id}")
+    return {"machine_id": machine_id.upper(), **snapshot}
+
+
+@app.get("/api/alerts")
+async def sensor_alerts(machine_id: Optional[str] = None):
+    """Active sensor drift alerts from the background anomaly detector."""
+    from app.anomaly import get_anomaly_detector
+    detector = get_anomaly_detector()
+    return {"alerts": detector.alerts(machine_id), "last_cycle_ms": detector.last_cycle_ms}
+
+
+@app.post("/api/subscriptions")
+async def subscribe(request: SubscriptionRequest):
+    """Register interest in work orders, machines or statuses; stream changes from stream_url."""
+    try:
+        subscription = create_subscription(request.work_order_ids, request.machine_ids, request.statuses)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return subscription.describe()
+
+
+@app.get("/api/subscriptions/{subscription_id}/stream")
+async def subscription_stream(subscription_id: str, http_request: Request,
+                              last_event_id: Optional[str] = Header(default=None)):
+    """SSE stream of a subscription: a `snapshot` event, then a `change` event (field diffs)
+    per update. Event ids are feed versions, so Last-Event-ID resumes without a new snapshot."""
+    subscription = get_subscription(subscription_id)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found or expired")
+    after_version = parse_last_event_id(last_event_id) if last_event_id else None
+
+    async def events():
+        async for event_type, version, data in stream_subscription(
+                subscription, after_version, http_request.is_disconnected):
+            yield f"id: {version}\n" + _format_sse(event_type, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "Connection": "keep-alive"})
+
+
+@app.delete("/api/subscriptions/{subscription_id}")
+async def unsubscribe(subscription_id: str):
+    if not delete_subscription(subscription_id):
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found or expired")
+    return {"deleted": subscription_id}
+
+
+@app.get("/api/digests")
+async def list_digests(request: Request):
+    """Latest precomputed shift digests. The ETag changes whenever any digest is recomputed."""
+    digests = get_digest_cache().latest()
+    etag = '"' + "-".join(f"{d['name']}.{d['version']}" for d in digests) + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    body = {
+        "digests": [
+            {**d, "chart_url": f"/api/digests/{d['name']}/chart?version={d['version']}" if d["chart_format"] else None}
+            for d in digests
+        ],
+        "available": list(DIGESTS),
+    }
+    return Response(content=json.dumps(body), media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/api/digests/{name}")
+async def digest_detail(name: str, version: Optional[int] = None):
+    """One digest, computed on demand if the scheduler hasn't produced it yet;
+    ?version=N returns a retained earlier version."""
+    try:
+        digest = await asyncio.to_thread(get_digest, name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if digest is None:
+        raise HTTPException(status_code=404, detail=f"Version {version} of digest {name} is no longer retained")
+    chart_url = f"/api/digests/{name}/chart?version={digest['version']}" if digest["chart_format"] else None
+    return {**digest, "chart_url": chart_url}
+
+
+@app.get("/api/digests/{name}/chart")
+async def digest_chart(name: str, version: Optional[int] = None):
+    """The chart rendered with a digest (latest version by default)."""
+    try:
+        digest = await asyncio.to_thread(get_digest, name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    image = get_digest_cache().chart(name, digest["version"]) if digest else None
+    if image is None:
+        raise HTTPException(status_code=404, detail=f"No chart for digest {name}")
+    return Response(content=image, media_type=CHART_FORMATS[digest["chart_format"]],
+                    headers={"Cache-Control": "private, max-age=3600"})
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Operational counters and rates (cancelled work, fast-path hit rate)."""
+    return metrics.snapshot()
+
+
+def _store_footprint() -> dict:
+    """Entry counts and rough payload sizes of the in-memory stores that can grow."""
+    return {
+        "conversations": len(conversations),
+        "conversation_messages": sum(len(h) for h in conversations.values()),
+        "conversation_chars": sum(len(str(m.content)) for h in conversations.values() for m in h),
+        "chart_store_entries": len(chart_store),
+        "chart_store_base64_chars": sum(len(c.get("image_base64", "")) for c in list(chart_store.values())),
+    }
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def admin_list_profiles():
+    """Collapsed-stack profiles written by profiled chat requests, newest first."""
+    return {"profiles": list_profiles()}
+
+
+@app.get("/api/admin/profiles/{name}", dependencies=[Depends(require_admin)])
+async def admin_get_profile(name: str):
+    """Download a profile (feed it to flamegraph.pl, speedscope or inferno)."""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+
+@app.post("/api/admin/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_snapshot(label: str = ""):
+    """Take a tracemalloc snapshot (tracing starts with the first one) along with store sizes."""
+    return await asyncio.to_thread(take_snapshot, label, _store_footprint())
+
+
+@app.get("/api/admin/tracemalloc/snapshots", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_snapshots():
+    return {"snapshots": list_snapshots()}
+
+
+@app.get("/api/admin/tracemalloc/diff", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_diff(base: str, target: str, key_type: str = "lineno",
+                                 limit: int = 25, path_filter: str = ""):
+    """Top allocation growth between two snapshots; path_filter (e.g. 'app/') narrows to matching frames."""
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=422, detail="key_type must be lineno, filename, or traceback")
+    diff = await asyncio.to_thread(diff_snapshots, base, target, key_type, limit, path_filter)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Unknown snapshot id")
+    return diff
+
+
 @app.get("/api/skills")
 async def list_skills():
     """List all available agent skills."""
@@ -0,0 +1,64 @@
+"""Process-wide operational counters and timings, exposed at GET /api/metrics."""
+import threading
+from collections import defaultdict, deque
+
+_lock = threading.Lock()
+_counters: dict[str, int] = defaultdict(int)
+# name -> (hits counter, misses counter)
+_rates: dict[str, tuple[str, str]] = {}
+# Recent observations per timing, for percentiles (counts/sums cover all observations)
+_OBSERVATION_WINDOW = 1024
+_observations: dict[str, deque] = defaultdict(lambda: deque(maxlen=_OBSERVATION_WINDOW))
+_observation_totals: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Add `amount` to a named counter (thread-safe; tools call this from executor threads)."""
+    if amount:
+        with _lock:
+            _counters[name] += amount
+
+
+def observe(name: str, value: float) -> None:
+    """Record one observation of a timing or size (e.g. a latency in ms)."""
+    with _lock:
+        _observations[name].append(value)
+        totals = _observation_totals[name]
+        totals[0] += 1
+        totals[1] += value
+
+
+def _summarize(values: list[float], count: int, total: float) -> dict:
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+    return {
+        "count": count,
+        "mean": round(total / count, 2),
+        "p50": pct(0.5),
+        "p95": pct(0.95),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def register_rate(name: str, hits: str, misses: str) -> None:
+    """Report hits / (hits + misses) of two counters as a rate in snapshot()."""
+    _rates[name] = (hits, misses)
+
+
+def snapshot() -> dict:
+    """Copy of all counters, registered rates (None until either counter moves), and
+    timing summaries (percentiles over the most recent observations)."""
+    with _lock:
+        counters = dict(sorted(_counters.items()))
+        timings = {
+            name: _summarize(list(values), *_observation_totals[name])
+            for name, values in sorted(_observations.items())
+        }
+    rates = {}
+    for name, (hits, misses) in _rates.items():
+        total = counters.get(hits, 0) + counters.get(misses, 0)
+        rates[name] = round(counters.get(hits, 0) / total, 4) if total else None
+    return {"counters": counters, "rates": rates, "timings": timings}
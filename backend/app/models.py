@@ -6,6 +6,9 @@ from enum import Enum
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    chart_format: Optional[str] = None  # png, webp, or svg
+    chart_size: Optional[str] = None  # thumbnail, standard, or print
+    chart_mode: Optional[str] = None  # image or spec
 
 
 class SkillEventType(str, Enum):
@@ -33,3 +36,18 @@ class SkillInfo(BaseModel):
     examples: Optional[list[str]] = None
     data_source: Optional[str] = None
 
+
+class SensorSample(BaseModel):
+    machine_id: str
+    readings: dict[str, Optional[float]]
+    timestamp: Optional[float] = None  # epoch seconds; defaults to time received
+
+
+class SensorBatch(BaseModel):
+    samples: list[SensorSample]
+
+
+class SubscriptionRequest(BaseModel):
+    work_order_ids: list[str] = []
+    machine_ids: list[str] = []
+    statuses: list[str] = []  # work order or machine statuses, e.g. on_hold, maintenance
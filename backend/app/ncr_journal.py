@@ -0,0 +1,242 @@
+"""Append-only, crash-safe journal of non-conformance reports (NCRs).
+
+One JSON line per NCR. A single writer thread group-commits queued records
+(one write + fsync per batch) and assigns NCR numbers under an exclusive file
+lock, so IDs stay monotonic across worker processes sharing the journal.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+from app.config import NCR_JOURNAL_PATH, NCR_GROUP_COMMIT_MS, NCR_MAX_BATCH
+
+
+@dataclass
+class _Pending:
+    record: dict
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[dict] = None
+    error: Optional[Exception] = None
+
+
+class NCRJournal:
+    """Durable NCR log with group-committed appends and in-memory defect counters."""
+
+    def __init__(self, path: str, group_commit_ms: float = 2.0, max_batch: int = 256):
+        self.path = path
+        self._group_commit_s = group_commit_ms / 1000
+        self._max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._queue: list[_Pending] = []
+        self._closed = False
+
+        # Guards the file offset, sequence and counters below
+        self._io_lock = threading.Lock()
+        self._read_offset = 0
+        self._last_seq = 0
+        self._defect_counts: dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        with self._io_lock, self._file_lock(exclusive=True):
+            self._repair_tail()
+            self._catch_up()
+
+        self._writer = threading.Thread(target=self._run, name="ncr-journal", daemon=True)
+        self._writer.start()
+
+    # ---- Public API ----
+
+    def append(self, record: dict) -> dict:
+        """Durably log an NCR and return it with its assigned ncr_number, seq and
+        the work order's logged-defect count including this report.
+        Blocks until the batch containing the record has been fsynced.
+        """
+        pending = _Pending(record=dict(record))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("NCR journal is closed")
+            self._queue.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def defects_logged(self, work_order_id: str) -> int:
+        """Number of NCRs logged against a work order (including other workers' appends)."""
+        self.refresh()
+        return self._defect_counts.get(work_order_id.upper(), 0)
+
+    def defect_counts(self) -> dict[str, int]:
+        """Snapshot of logged NCR counts per work order."""
+        self.refresh()
+        with self._io_lock:
+            return dict(self._defect_counts)
+
+    def last_seq(self) -> int:
+        """Sequence number of the newest NCR in the journal (0 = empty); changes on every append."""
+        self.refresh()
+        with self._io_lock:
+            return self._last_seq
+
+    def refresh(self) -> None:
+        """Pick up records appended by other processes since the last read."""
+        if fcntl is None:
+            return
+        with self._io_lock, self._file_lock(exclusive=False):
+            self._catch_up()
+
+    def close(self) -> None:
+        """Flush queued records and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        os.close(self._fd)
+
+    # ---- Writer thread ----
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                more_expected = len(self._queue) < self._max_batch and not self._closed
+            # Short window so concurrent reports land in the same fsync
+            if more_expected and self._group_commit_s > 0:
+                time.sleep(self._group_commit_s)
+            with self._cond:
+                batch = self._queue[:self._max_batch]
+                del self._queue[:self._max_batch]
+
+            try:
+                self._commit(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+    def _commit(self, batch: list[_Pending]) -> None:
+        with self._io_lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            seq = self._last_seq
+            counts = dict(self._defect_counts)
+            lines = []
+            results = []
+            for pending in batch:
+                seq += 1
+                record = {"seq": seq, "ncr_number": f"NCR-{seq:06d}", **pending.record}
+                work_order_id = str(record.get("work_order_id", "")).upper()
+                counts[work_order_id] = counts.get(work_order_id, 0) + 1
+                lines.append(json.dumps(record) + "\n")
+                results.append({**record, "defects_logged_on_wo": counts[work_order_id]})
+
+            data = "".join(lines).encode("utf-8")
+            try:
+                written = os.write(self._fd, data)
+                if written != len(data):
+                    raise OSError(f"Short write to NCR journal ({written}/{len(data)} bytes)")
+                os.fsync(self._fd)
+            except Exception:
+                # Drop any partial tail so the journal stays line-aligned
+                os.ftruncate(self._fd, self._read_offset)
+                raise
+
+            self._read_offset += len(data)
+            self._last_seq = seq
+            self._defect_counts = counts
+            for pending, result in zip(batch, results):
+                pending.result = result
+
+    # ---- File helpers (callers hold _io_lock) ----
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _repair_tail(self) -> None:
+        """Truncate a torn final line left by a crash mid-write."""
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            return
+        # Scan backwards for the last newline
+        pos = size
+        while pos > 0:
+            start = max(0, pos - 4096)
+            chunk = os.pread(self._fd, pos - start, start)
+            idx = chunk.rfind(b"\n")
+            if idx != -1:
+                end = start + idx + 1
+                if end != size:
+                    os.ftruncate(self._fd, end)
+                return
+            pos = start
+        os.ftruncate(self._fd, 0)
+
+    def _catch_up(self) -> None:
+        size = os.fstat(self._fd).st_size
+        if size <= self._read_offset:
+            return
+        data = os.pread(self._fd, size - self._read_offset, self._read_offset)
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            self._last_seq = max(self._last_seq, int(record["seq"]))
+            work_order_id = str(record.get("work_order_id", "")).upper()
+            self._defect_counts[work_order_id] = self._defect_counts.get(work_order_id, 0) + 1
+        self._read_offset += len(complete)
+
+
+_journal: Optional[NCRJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_ncr_journal() -> NCRJournal:
+    """Return the process-wide NCR journal, opening it on first use."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = NCRJournal(NCR_JOURNAL_PATH, NCR_GROUP_COMMIT_MS, NCR_MAX_BATCH)
+    return _journal
+
+
+def apply_logged_defects(work_orders: list[dict]) -> list[dict]:
+    """Add journaled NCR counts to each work order's baseline defects_found (in place)."""
+    counts = get_ncr_journal().defect_counts()
+    if counts:
+        for wo in work_orders:
+            wo["defects_found"] += counts.get(wo["work_order_id"].upper(), 0)
+    return work_orders
+
+
+def close_ncr_journal() -> None:
+    """Flush and close the journal if it was opened (called at shutdown)."""
+    global _journal
+    with _journal_lock:
+        if _journal is not None:
+            _journal.close()
+            _journal = None
@@ -0,0 +1,193 @@
+"""Admin diagnostics: per-request sampling profiles and tracemalloc snapshots.
+
+SamplingProfiler is a pure-Python wall-clock sampler: a daemon thread reads
+every thread's current stack via sys._current_frames() at a fixed interval and
+counts identical stacks. Output is the "collapsed stack" format (one
+`frame;frame;frame count` line per stack) read by flamegraph.pl, speedscope and
+inferno. Because the event loop is shared, a request's profile also includes
+whatever other requests were doing at the time; tool work shows up under the
+executor threads.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import ADMIN_TOKEN, PROFILE_DIR, PROFILE_INTERVAL_MS, TRACEMALLOC_MAX_SNAPSHOTS
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """FastAPI dependency: reject unless X-Admin-Token matches ADMIN_TOKEN (unset = disabled)."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    path = frame.f_code.co_filename
+    if path.startswith(_BACKEND_DIR):
+        path = os.path.relpath(path, _BACKEND_DIR)
+    else:
+        path = os.path.basename(path)
+    return f"{frame.f_code.co_name} ({path})"
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks every `interval_ms` until stopped."""
+
+    def __init__(self, interval_ms: float = 5.0):
+        self.interval_s = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration_s = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration_s = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write(self, label: str) -> str:
+        """Write the collapsed profile to PROFILE_DIR and return its file name."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{_SAFE_NAME.sub('_', label)[:48]}.collapsed"
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            f.write(self.collapsed())
+        return name
+
+
+def start_request_profiler() -> SamplingProfiler:
+    profiler = SamplingProfiler(PROFILE_INTERVAL_MS)
+    profiler.start()
+    return profiler
+
+
+def list_profiles() -> list[dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(".collapsed"):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            entries.append({"name": name, "bytes": stat.st_size,
+                            "created": datetime.fromtimestamp(stat.st_mtime).isoformat()})
+    return entries
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Absolute path of a written profile, or None (names outside PROFILE_DIR are rejected)."""
+    if _SAFE_NAME.sub("", name) != name or not name.endswith(".collapsed"):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+# ---- tracemalloc ----
+
+_snapshots: "OrderedDict[str, tuple[str, tracemalloc.Snapshot, dict]]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+_snapshot_seq = 0
+
+
+def take_snapshot(label: str, context: dict) -> dict:
+    """Start tracing if needed and keep a snapshot (the oldest is dropped past the limit).
+    Allocations made before tracing started are not tracked, so the first snapshot is a baseline.
+    """
+    global _snapshot_seq
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        _snapshot_seq += 1
+        snapshot_id = str(_snapshot_seq)
+        taken_at = datetime.now().isoformat()
+        _snapshots[snapshot_id] = (taken_at, snapshot, context)
+        while len(_snapshots) > TRACEMALLOC_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return {
+        "snapshot_id": snapshot_id,
+        "label": label,
+        "taken_at": taken_at,
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "context": context,
+    }
+
+
+def list_snapshots() -> list[dict]:
+    with _snapshot_lock:
+        return [{"snapshot_id": sid, "taken_at": taken_at, "context": context}
+                for sid, (taken_at, _, context) in _snapshots.items()]
+
+
+def diff_snapshots(base_id: str, target_id: str, key_type: str = "lineno", limit: int = 25,
+                   path_filter: str = "") -> Optional[dict]:
+    """Largest allocation growth from snapshot `base_id` to `target_id` (None if either is unknown)."""
+    with _snapshot_lock:
+        base = _snapshots.get(base_id)
+        target = _snapshots.get(target_id)
+    if base is None or target is None:
+        return None
+    stats = target[1].compare_to(base[1], key_type)
+    if path_filter:
+        stats = [s for s in stats if any(path_filter in f.filename for f in s.traceback)]
+    return {
+        "from": {"snapshot_id": base_id, "taken_at": base[0], "context": base[2]},
+        "to": {"snapshot_id": target_id, "taken_at": target[0], "context": target[2]},
+        "total_size_diff_bytes": sum(s.size_diff for s in stats),
+        "top": [
+            {
+                "location": [f"{f.filename}:{f.lineno}" for f in s.traceback][-3:],
+                "size_bytes": s.size,
+                "size_diff_bytes": s.size_diff,
+                "count": s.count,
+                "count_diff": s.count_diff,
+            }
+            for s in stats[:limit]
+        ],
+    }
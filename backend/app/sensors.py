@@ -0,0 +1,258 @@
+"""Live sensor readings held in fixed-size, array-backed ring buffers per machine.
+
+All machines share one (machines x channels x capacity) NumPy array. Each ring
+keeps running sums so the latest value and windowed mean/std of every channel
+are O(1) reads, and nothing touches disk.
+"""
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.config import SENSOR_BUFFER_SIZE, SENSOR_INITIAL_MACHINES, SENSOR_MAX_MACHINES
+
+# Sensor channels, in array order (same keys as equipment.json sensor_readings)
+CHANNELS = ("spindle_temp_c", "vibration_mm_s", "coolant_level_pct", "tool_wear_pct")
+_CHANNEL_INDEX = {name: i for i, name in enumerate(CHANNELS)}
+
+
+class SensorStore:
+    """Per-machine ring buffers of sensor samples with O(1) latest and window stats."""
+
+    def __init__(self, capacity: int = 3600, initial_machines: int = 64, max_machines: Optional[int] = None):
+        self.capacity = capacity
+        # Rows are never freed, so unknown machine IDs must not grow the arrays without bound
+        self.max_machines = max_machines
+        self._lock = threading.Lock()
+        self._index: dict[str, int] = {}
+        self._machine_ids: list[str] = []
+        # Bumped by every ingest; each row records the version that last touched it
+        self._version = 0
+        self._allocate(initial_machines)
+
+    def _allocate(self, machines: int) -> None:
+        """(Re)allocate arrays for `machines` rows, copying existing data."""
+        n_ch = len(CHANNELS)
+        old = getattr(self, "_values", None)
+        values = np.full((machines, n_ch, self.capacity), np.nan, dtype=np.float32)
+        timestamps = np.zeros((machines, self.capacity), dtype=np.float64)
+        head = np.zeros(machines, dtype=np.int64)
+        filled = np.zeros(machines, dtype=np.int64)
+        sums = np.zeros((machines, n_ch), dtype=np.float64)
+        sumsq = np.zeros((machines, n_ch), dtype=np.float64)
+        valid = np.zeros((machines, n_ch), dtype=np.int64)
+        latest = np.full((machines, n_ch), np.nan, dtype=np.float64)
+        last_ts = np.zeros(machines, dtype=np.float64)
+        row_version = np.zeros(machines, dtype=np.int64)
+        if old is not None:
+            n = old.shape[0]
+            values[:n] = self._values
+            timestamps[:n] = self._timestamps
+            head[:n] = self._head
+            filled[:n] = self._filled
+            sums[:n] = self._sum
+            sumsq[:n] = self._sumsq
+            valid[:n] = self._valid
+            latest[:n] = self._latest
+            last_ts[:n] = self._last_ts
+            row_version[:n] = self._row_version
+        self._values, self._timestamps = values, timestamps
+        self._head, self._filled = head, filled
+        self._sum, self._sumsq, self._valid = sums, sumsq, valid
+        self._latest, self._last_ts = latest, last_ts
+        self._row_version = row_version
+
+    def _row(self, machine_id: str) -> int:
+        row = self._index.get(machine_id)
+        if row is None:
+            row = len(self._machine_ids)
+            if row >= self._values.shape[0]:
+                self._allocate(max(1, self._values.shape[0]) * 2)
+            self._index[machine_id] = row
+            self._machine_ids.append(machine_id)
+        return row
+
+    # ---- Ingest ----
+
+    def ingest(self, machine_id: str, readings: dict, timestamp: Optional[float] = None) -> int:
+        """Append one sample; channels missing from `readings` are recorded as gaps."""
+        return self.ingest_samples([{"machine_id": machine_id, "readings": readings, "timestamp": timestamp}])
+
+    def ingest_samples(self, samples: list[dict]) -> int:
+        """Append samples given as {"machine_id", "readings", "timestamp"?} dicts."""
+        if not samples:
+            return 0
+        now = time.time()
+        machine_ids = [s["machine_id"].upper() for s in samples]
+        timestamps = np.array([s.get("timestamp") or now for s in samples], dtype=np.float64)
+        values = np.full((len(samples), len(CHANNELS)), np.nan, dtype=np.float64)
+        for i, sample in enumerate(samples):
+            for name, value in sample["readings"].items():
+                col = _CHANNEL_INDEX.get(name)
+                if col is not None and value is not None:
+                    values[i, col] = value
+        return self.ingest_arrays(machine_ids, timestamps, values)
+
+    def ingest_arrays(self, machine_ids: list[str], timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Vectorized append of n samples: values is (n, len(CHANNELS)), NaN = not reported.
+        Samples for the same machine are applied in order; if a batch holds more than
+        `capacity` samples for one machine only the newest `capacity` are kept.
+        Raises ValueError, storing nothing, if the batch's new machines would exceed max_machines.
+        """
+        n = len(machine_ids)
+        if n == 0:
+            return 0
+        values = np.asarray(values, dtype=np.float64).reshape(n, len(CHANNELS))
+        timestamps = np.asarray(timestamps, dtype=np.float64).reshape(n)
+        cap = self.capacity
+
+        with self._lock:
+            if self.max_machines is not None:
+                new_ids = set(machine_ids).difference(self._index)
+                if len(self._machine_ids) + len(new_ids) > self.max_machines:
+                    raise ValueError(
+                        f"Sensor store is full ({self.max_machines} machines); "
+                        f"rejected batch with {len(new_ids)} new machine ID(s)"
+                    )
+            rows = np.fromiter((self._row(m) for m in machine_ids), dtype=np.int64, count=n)
+
+            # Rank each sample within its machine, preserving arrival order
+            order = np.argsort(rows, kind="stable")
+            sorted_rows = rows[order]
+            starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+            sizes = np.diff(np.r_[starts, n])
+            rank = np.arange(n) - np.repeat(starts, sizes)
+            overflow = np.repeat(np.maximum(sizes - cap, 0), sizes)
+            keep = rank >= overflow
+            sel = order[keep]
+            r = sorted_rows[keep]
+            slot = (self._head[r] + (rank - overflow)[keep]) % cap
+
+            new = values[sel]
+            new_ok = ~np.isnan(new)
+            old = self._values[r, :, slot].astype(np.float64)
+            old_ok = ~np.isnan(old)
+
+            # Running window sums: drop the evicted samples, add the new ones
+            delta = np.where(new_ok, new, 0.0) - np.where(old_ok, old, 0.0)
+            delta_sq = np.where(new_ok, new * new, 0.0) - np.where(old_ok, old * old, 0.0)
+            np.add.at(self._sum, r, delta)
+            np.add.at(self._sumsq, r, delta_sq)
+            np.add.at(self._valid, r, new_ok.astype(np.int64) - old_ok.astype(np.int64))
+
+            self._values[r, :, slot] = new
+            self._timestamps[r, slot] = timestamps[sel]
+
+            touched, counts = np.unique(r, return_counts=True)
+            self._head[touched] = (self._head[touched] + counts) % cap
+            self._filled[touched] = np.minimum(self._filled[touched] + counts, cap)
+            np.maximum.at(self._last_ts, r, timestamps[sel])
+            self._version += 1
+            self._row_version[touched] = self._version
+
+            # Latest value per channel = last reported (non-NaN) sample in this batch
+            last_pos = np.full((self._values.shape[0], len(CHANNELS)), -1, dtype=np.int64)
+            pos_rows, pos_cols = np.nonzero(new_ok)
+            np.maximum.at(last_pos, (r[pos_rows], pos_cols), pos_rows)
+            hit_rows, hit_cols = np.nonzero(last_pos >= 0)
+            self._latest[hit_rows, hit_cols] = new[last_pos[hit_rows, hit_cols], hit_cols]
+
+        return int(len(sel))
+
+    # ---- Reads ----
+
+    def machines(self) -> list[str]:
+        with self._lock:
+            return list(self._machine_ids)
+
+    def changed_since(self, version: int) -> tuple[int, list[str]]:
+        """(current version, machines that received samples after `version`)."""
+        with self._lock:
+            n = len(self._machine_ids)
+            rows = np.flatnonzero(self._row_version[:n] > version)
+            return self._version, [self._machine_ids[i] for i in rows]
+
+    def latest(self, machine_id: str) -> Optional[dict]:
+        """Most recent reported value of each channel, or None if no samples."""
+        with self._lock:
+            row = self._index.get(machine_id.upper())
+            if row is None or self._filled[row] == 0:
+                return None
+            latest = self._latest[row]
+            return {
+                "timestamp": float(self._last_ts[row]),
+                "readings": {
+                    name: (None if np.isnan(latest[i]) else round(float(latest[i]), 3))
+                    for i, name in enumerate(CHANNELS)
+                },
+            }
+
+    def window_stats(self, machine_id: str) -> Optional[dict]:
+        """Mean/std/count of each channel over the machine's current buffer window."""
+        with self._lock:
+            row = self._index.get(machine_id.upper())
+            if row is None or self._filled[row] == 0:
+                return None
+            stats = {}
+            for i, name in enumerate(CHANNELS):
+                count = int(self._valid[row, i])
+                if count == 0:
+                    stats[name] = {"mean": None, "std": None, "count": 0}
+                    continue
+                mean = self._sum[row, i] / count
+                var = max(self._sumsq[row, i] / count - mean * mean, 0.0)
+                stats[name] = {"mean": round(float(mean), 3), "std": round(float(np.sqrt(var)), 3), "count": count}
+            return {"window_samples": int(self._filled[row]), "channels": stats}
+
+    def drift_view(self, recent: int) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized view over all machines for anomaly detection, computed in one pass.
+        Returns (machine_ids, recent_mean, window_mean, window_std, window_count), each
+        array shaped (machines, channels); recent_mean averages the newest `recent` samples.
+        """
+        with self._lock:
+            n = len(self._machine_ids)
+            if n == 0:
+                empty = np.empty((0, len(CHANNELS)))
+                return [], empty, empty, empty, empty.astype(np.int64)
+            recent = max(1, min(recent, self.capacity))
+            # Slots of the newest `recent` samples per machine: (n, recent)
+            slots = (self._head[:n, None] - 1 - np.arange(recent)[None, :]) % self.capacity
+            fresh = np.arange(recent)[None, :] < self._filled[:n, None]
+            window = self._values[np.arange(n)[:, None], :, slots]  # (n, recent, channels)
+            window = np.where(fresh[:, :, None], window, np.nan)
+            counts = self._valid[:n].copy()
+            sums, sumsq = self._sum[:n].copy(), self._sumsq[:n].copy()
+            machine_ids = list(self._machine_ids)
+
+        ok = ~np.isnan(window)
+        recent_n = ok.sum(axis=1)
+        recent_mean = np.where(ok, window, 0.0).sum(axis=1) / np.maximum(recent_n, 1)
+        recent_mean[recent_n == 0] = np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums / counts
+            std = np.sqrt(np.maximum(sumsq / counts - mean * mean, 0.0))
+        return machine_ids, recent_mean, mean, std, counts
+
+
+_store: Optional[SensorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_sensor_store() -> SensorStore:
+    """Return the process-wide sensor store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SensorStore(SENSOR_BUFFER_SIZE, SENSOR_INITIAL_MACHINES, SENSOR_MAX_MACHINES)
+    return _store
+
+
+def live_sensor_snapshot(machine_id: str) -> Optional[dict]:
+    """Latest readings plus window stats for a machine, or None if it has no live data."""
+    store = get_sensor_store()
+    latest = store.latest(machine_id)
+    if latest is None:
+        return None
+    return {**latest, "window": store.window_stats(machine_id)}
@@ -0,0 +1,156 @@
+"""Read access to plant data (work orders, equipment, materials, knowledge base, policies).
+
+Two backends, chosen by DATA_BACKEND:
+
+- "json" reads the pretty-printed files in app/data on every call.
+- "sqlite" reads a database built once from those files by
+  scripts/convert_data_to_sqlite.py. Each dataset is a table of compact JSON
+  documents keyed by the record ID, with case-insensitive indexes on the fields
+  the skills filter on, so ID and status lookups decode only the matching rows.
+  Connections are read-only and memory-map the file, so every worker process
+  shares the same pages through the OS page cache.
+
+Both backends return fresh objects on every call; callers may modify them.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from app.config import DATA_BACKEND, DATA_DIR, SQLITE_DATA_PATH, SQLITE_MMAP_BYTES
+
+# dataset -> (JSON file, record key field, indexed fields). Datasets without a key
+# field are JSON objects whose top-level keys become the record keys.
+DATASETS: dict[str, tuple[str, Optional[str], tuple[str, ...]]] = {
+    "work_orders": ("work_orders.json", "work_order_id",
+                    ("status", "priority", "customer", "product_name", "machine_assigned", "material_id")),
+    "equipment": ("equipment.json", "machine_id", ("status", "type", "name")),
+    "materials": ("materials.json", "material_id", ("category", "name")),
+    "knowledge_base": ("knowledge_base.json", "id", ("category",)),
+    "faqs": ("faqs.json", "id", ("category",)),
+    "orders": ("orders.json", "order_id", ("status", "customer_name")),
+    "manufacturing_policies": ("manufacturing_policies.json", None, ()),
+    "policies": ("policies.json", None, ()),
+}
+
+_local = threading.local()
+
+
+def _spec(dataset: str) -> tuple[str, Optional[str], tuple[str, ...]]:
+    if dataset not in DATASETS:
+        raise KeyError(f"Unknown dataset '{dataset}'")
+    return DATASETS[dataset]
+
+
+def _read_json(dataset: str) -> Any:
+    with open(os.path.join(DATA_DIR, _spec(dataset)[0]), "r") as f:
+        return json.load(f)
+
+
+def _connection() -> sqlite3.Connection:
+    # One read-only connection per thread (tools run on executor threads), reopened
+    # when the converter has replaced the file
+    if not os.path.exists(SQLITE_DATA_PATH):
+        raise FileNotFoundError(
+            f"{SQLITE_DATA_PATH} not found; run scripts/convert_data_to_sqlite.py or set DATA_BACKEND=json"
+        )
+    version = os.stat(SQLITE_DATA_PATH).st_mtime_ns
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.version != version:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"file:{SQLITE_DATA_PATH}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_BYTES)}")
+        _local.conn, _local.version = conn, version
+    return conn
+
+
+def dataset_version(dataset: str) -> int:
+    """Changes whenever the dataset's backing file is rewritten (mtime in ns), so
+    callers can cache derived structures such as indexes."""
+    if DATA_BACKEND != "sqlite":
+        return os.stat(os.path.join(DATA_DIR, _spec(dataset)[0])).st_mtime_ns
+    return os.stat(SQLITE_DATA_PATH).st_mtime_ns
+
+
+def load_records(dataset: str) -> Any:
+    """Every record of a dataset: a list of dicts, or a dict for keyless datasets (policies)."""
+    if DATA_BACKEND != "sqlite":
+        return _read_json(dataset)
+    _, key_field, _ = _spec(dataset)
+    rows = _connection().execute(f'SELECT key, doc FROM "{dataset}" ORDER BY pos').fetchall()
+    if key_field is None:
+        return {key: json.loads(doc) for key, doc in rows}
+    return [json.loads(doc) for _, doc in rows]
+
+
+def get_record(dataset: str, key: str) -> Optional[dict]:
+    """The record whose key field equals `key` (case-insensitive), or None."""
+    _, key_field, _ = _spec(dataset)
+    if DATA_BACKEND != "sqlite":
+        data = _read_json(dataset)
+        if key_field is None:
+            return next((v for k, v in data.items() if k.lower() == key.lower()), None)
+        return next((r for r in data if str(r.get(key_field, "")).lower() == key.lower()), None)
+    row = _connection().execute(f'SELECT doc FROM "{dataset}" WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def find_records(dataset: str, field: str, value: str) -> list[dict]:
+    """Records whose indexed `field` equals `value` (case-insensitive), in file order."""
+    _, _, indexed = _spec(dataset)
+    if field not in indexed:
+        raise ValueError(f"'{field}' is not an indexed field of {dataset}")
+    if DATA_BACKEND != "sqlite":
+        return [r for r in _read_json(dataset) if str(r.get(field, "")).lower() == value.lower()]
+    rows = _connection().execute(
+        f'SELECT doc FROM "{dataset}" WHERE "{field}" = ? ORDER BY pos', (value,)
+    ).fetchall()
+    return [json.loads(doc) for (doc,) in rows]
+
+
+def convert_json_to_sqlite(data_dir: str = DATA_DIR, db_path: str = SQLITE_DATA_PATH) -> dict[str, int]:
+    """Build the SQLite database from the JSON files and atomically replace `db_path`.
+    Returns the row count per dataset; readers reopen the new file on their next query."""
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    counts = {}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("CREATE TABLE datasets (name TEXT PRIMARY KEY, source TEXT, source_mtime REAL, rows INTEGER)")
+        for dataset, (filename, key_field, indexed) in DATASETS.items():
+            source = os.path.join(data_dir, filename)
+            if not os.path.exists(source):
+                continue
+            with open(source, "r") as f:
+                data = json.load(f)
+            items = list(data.items()) if key_field is None else [(r[key_field], r) for r in data]
+
+            columns = "".join(f', "{c}" TEXT COLLATE NOCASE' for c in indexed)
+            conn.execute(
+                f'CREATE TABLE "{dataset}" (pos INTEGER PRIMARY KEY, key TEXT COLLATE NOCASE, doc TEXT NOT NULL{columns})'
+            )
+            placeholders = ", ".join("?" * (3 + len(indexed)))
+            conn.executemany(
+                f'INSERT INTO "{dataset}" VALUES ({placeholders})',
+                (
+                    (pos, str(key), json.dumps(doc, separators=(",", ":")),
+                     *(None if doc.get(c) is None else str(doc[c]) for c in indexed))
+                    for pos, (key, doc) in enumerate(items)
+                ),
+            )
+            conn.execute(f'CREATE INDEX "{dataset}_key" ON "{dataset}" (key)')
+            for c in indexed:
+                conn.execute(f'CREATE INDEX "{dataset}_{c}" ON "{dataset}" ("{c}")')
+            conn.execute("INSERT INTO datasets VALUES (?, ?, ?, ?)",
+                         (dataset, filename, os.path.getmtime(source), len(items)))
+            counts[dataset] = len(items)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return counts
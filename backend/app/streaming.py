@@ -0,0 +1,181 @@
+"""Resumable chat executions.
+
+A chat request's agent stream runs as a background task that publishes its SSE
+events into a bounded per-conversation replay buffer. Each event gets an id that
+increases across a conversation's executions, so a client whose connection
+dropped can reattach with Last-Event-ID and receive only what it missed, from a
+still-running or recently finished execution, instead of re-running the
+planner, agent and tools.
+
+An execution with no attached client is cancelled after SSE_RESUME_GRACE_SECONDS
+(see app.cancellation for how that reaches the graph, LLM calls and tools).
+"""
+import asyncio
+import contextlib
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+
+from app.cancellation import cancel_token
+from app.config import (
+    SSE_DISCONNECT_POLL_SECONDS, SSE_REPLAY_BUFFER_SIZE,
+    SSE_RESUME_GRACE_SECONDS, SSE_REPLAY_TTL_SECONDS,
+)
+
+
+def _format_gap(missed_from: int, missed_to: int) -> str:
+    return f"event: replay_gap\ndata: {json.dumps({'missed_from': missed_from, 'missed_to': missed_to})}\n\n"
+
+
+class Execution:
+    """One agent run: its task, cancel token and replay buffer of (event_id, sse_chunk)."""
+
+    def __init__(self, conversation_id: str, first_event_id: int, buffer_size: int):
+        self.conversation_id = conversation_id
+        self.first_event_id = first_event_id
+        self.events: deque[tuple[int, str]] = deque(maxlen=buffer_size)
+        self.next_event_id = first_event_id
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.cancel_token = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+        self._subscribers = 0
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, stream: AsyncIterator[str]) -> None:
+        self.task = asyncio.create_task(self._run(stream))
+        # Nobody may ever attach (e.g. the POST response failed); don't run forever
+        self._schedule_idle_cancel()
+
+    async def _run(self, stream: AsyncIterator[str]) -> None:
+        cancel_token.set(self.cancel_token)
+        try:
+            async for chunk in stream:
+                await self._publish(chunk)
+        finally:
+            self.done = True
+            self.finished_at = time.monotonic()
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _publish(self, chunk: str) -> None:
+        event_id = self.next_event_id
+        self.next_event_id += 1
+        self.events.append((event_id, f"id: {event_id}\n{chunk}"))
+        async with self._changed:
+            self._changed.notify_all()
+
+    def cancel(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.cancel_token.set()
+            self.task.cancel()
+
+    def _schedule_idle_cancel(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = asyncio.get_running_loop().call_later(SSE_RESUME_GRACE_SECONDS, self._cancel_if_idle)
+
+    def _cancel_if_idle(self) -> None:
+        self._idle_timer = None
+        if self._subscribers == 0:
+            self.cancel()
+
+    async def subscribe(self, http_request: Request, last_event_id: int = 0) -> AsyncIterator[str]:
+        """Yield buffered events after `last_event_id`, then live ones until the run ends
+        or the client disconnects. `http_request` only needs an async is_disconnected(),
+        so a /ws/chat connection can subscribe too."""
+        self._subscribers += 1
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        position = last_event_id
+        try:
+            while True:
+                expected = max(position + 1, self.first_event_id)
+                if self.events and self.events[0][0] > expected:
+                    # The client fell behind further than the buffer reaches back
+                    yield _format_gap(expected, self.events[0][0] - 1)
+                pending = [(i, chunk) for i, chunk in self.events if i > position]
+                for event_id, chunk in pending:
+                    yield chunk
+                    position = event_id
+                if pending and await http_request.is_disconnected():
+                    return
+                if self.done and (not self.events or self.events[-1][0] <= position):
+                    return
+                async with self._changed:
+                    if self.events and self.events[-1][0] > position or self.done:
+                        continue
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=SSE_DISCONNECT_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                if await http_request.is_disconnected():
+                    return
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self.done:
+                self._schedule_idle_cancel()
+
+
+_executions: dict[str, Execution] = {}
+
+
+def _prune() -> None:
+    now = time.monotonic()
+    expired = [
+        cid for cid, ex in _executions.items()
+        if ex.done and now - ex.finished_at > SSE_REPLAY_TTL_SECONDS
+    ]
+    for cid in expired:
+        del _executions[cid]
+
+
+class ConversationBusy(Exception):
+    """The conversation already has a running execution."""
+
+
+def start_execution(conversation_id: str, stream: AsyncIterator[str]) -> Execution:
+    """Run `stream` in the background as the conversation's current execution.
+    Raises ConversationBusy while a previous execution is still running: two runs would
+    append to the same history and hand out overlapping event ids."""
+    _prune()
+    previous = _executions.get(conversation_id)
+    if previous is not None and not previous.done:
+        raise ConversationBusy(
+            f"Conversation {conversation_id} is still answering; wait for it to finish or cancel it"
+        )
+    first_event_id = previous.next_event_id if previous else 1
+    execution = Execution(conversation_id, first_event_id, SSE_REPLAY_BUFFER_SIZE)
+    _executions[conversation_id] = execution
+    execution.start(stream)
+    return execution
+
+
+def get_execution(conversation_id: str) -> Optional[Execution]:
+    """The conversation's running or recently finished execution, if still retained."""
+    _prune()
+    return _executions.get(conversation_id)
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID as an int (0 = replay from the start of the buffer)."""
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        return 0
+
+
+async def cancel_all() -> None:
+    """Cancel every running execution (server shutdown)."""
+    running = [ex for ex in _executions.values() if ex.task is not None and not ex.task.done()]
+    for execution in running:
+        execution.cancel()
+    for execution in running:
+        with contextlib.suppress(asyncio.CancelledError):
+            await execution.task
@@ -0,0 +1,307 @@
+"""Change subscriptions: push work-order and machine diffs instead of polling the agent.
+
+A client registers interest in work-order IDs, machine IDs and/or statuses
+(POST /api/subscriptions, or a "subscribe" command on /ws/chat) and receives a
+"snapshot" of the matching entities followed by a "change" event whenever one
+of them changes.
+
+The ChangeFeed keeps a versioned snapshot of every work order and machine as
+clients see them: work orders with journaled NCR counts applied, machines with
+their latest live sensor readings. Each source has a cheap version: the data
+file's mtime (storage.dataset_version), the NCR journal's last sequence number
+and the sensor store's per-machine ingest version. A poll rebuilds only what a
+moved version covers (every record after a file reload, the work orders whose
+NCR count changed, the machines that received samples) and diffs those
+entities field by field against the snapshot. Each change gets the next feed
+version, used as the SSE event id, and recent changes are kept so a client can
+resume after the last version it saw; one that fell further behind gets a
+fresh snapshot.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.config import (
+    SSE_DISCONNECT_POLL_SECONDS, SUBSCRIPTION_HISTORY,
+    SUBSCRIPTION_IDLE_TTL_SECONDS, SUBSCRIPTION_POLL_SECONDS,
+)
+from app.ncr_journal import get_ncr_journal
+from app.storage import dataset_version, load_records
+
+logger = logging.getLogger(__name__)
+
+
+def _flatten(record: dict, prefix: str = "") -> dict:
+    """Nested dicts as dotted paths, so a diff names the field that changed."""
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _diff(old: dict, new: dict) -> dict:
+    return {
+        key: {"old": old.get(key), "new": new.get(key)}
+        for key in sorted(old.keys() | new.keys())
+        if old.get(key) != new.get(key)
+    }
+
+
+@dataclass
+class Subscription:
+    id: str
+    work_order_ids: frozenset[str]
+    machine_ids: frozenset[str]
+    statuses: frozenset[str]
+    streams: int = 0
+    last_active: float = field(default_factory=time.monotonic)
+
+    def matches(self, entity: str, entity_id: str, *statuses: Optional[str]) -> bool:
+        ids = self.work_order_ids if entity == "work_order" else self.machine_ids
+        return entity_id in ids or any(s and s.lower() in self.statuses for s in statuses)
+
+    def describe(self) -> dict:
+        return {
+            "subscription_id": self.id,
+            "work_order_ids": sorted(self.work_order_ids),
+            "machine_ids": sorted(self.machine_ids),
+            "statuses": sorted(self.statuses),
+            "stream_url": f"/api/subscriptions/{self.id}/stream",
+        }
+
+
+class ChangeFeed:
+    """Versioned snapshot of work orders and machines, and the changes between versions."""
+
+    def __init__(self, history: int = 1000):
+        self.version = 0
+        self.changes: deque[dict] = deque(maxlen=history)
+        self._entities: dict[tuple[str, str], dict] = {}
+        self._source_versions: dict[str, int] = {}
+        self._work_orders: dict[str, dict] = {}
+        self._equipment: dict[str, dict] = {}
+        self._defect_counts: dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _work_order_view(self, work_order_id: str) -> Optional[dict]:
+        record = self._work_orders.get(work_order_id)
+        if record is None:
+            return None
+        view = _flatten(record)
+        view["defects_found"] = view.get("defects_found", 0) + self._defect_counts.get(work_order_id, 0)
+        return view
+
+    def _machine_view(self, machine_id: str) -> Optional[dict]:
+        # Imported lazily so numpy is only loaded once the change feed runs
+        from app.sensors import get_sensor_store
+
+        record = self._equipment.get(machine_id)
+        live = get_sensor_store().latest(machine_id)
+        if record is None and live is None:
+            return None
+        view = _flatten(record) if record else {"machine_id": machine_id}
+        if live is not None:
+            view.update({f"live.{channel}": value for channel, value in live["readings"].items()})
+        return view
+
+    def _reload(self, dataset: str, key_field: str, entity: str, current: dict,
+                dirty: dict[tuple[str, str], str]) -> dict:
+        version = dataset_version(dataset)
+        if version == self._source_versions.get(dataset):
+            return current
+        records = {str(r[key_field]).upper(): r for r in load_records(dataset)}
+        for key in records.keys() | current.keys():
+            dirty.setdefault((entity, key), "data_file")
+        self._source_versions[dataset] = version
+        return records
+
+    def poll(self) -> list[dict]:
+        """Rebuild the entities whose source version moved and record what changed.
+        The first call only takes the baseline snapshot."""
+        from app.sensors import get_sensor_store
+
+        with self._lock:
+            dirty: dict[tuple[str, str], str] = {}  # entity -> source that changed it
+            self._work_orders = self._reload("work_orders", "work_order_id", "work_order", self._work_orders, dirty)
+            self._equipment = self._reload("equipment", "machine_id", "machine", self._equipment, dirty)
+
+            journal = get_ncr_journal()
+            seq = journal.last_seq()
+            if seq != self._source_versions.get("ncr"):
+                counts = journal.defect_counts()
+                for work_order_id in counts.keys() | self._defect_counts.keys():
+                    if counts.get(work_order_id) != self._defect_counts.get(work_order_id):
+                        dirty.setdefault(("work_order", work_order_id), "ncr")
+                self._defect_counts = counts
+                self._source_versions["ncr"] = seq
+
+            sensor_version, machines = get_sensor_store().changed_since(self._source_versions.get("sensors", 0))
+            for machine_id in machines:
+                dirty.setdefault(("machine", machine_id), "sensors")
+            self._source_versions["sensors"] = sensor_version
+
+            changes = []
+            timestamp = datetime.now().isoformat()
+            for (entity, entity_id), source in sorted(dirty.items()):
+                if entity == "work_order":
+                    new = self._work_order_view(entity_id)
+                else:
+                    new = self._machine_view(entity_id)
+                old = self._entities.get((entity, entity_id))
+                if new is None:
+                    self._entities.pop((entity, entity_id), None)
+                else:
+                    self._entities[(entity, entity_id)] = new
+                if not self._loaded or old == new:
+                    continue
+                self.version += 1
+                change = {
+                    "version": self.version,
+                    "entity": entity,
+                    "id": entity_id,
+                    "change": "added" if old is None else "removed" if new is None else "updated",
+                    "source": source,
+                    "status": (new or old).get("status"),
+                    "fields": {} if new is None else _diff(old or {}, new),
+                    "timestamp": timestamp,
+                }
+                if old and new and old.get("status") != new.get("status"):
+                    change["previous_status"] = old.get("status")
+                changes.append(change)
+            self.changes.extend(changes)
+            self._loaded = True
+            return changes
+
+    def current(self, subscription: Subscription) -> tuple[int, list[dict]]:
+        """(version, matching entities) of the current snapshot."""
+        if not self._loaded:
+            self.poll()
+        with self._lock:
+            entities = [
+                {"entity": entity, "id": entity_id, "fields": view}
+                for (entity, entity_id), view in sorted(self._entities.items())
+                if subscription.matches(entity, entity_id, view.get("status"))
+            ]
+            return self.version, entities
+
+    def changes_after(self, version: int) -> Optional[list[dict]]:
+        """Changes newer than `version`, or None if some of them are no longer retained."""
+        with self._lock:
+            if version > self.version or (self.changes and self.changes[0]["version"] > version + 1):
+                return None
+            return [c for c in self.changes if c["version"] > version]
+
+
+_feed: Optional[ChangeFeed] = None
+_feed_lock = threading.Lock()
+_subscriptions: dict[str, Subscription] = {}
+# One per attached stream, set after a poll that produced changes
+_waiters: set[asyncio.Event] = set()
+
+
+def get_change_feed() -> ChangeFeed:
+    """Return the process-wide change feed, creating it on first use."""
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                _feed = ChangeFeed(SUBSCRIPTION_HISTORY)
+    return _feed
+
+
+def _prune() -> None:
+    now = time.monotonic()
+    expired = [
+        sid for sid, sub in _subscriptions.items()
+        if sub.streams == 0 and now - sub.last_active > SUBSCRIPTION_IDLE_TTL_SECONDS
+    ]
+    for sid in expired:
+        del _subscriptions[sid]
+
+
+def create_subscription(work_order_ids: list[str], machine_ids: list[str], statuses: list[str]) -> Subscription:
+    """Register interest in entities; raises ValueError if nothing is selected."""
+    if not (work_order_ids or machine_ids or statuses):
+        raise ValueError("Subscribe to at least one work order ID, machine ID or status")
+    _prune()
+    subscription = Subscription(
+        id=str(uuid.uuid4()),
+        work_order_ids=frozenset(i.strip().upper() for i in work_order_ids if i.strip()),
+        machine_ids=frozenset(i.strip().upper() for i in machine_ids if i.strip()),
+        statuses=frozenset(s.strip().lower() for s in statuses if s.strip()),
+    )
+    _subscriptions[subscription.id] = subscription
+    return subscription
+
+
+def get_subscription(subscription_id: str) -> Optional[Subscription]:
+    _prune()
+    return _subscriptions.get(subscription_id)
+
+
+def delete_subscription(subscription_id: str) -> bool:
+    return _subscriptions.pop(subscription_id, None) is not None
+
+
+async def stream_subscription(subscription: Subscription, after_version: Optional[int],
+                              is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[tuple[str, int, dict]]:
+    """Yield (event type, version, data): a "snapshot" of the matching entities (skipped when
+    resuming within the retained history), then every matching "change", until the client
+    disconnects or the subscription is deleted."""
+    feed = get_change_feed()
+    waiter = asyncio.Event()
+    _waiters.add(waiter)
+    subscription.streams += 1
+    position = after_version
+    try:
+        while subscription.id in _subscriptions:
+            waiter.clear()
+            pending = feed.changes_after(position) if position is not None else None
+            if pending is None:
+                position, entities = await asyncio.to_thread(feed.current, subscription)
+                yield "snapshot", position, {
+                    "subscription_id": subscription.id, "version": position, "entities": entities,
+                }
+                continue
+            for change in pending:
+                position = change["version"]
+                if subscription.matches(change["entity"], change["id"], change["status"],
+                                        change.get("previous_status")):
+                    yield "change", position, change
+            subscription.last_active = time.monotonic()
+            if await is_disconnected():
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=SSE_DISCONNECT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _waiters.discard(waiter)
+        subscription.streams -= 1
+        subscription.last_active = time.monotonic()
+
+
+async def run_change_feed_job() -> None:
+    """Background loop: while anyone is subscribed, poll the feed every
+    SUBSCRIPTION_POLL_SECONDS and wake the attached streams when something changed."""
+    feed = get_change_feed()
+    while True:
+        _prune()
+        if _subscriptions:
+            try:
+                if await asyncio.to_thread(feed.poll):
+                    for waiter in list(_waiters):
+                        waiter.set()
+            except Exception:
+                logger.exception("Change feed poll failed")
+        await asyncio.sleep(SUBSCRIPTION_POLL_SECONDS)
@@ -0,0 +1,298 @@
+"""Chat over one WebSocket for many conversations.
+
+Control-room dashboards keep several conversations open at once. Instead of a
+POST /api/chat and an SSE stream for each, a client opens /ws/chat and sends
+JSON commands:
+
+    {"type": "chat", "request_id": "r1", "message": "...", "conversation_id": "...",
+     "chart_format": "png", "chart_size": "thumbnail", "chart_mode": "image"}
+    {"type": "resume", "conversation_id": "...", "last_event_id": 42}
+    {"type": "cancel", "conversation_id": "..."}
+    {"type": "ack", "seq": 128}
+    {"type": "subscribe", "work_order_ids": [...], "machine_ids": [...], "statuses": [...]}
+    {"type": "subscribe", "subscription_id": "...", "after_version": 17}
+    {"type": "unsubscribe", "subscription_id": "..."}
+
+A chat starts the same background execution as /api/chat, so a conversation can
+be resumed over either transport. Its events arrive as
+{"type": "event", "conversation_id", "id", "event", "data"} frames with the same
+event types and payloads as the SSE stream. "started" acknowledges a chat (with
+its request_id and conversation_id), "end" follows a conversation's last event,
+and "error" reports a rejected command. Subscriptions (app.subscriptions) send
+{"type": "update", "subscription_id", "id", "event", "data"} frames, "id" being
+the feed version to resume after.
+
+Flow control: frames wait in a per-connection outbox drained by one writer.
+A client that connects with ?window=N gets a "seq" number on every frame and
+acknowledges the frames it has processed with "ack"; the writer sends at most N
+unacknowledged frames. Without a window, the writer is only held back by the
+socket's send buffer. While the writer is held back, a conversation's
+consecutive `message` (token) events still waiting in the outbox are merged
+into one frame carrying the newest event id, so a slow client gets fewer,
+larger frames rather than a growing backlog. At WS_MAX_PENDING_FRAMES queued
+frames, conversations stop reading from their executions until the writer
+catches up; the executions keep running into their replay buffers.
+
+Compression is the permessage-deflate WebSocket extension, which uvicorn
+negotiates whenever the client offers it (--ws-per-message-deflate, on by default).
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Callable, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app import metrics
+from app.config import WS_MAX_PENDING_FRAMES
+from app.models import ChatRequest
+from app.streaming import ConversationBusy, Execution, get_execution, parse_last_event_id
+from app.subscriptions import (
+    Subscription, create_subscription, delete_subscription, get_subscription, stream_subscription,
+)
+
+
+def parse_sse(chunk: str) -> tuple[Optional[int], str, dict]:
+    """(id, event type, data) of one SSE chunk as produced by _format_sse and Execution."""
+    event_id, event_type, data = None, "message", {}
+    for line in chunk.splitlines():
+        field, _, value = line.partition(": ")
+        if field == "id":
+            event_id = int(value)
+        elif field == "event":
+            event_type = value
+        elif field == "data":
+            data = json.loads(value)
+    return event_id, event_type, data
+
+
+class _Outbox:
+    """Frames waiting to be sent, merging a conversation's queued token events."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.frames: deque[dict] = deque()
+        # conversation_id -> its newest frame still in the queue
+        self._last: dict[str, dict] = {}
+        self._ready = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def _merge(self, frame: dict) -> bool:
+        last = self._last.get(frame.get("conversation_id"))
+        if frame.get("event") != "message" or last is None or last.get("event") != "message":
+            return False
+        last["data"]["content"] += frame["data"].get("content", "")
+        last["data"]["timestamp"] = frame["data"].get("timestamp")
+        last["id"] = frame["id"]
+        metrics.incr("ws_chat_frames_coalesced")
+        return True
+
+    def put_nowait(self, frame: dict) -> None:
+        """Queue a frame regardless of the limit (control frames)."""
+        if self._merge(frame):
+            return
+        self.frames.append(frame)
+        if frame.get("conversation_id"):
+            self._last[frame["conversation_id"]] = frame
+        self._ready.set()
+
+    async def put(self, frame: dict) -> None:
+        """Queue an event frame, waiting while the outbox is full."""
+        if self._merge(frame):
+            return
+        while len(self.frames) >= self.max_pending:
+            self._not_full.clear()
+            await self._not_full.wait()
+        self.put_nowait(frame)
+
+    async def get(self) -> dict:
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self.frames.popleft()
+        if self._last.get(frame.get("conversation_id")) is frame:
+            del self._last[frame["conversation_id"]]
+        if len(self.frames) < self.max_pending:
+            self._not_full.set()
+        return frame
+
+
+class ChatConnection:
+    """One /ws/chat client: its outbox, writer task and one forwarding task per conversation."""
+
+    def __init__(self, websocket: WebSocket, start_chat: Callable[[ChatRequest], Execution],
+                 max_pending: int = WS_MAX_PENDING_FRAMES):
+        self.websocket = websocket
+        self.start_chat = start_chat
+        self.outbox = _Outbox(max_pending)
+        self.subscriptions: dict[str, asyncio.Task] = {}
+        self.watches: dict[str, asyncio.Task] = {}  # change subscription id -> forwarding task
+        self.closed = False
+        try:
+            self.window = max(int(websocket.query_params.get("window", 0)), 0)
+        except ValueError:
+            self.window = 0
+        self.sent = 0
+        self.acked = 0
+        self._credit = asyncio.Event()
+
+    async def is_disconnected(self) -> bool:
+        # Execution.subscribe polls this like it polls an HTTP request
+        return self.closed
+
+    async def run(self) -> None:
+        await self.websocket.accept()
+        metrics.incr("ws_chat_connections")
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("text") is None:
+                    self._error({}, "Binary frames are not supported; send commands as JSON text")
+                    continue
+                try:
+                    command = json.loads(message["text"])
+                except ValueError as e:
+                    self._error({}, f"Invalid JSON: {e}")
+                    continue
+                self._handle(command)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Executions keep running for their resume grace period, like a dropped SSE client
+            self.closed = True
+            tasks = [writer, *self.subscriptions.values(), *self.watches.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _handle(self, command) -> None:
+        if not isinstance(command, dict):
+            self._error({}, "Commands must be JSON objects")
+            return
+        kind = command.get("type")
+        if kind == "chat":
+            try:
+                execution = self.start_chat(ChatRequest.model_validate(command))
+            except (ValueError, ConversationBusy) as e:
+                self._error(command, str(e))
+                return
+            self.outbox.put_nowait({
+                "type": "started",
+                "request_id": command.get("request_id"),
+                "conversation_id": execution.conversation_id,
+            })
+            self._subscribe(execution, execution.first_event_id - 1)
+        elif kind == "ack":
+            try:
+                self.acked = min(max(self.acked, int(command.get("seq", 0))), self.sent)
+            except (TypeError, ValueError):
+                self._error(command, "ack needs an integer seq")
+                return
+            self._credit.set()
+        elif kind == "subscribe":
+            self._watch(command)
+        elif kind == "unsubscribe":
+            subscription_id = str(command.get("subscription_id"))
+            task = self.watches.pop(subscription_id, None)
+            if task is not None:
+                task.cancel()
+            if not delete_subscription(subscription_id) and task is None:
+                self._error(command, f"Subscription {subscription_id} not found or expired")
+        elif kind in ("resume", "cancel"):
+            execution = get_execution(str(command.get("conversation_id")))
+            if execution is None:
+                self._error(command, f"No active or recent execution for conversation {command.get('conversation_id')}")
+            elif kind == "cancel":
+                execution.cancel()
+            else:
+                self._subscribe(execution, parse_last_event_id(str(command.get("last_event_id") or "")))
+        else:
+            self._error(command, f"Unknown command type '{kind}'. Use chat, resume, cancel, ack, subscribe or unsubscribe.")
+
+    def _error(self, command: dict, message: str) -> None:
+        self.outbox.put_nowait({
+            "type": "error",
+            "request_id": command.get("request_id"),
+            "conversation_id": command.get("conversation_id"),
+            "message": message,
+        })
+
+    def _watch(self, command: dict) -> None:
+        if command.get("subscription_id"):
+            subscription = get_subscription(str(command["subscription_id"]))
+            if subscription is None:
+                self._error(command, f"Subscription {command['subscription_id']} not found or expired")
+                return
+        else:
+            try:
+                subscription = create_subscription(
+                    list(command.get("work_order_ids") or []),
+                    list(command.get("machine_ids") or []),
+                    list(command.get("statuses") or []),
+                )
+            except (TypeError, ValueError, AttributeError) as e:
+                self._error(command, str(e))
+                return
+        try:
+            after_version = None if command.get("after_version") is None else int(command["after_version"])
+        except (TypeError, ValueError):
+            self._error(command, "after_version must be an integer")
+            return
+        self.outbox.put_nowait({"type": "subscribed", "request_id": command.get("request_id"),
+                                **subscription.describe()})
+        previous = self.watches.pop(subscription.id, None)
+        if previous is not None:
+            previous.cancel()
+        self.watches[subscription.id] = asyncio.create_task(self._forward_changes(subscription, after_version))
+
+    async def _forward_changes(self, subscription: Subscription, after_version: Optional[int]) -> None:
+        async for event_type, version, data in stream_subscription(subscription, after_version, self.is_disconnected):
+            await self.outbox.put({
+                "type": "update",
+                "subscription_id": subscription.id,
+                "id": version,
+                "event": event_type,
+                "data": data,
+            })
+
+    def _subscribe(self, execution: Execution, last_event_id: int) -> None:
+        # A new chat or resume in the same conversation replaces its current stream
+        previous = self.subscriptions.pop(execution.conversation_id, None)
+        if previous is not None:
+            previous.cancel()
+        self.subscriptions[execution.conversation_id] = asyncio.create_task(
+            self._forward(execution, last_event_id)
+        )
+
+    async def _forward(self, execution: Execution, last_event_id: int) -> None:
+        conversation_id = execution.conversation_id
+        position = last_event_id
+        async for chunk in execution.subscribe(self, last_event_id):
+            event_id, event_type, data = parse_sse(chunk)
+            await self.outbox.put({
+                "type": "event",
+                "conversation_id": conversation_id,
+                "id": event_id,
+                "event": event_type,
+                "data": data,
+            })
+            position = event_id if event_id is not None else position
+        self.outbox.put_nowait({"type": "end", "conversation_id": conversation_id, "last_event_id": position})
+        if self.subscriptions.get(conversation_id) is asyncio.current_task():
+            del self.subscriptions[conversation_id]
+
+    async def _write(self) -> None:
+        while True:
+            while self.window and self.sent - self.acked >= self.window:
+                self._credit.clear()
+                await self._credit.wait()
+            frame = await self.outbox.get()
+            self.sent += 1
+            if self.window:
+                frame["seq"] = self.sent
+            await self.websocket.send_text(json.dumps(frame))
+            metrics.incr("ws_chat_frames_sent")
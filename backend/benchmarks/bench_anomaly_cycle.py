@@ -0,0 +1,54 @@
+"""Per-cycle cost of the sensor anomaly detector.
+
+Run from the backend directory:
+
+    python benchmarks/bench_anomaly_cycle.py --machines 1000 --fill 600
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.anomaly import AnomalyDetector  # noqa: E402
+from app.sensors import CHANNELS, SensorStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark anomaly detection cycles")
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--capacity", type=int, default=3600)
+    parser.add_argument("--fill", type=int, default=600, help="Samples ingested per machine before timing")
+    parser.add_argument("--recent", type=int, default=10)
+    parser.add_argument("--cycles", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = SensorStore(args.capacity, args.machines)
+    machine_ids = [f"M-{i:05d}" for i in range(args.machines)]
+    baseline = rng.uniform(10, 80, size=(args.machines, len(CHANNELS)))
+    for step in range(args.fill):
+        values = baseline + rng.normal(0, 1, size=baseline.shape)
+        # Inject a vibration step on 1% of machines over the last 5% of the fill
+        if step > args.fill * 0.95:
+            values[: max(1, args.machines // 100), 1] += 8
+        store.ingest_arrays(machine_ids, np.full(args.machines, float(step)), values)
+
+    detector = AnomalyDetector(store, recent=args.recent)
+    timings = []
+    for _ in range(args.cycles):
+        start = time.perf_counter()
+        alerts = detector.run_cycle()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"machines={args.machines} channels={len(CHANNELS)} window={min(args.fill, args.capacity)} recent={args.recent}")
+    print(f"cycle ms: median {statistics.median(timings):.2f}  p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.2f}  max {max(timings):.2f}")
+    print(f"active alerts after {args.cycles} cycles: {len(alerts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Cost of a change-feed poll: nothing changed, a few machines ingested, a data file reloaded.
+
+Run from the backend directory:
+
+    python benchmarks/bench_change_feed.py
+    python benchmarks/bench_change_feed.py --machines 2000 --touched 10 50 500
+
+Feeds live samples for --machines machines into the sensor store, takes the
+baseline snapshot, then times polls where no source version moved, where only
+--touched machines received samples (only those are rebuilt and diffed), and
+where the work-order file was rewritten (every work order is diffed). The NCR
+journal is written to a temporary directory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+
+def _time(fn, repeat: int) -> tuple[float, int]:
+    changes = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        changes = len(fn())
+    return (time.perf_counter() - start) / repeat * 1000, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark change-feed polls")
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--touched", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("NCR_JOURNAL_PATH", os.path.join(tempfile.mkdtemp(), "ncr_journal.jsonl"))
+    os.environ.setdefault("SENSOR_MAX_MACHINES", str(args.machines))
+    from app.sensors import CHANNELS, get_sensor_store
+    from app.storage import DATASETS
+    from app.config import DATA_DIR
+    from app.subscriptions import ChangeFeed
+
+    store = get_sensor_store()
+    machine_ids = [f"M-{i:05d}" for i in range(args.machines)]
+    rng = np.random.default_rng(0)
+
+    def ingest(ids):
+        store.ingest_arrays(ids, np.full(len(ids), time.time()), rng.normal(50, 5, (len(ids), len(CHANNELS))))
+
+    ingest(machine_ids)
+    feed = ChangeFeed(history=100_000)
+    start = time.perf_counter()
+    feed.poll()
+    print(f"baseline snapshot of {args.machines:,} machines: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    ms, changes = _time(feed.poll, args.repeat)
+    print(f"{'no change':<28} {ms:>8.3f} ms/poll  {changes:>6} changes")
+    for touched in args.touched:
+        ids = machine_ids[:touched]
+
+        def poll_after_ingest():
+            ingest(ids)
+            return feed.poll()
+
+        ms, changes = _time(poll_after_ingest, args.repeat)
+        print(f"{f'{touched} machines ingested':<28} {ms:>8.3f} ms/poll  {changes:>6} changes  (incl. ingest)")
+
+    path = os.path.join(DATA_DIR, DATASETS["work_orders"][0])
+
+    def poll_after_reload():
+        os.utime(path, None)
+        return feed.poll()
+
+    ms, changes = _time(poll_after_reload, args.repeat)
+    print(f"{'work_orders.json reloaded':<28} {ms:>8.3f} ms/poll  {changes:>6} changes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Dashboard renders/sec with reused figure templates versus a new figure per render.
+
+Run from the backend directory:
+
+    python benchmarks/bench_chart_render.py
+    python benchmarks/bench_chart_render.py --sizes thumbnail standard --formats png webp --seconds 3
+
+"fresh" builds the figure, every artist and the layout for each render, then
+closes it (CHART_TEMPLATES=false); "template" reuses one figure per chart type
+and only replaces the data artists. Both include the data load and savefig.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.skills import chart_generator  # noqa: E402
+
+TEMPLATED = ("work_order_performance", "equipment_utilization", "defect_analysis")
+
+
+def _rate(chart_type: str, fmt: str, size: str, seconds: float) -> tuple[float, float]:
+    builder = chart_generator.CHART_BUILDERS[chart_type]
+    build_s = 0.0
+    renders = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        t0 = time.perf_counter()
+        fig, _ = builder("all")
+        build_s += time.perf_counter() - t0
+        chart_generator._fig_to_bytes(fig, fmt, size)
+        renders += 1
+    elapsed = time.perf_counter() - start
+    return renders / elapsed, build_s / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard chart rendering")
+    parser.add_argument("--charts", nargs="+", default=list(TEMPLATED), choices=list(chart_generator.CHART_BUILDERS))
+    parser.add_argument("--sizes", nargs="+", default=["thumbnail", "standard"], choices=list(chart_generator.CHART_SIZES))
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=list(chart_generator.CHART_FORMATS))
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each scenario")
+    args = parser.parse_args()
+
+    chart_generator.warm_up_charts()
+    print(f"{'chart':<24} {'format':<6} {'size':<10} {'fresh/s':>9} {'template/s':>11} {'speedup':>8}"
+          f" {'build ms (fresh → template)':>30}")
+    for chart_type in args.charts:
+        for fmt in args.formats:
+            for size in args.sizes:
+                results = {}
+                for mode in (False, True):
+                    chart_generator.CHART_TEMPLATES = mode
+                    # One untimed render so the template (and font caches) already exist
+                    fig, _ = chart_generator.CHART_BUILDERS[chart_type]("all")
+                    chart_generator._fig_to_bytes(fig, fmt, size)
+                    results[mode] = _rate(chart_type, fmt, size, args.seconds)
+                (fresh, fresh_build), (tpl, tpl_build) = results[False], results[True]
+                print(f"{chart_type:<24} {fmt:<6} {size:<10} {fresh:>9.1f} {tpl:>11.1f} {tpl / fresh:>7.2f}x"
+                      f" {fresh_build:>17.2f} → {tpl_build:.2f}")
+
+
+if __name__ == "__main__":
+    main()
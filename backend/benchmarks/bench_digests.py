@@ -0,0 +1,72 @@
+"""Serving shift-change questions from precomputed digests versus computing them per request.
+
+Run from the backend directory:
+
+    python benchmarks/bench_digests.py
+    python benchmarks/bench_digests.py --requests 200
+
+For each digest, "live" runs what the agent would call without digests (the
+lookup tool plus generate_chart for the same chart) and "digest" calls the
+shift_digest tool, which reads the cache and hands over the already rendered
+chart. The NCR journal is written to a temporary directory.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _latency(fn, requests: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark precomputed shift digests")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per digest and mode")
+    args = parser.parse_args()
+
+    os.environ.setdefault("NCR_JOURNAL_PATH", os.path.join(tempfile.mkdtemp(), "ncr_journal.jsonl"))
+    from app.agent.skills.chart_generator import chart_store, generate_chart, warm_up_charts
+    from app.agent.skills.order_lookup import work_order_lookup
+    from app.agent.skills.sentiment import equipment_status
+    from app.agent.skills.shift_digest import shift_digest
+    from app.digests import DIGESTS, get_digest_cache
+
+    warm_up_charts()
+    start = time.perf_counter()
+    get_digest_cache().refresh("startup", force=True)
+    print(f"precomputed {len(DIGESTS)} digests in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    # digest -> (lookup the agent would run, chart it would generate)
+    live = {
+        "machines_in_maintenance": (lambda: equipment_status.invoke({"query": "maintenance"}), "equipment_utilization"),
+        "overdue_orders": (lambda: work_order_lookup.invoke({"query": "in_progress", "sort_by": "due_date"}),
+                           "work_order_performance"),
+        "defect_dashboard": (None, "defect_analysis"),  # the defect chart is the whole answer
+    }
+    print(f"{'digest':<26} {'live p50 ms':>12} {'digest p50 ms':>14} {'live max':>9} {'digest max':>11} {'speedup':>8}")
+    for name in DIGESTS:
+        def run_live():
+            lookup, chart_type = live[name]
+            if lookup:
+                lookup()
+            generate_chart.invoke({"chart_type": chart_type, "subject": "all"})
+
+        live_p50, live_max = _latency(run_live, args.requests)
+        digest_p50, digest_max = _latency(lambda: shift_digest.invoke({"name": name}), args.requests)
+        chart_store.clear()
+        print(f"{name:<26} {live_p50:>12.2f} {digest_p50:>14.3f} {live_max:>9.1f} {digest_max:>11.3f}"
+              f" {live_p50 / digest_p50:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
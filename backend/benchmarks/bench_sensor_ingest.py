@@ -0,0 +1,68 @@
+"""Sensor ingest throughput benchmark (samples/sec).
+
+Run from the backend directory:
+
+    python benchmarks/bench_sensor_ingest.py --machines 1000 --seconds 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.sensors import CHANNELS, SensorStore  # noqa: E402
+
+
+def _run(label: str, fn, samples_per_call: int, seconds: float, unit: str = "samples") -> None:
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    elapsed = time.perf_counter() - start
+    rate = calls * samples_per_call / elapsed
+    print(f"{label:<38} {rate:>14,.0f} {unit}/sec  ({elapsed / calls * 1e6:,.1f} µs/call)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark live sensor ingest")
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--capacity", type=int, default=3600)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each scenario")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    machine_ids = [f"M-{i:05d}" for i in range(args.machines)]
+    n_ch = len(CHANNELS)
+
+    # One sample per machine per call, as arrays (the vectorized core)
+    store = SensorStore(args.capacity, args.machines)
+    values = rng.normal(50, 5, size=(args.machines, n_ch))
+    timestamps = np.full(args.machines, time.time())
+    _run(f"ingest_arrays ({args.machines}/batch)",
+         lambda: store.ingest_arrays(machine_ids, timestamps, values), args.machines, args.seconds)
+
+    # Same batch as JSON-shaped dicts (the HTTP/WebSocket path after parsing)
+    store = SensorStore(args.capacity, args.machines)
+    samples = [
+        {"machine_id": m, "readings": dict(zip(CHANNELS, row.tolist())), "timestamp": None}
+        for m, row in zip(machine_ids, values)
+    ]
+    _run(f"ingest_samples ({args.machines}/batch)",
+         lambda: store.ingest_samples(samples), args.machines, args.seconds)
+
+    # One sample per call (e.g. a chatty WebSocket client)
+    store = SensorStore(args.capacity, args.machines)
+    readings = samples[0]["readings"]
+    _run("ingest (1/call)", lambda: store.ingest("M-00000", readings), 1, args.seconds)
+
+    # Reads
+    _run("latest + window_stats (1/call)",
+         lambda: (store.latest("M-00000"), store.window_stats("M-00000")), 1, args.seconds, unit="reads")
+
+
+if __name__ == "__main__":
+    main()
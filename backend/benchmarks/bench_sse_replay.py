@@ -0,0 +1,180 @@
+"""Replay recorded agent runs through the SSE handler, without the LLM.
+
+Record real sessions by starting the API with EVENT_RECORDING_DIR set, then run
+from the backend directory:
+
+    python benchmarks/bench_sse_replay.py recordings/            # every recording in a directory
+    python benchmarks/bench_sse_replay.py run.events.jsonl.gz --speed 1   # at the recorded pace
+    python benchmarks/bench_sse_replay.py recordings/ --golden golden.json   # regression check
+
+With no recordings given, a synthetic run (planner, a work order lookup, a chart
+and a streamed answer, built from real tool outputs) is recorded first.
+
+Each replay checks that the SSE output is identical across repeats (ignoring
+timestamps), that every recorded chart reaches the client, and that the answer
+is persisted to the conversation. --golden stores a digest of each recording's
+SSE output on the first run and fails later runs whose output differs.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+
+from app.agent.skills.chart_generator import normalize_render_options  # noqa: E402
+from app.event_recording import load_recording, record_events, replay_events  # noqa: E402
+from app.main import _stream_agent_response, conversations  # noqa: E402
+
+
+async def _synthetic_events(tokens: int):
+    """An agent run shaped like a real one, with real tool outputs."""
+    from app.agent.graph import tools
+
+    by_name = {t.name: t for t in tools}
+    plan = [{"step": 1, "skill": "work_order_lookup"}, {"step": 2, "skill": "generate_chart"}]
+    yield {"event": "on_chat_model_end", "name": "ChatOpenAI", "metadata": {"langgraph_node": "planner"},
+           "data": {"output": AIMessage(content="__PLAN__:" + json.dumps(plan))}}
+    for name, args in (("work_order_lookup", {"query": "in_progress"}),
+                       ("generate_chart", {"chart_type": "work_order_performance", "subject": "all"})):
+        call = {"name": name, "args": args, "id": f"call_{name}", "type": "tool_call"}
+        yield {"event": "on_tool_start", "name": name, "metadata": {"langgraph_node": "tools"},
+               "data": {"input": args}}
+        output = await by_name[name].ainvoke(call)
+        yield {"event": "on_tool_end", "name": name, "metadata": {"langgraph_node": "tools"},
+               "data": {"output": output}}
+    words = [f"word{i} " for i in range(tokens)]
+    for word in words:
+        await asyncio.sleep(0.002)
+        yield {"event": "on_chat_model_stream", "name": "ChatOpenAI", "metadata": {"langgraph_node": "agent"},
+               "data": {"chunk": AIMessageChunk(content=word)}}
+    yield {"event": "on_chat_model_end", "name": "ChatOpenAI", "metadata": {"langgraph_node": "agent"},
+           "data": {"output": AIMessage(content="".join(words))}}
+
+
+async def _record_synthetic(directory: str, tokens: int) -> str:
+    async for _ in record_events(_synthetic_events(tokens), "synthetic run", str(uuid.uuid4()), directory):
+        pass
+    return glob.glob(os.path.join(directory, "*.events.jsonl.gz"))[0]
+
+
+def _normalize(chunk: str) -> str:
+    """An SSE chunk without its timestamp, so replays can be compared."""
+    lines = []
+    for line in chunk.splitlines():
+        if line.startswith("data: "):
+            data = json.loads(line[6:])
+            if isinstance(data, dict):
+                data.pop("timestamp", None)
+            line = "data: " + json.dumps(data, sort_keys=True)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+async def _replay_once(header: dict, events: list[dict], speed: float) -> tuple[float, list[str], str]:
+    conversation_id = str(uuid.uuid4())
+    chunks = []
+    start = time.perf_counter()
+    async for chunk in _stream_agent_response(
+        header["message"], conversation_id, normalize_render_options(None, None),
+        event_source=lambda inputs: replay_events(events, speed),
+    ):
+        chunks.append(chunk)
+    elapsed = time.perf_counter() - start
+    history = conversations.pop(conversation_id, [])
+    persisted = str(history[-1].content) if history and isinstance(history[-1], AIMessage) else ""
+    return elapsed, chunks, persisted
+
+
+async def _bench(path: str, args, golden: dict) -> bool:
+    header, events, trailer = load_recording(path)
+    charts = sum(1 for e in events if "chart" in e)
+    status = trailer["status"] if trailer else "truncated"
+    name = os.path.basename(path)
+    print(f"\n{name}: {len(events)} events, {charts} charts, recorded {status}"
+          f" in {trailer['duration_s'] if trailer else '?'}s")
+
+    timings, digests = [], set()
+    ok = True
+    for _ in range(args.repeat):
+        elapsed, chunks, persisted = await _replay_once(header, events, args.speed)
+        timings.append(elapsed)
+        normalized = "\n\n".join(_normalize(c) for c in chunks)
+        digests.add(hashlib.sha256(normalized.encode()).hexdigest())
+    delivered = sum(1 for c in chunks if c.startswith(("event: chart\n", "event: chart_data\n")))
+    errors = [c for c in chunks if c.startswith("event: error\n")]
+
+    mean = statistics.mean(timings)
+    print(f"  replay x{args.speed or 'max'}: mean {mean * 1000:,.2f} ms, "
+          f"p95 {sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000:,.2f} ms, "
+          f"{len(events) / mean:,.0f} events/sec, {len(chunks)} SSE events, "
+          f"{sum(len(c) for c in chunks):,} bytes")
+
+    if len(digests) != 1:
+        print("  FAIL: SSE output differs between replays")
+        ok = False
+    if delivered != charts:
+        print(f"  FAIL: {charts} charts recorded, {delivered} delivered")
+        ok = False
+    if errors:
+        print(f"  FAIL: handler emitted an error: {errors[0].strip()}")
+        ok = False
+    print(f"  conversation persisted: {'yes' if persisted else 'no'} ({len(persisted)} chars)")
+
+    digest = digests.pop()
+    if args.golden:
+        expected = golden.setdefault(name, digest)
+        if expected != digest:
+            print(f"  FAIL: output differs from golden digest {expected[:12]}")
+            ok = False
+    return ok
+
+
+async def _main(args) -> int:
+    paths = []
+    for path in args.recordings:
+        paths.extend(sorted(glob.glob(os.path.join(path, "*.events.jsonl.gz"))) if os.path.isdir(path) else [path])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not paths:
+            paths = [await _record_synthetic(tmp, args.tokens)]
+            print(f"Recorded synthetic run ({os.path.getsize(paths[0]):,} bytes gzipped)")
+
+        golden = {}
+        if args.golden and os.path.exists(args.golden):
+            with open(args.golden) as f:
+                golden = json.load(f)
+        ok = True
+        for path in paths:
+            ok = await _bench(path, args, golden) and ok
+        if args.golden:
+            with open(args.golden, "w") as f:
+                json.dump(golden, f, indent=2)
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SSE handler by replaying recorded agent runs")
+    parser.add_argument("recordings", nargs="*", help="Recording files or directories (default: a synthetic run)")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Replay speed relative to the recording (0 = as fast as possible)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=400, help="Streamed tokens in the synthetic run")
+    parser.add_argument("--golden", help="JSON file of SSE output digests to create or check against")
+    args = parser.parse_args()
+    if args.golden and not args.recordings:
+        parser.error("--golden needs recordings to check")
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Many conversations over one /ws/chat connection, with a fast and a slow client.
+
+Run from the backend directory:
+
+    python benchmarks/bench_ws_chat.py
+    python benchmarks/bench_ws_chat.py --conversations 20 --tokens 500 --read-delay-ms 5
+
+Starts uvicorn on a local port with /ws/chat backed by synthetic agent runs
+(streamed tokens through the real SSE handler, no LLM). For each client read
+delay, a client acknowledging frames within a --window credit reports how many
+token events were produced, how many frames it received (token events merged
+while it was behind), the time until every conversation ended, and the
+negotiated compression extension. Every conversation's reassembled answer is
+checked against what was streamed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from fastapi import FastAPI, WebSocket  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+
+from app.main import _stream_agent_response  # noqa: E402
+from app.models import ChatRequest  # noqa: E402
+from app.streaming import start_execution  # noqa: E402
+from app.ws_chat import ChatConnection  # noqa: E402
+
+
+def _answer(conversation_id: str, tokens: int) -> str:
+    return "".join(f"{conversation_id}-{i} " for i in range(tokens))
+
+
+def _app(tokens: int, token_interval: float) -> FastAPI:
+    async def events(conversation_id: str, inputs: dict):
+        words = [f"{conversation_id}-{i} " for i in range(tokens)]
+        for word in words:
+            await asyncio.sleep(token_interval)
+            yield {"event": "on_chat_model_stream", "name": "ChatOpenAI", "metadata": {"langgraph_node": "agent"},
+                   "data": {"chunk": AIMessageChunk(content=word)}}
+        yield {"event": "on_chat_model_end", "name": "ChatOpenAI", "metadata": {"langgraph_node": "agent"},
+               "data": {"output": AIMessage(content="".join(words))}}
+
+    def start_chat(request: ChatRequest):
+        cid = request.conversation_id
+        stream = _stream_agent_response(request.message, cid, ("png", "thumbnail"),
+                                        event_source=lambda inputs: events(cid, inputs))
+        return start_execution(cid, stream)
+
+    app = FastAPI()
+
+    @app.websocket("/ws/chat")
+    async def chat_ws(websocket: WebSocket):
+        await ChatConnection(websocket, start_chat).run()
+
+    return app
+
+
+async def _client(url: str, conversations: int, tokens: int, read_delay: float, window: int) -> dict:
+    if window:
+        url += f"?window={window}"
+    async with websockets.connect(url, compression="deflate", max_size=None) as ws:
+        extension = ws.response.headers.get("Sec-WebSocket-Extensions", "none")
+        start = time.perf_counter()
+        ids = [f"c{read_delay}-{i}" for i in range(conversations)]
+        for cid in ids:
+            await ws.send(json.dumps({"type": "chat", "conversation_id": cid, "message": "go"}))
+        answers = dict.fromkeys(ids, "")
+        frames = message_frames = payload_bytes = 0
+        ended = set()
+        while len(ended) < conversations:
+            raw = await ws.recv()
+            payload_bytes += len(raw)
+            frames += 1
+            frame = json.loads(raw)
+            if window and frame["seq"] % max(window // 4, 1) == 0:
+                await ws.send(json.dumps({"type": "ack", "seq": frame["seq"]}))
+            if frame["type"] == "event" and frame["event"] == "message":
+                message_frames += 1
+                answers[frame["conversation_id"]] += frame["data"]["content"]
+            elif frame["type"] == "end":
+                ended.add(frame["conversation_id"])
+            if read_delay:
+                await asyncio.sleep(read_delay)
+        elapsed = time.perf_counter() - start
+    correct = all(answers[cid] == _answer(cid, tokens) for cid in ids)
+    return {
+        "token_events": conversations * tokens,
+        "message_frames": message_frames,
+        "frames": frames,
+        "payload_kb": payload_bytes / 1024,
+        "elapsed_s": elapsed,
+        "correct": correct,
+        "extension": extension,
+    }
+
+
+async def _main(args):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    config = uvicorn.Config(_app(args.tokens, args.token_interval_ms / 1000), port=port, log_level="warning",
+                            ws_per_message_deflate=True)
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        print(f"{args.conversations} conversations x {args.tokens} tokens, one token per "
+              f"{args.token_interval_ms} ms per conversation")
+        print(f"{'read delay':>10} {'token events':>13} {'msg frames':>11} {'all frames':>11}"
+              f" {'payload KB':>11} {'elapsed s':>10} {'answers':>8}  extension")
+        for delay_ms in args.read_delay_ms:
+            r = await _client(f"ws://127.0.0.1:{port}/ws/chat", args.conversations, args.tokens, delay_ms / 1000,
+                              args.window)
+            print(f"{delay_ms:>8} ms {r['token_events']:>13,} {r['message_frames']:>11,} {r['frames']:>11,}"
+                  f" {r['payload_kb']:>11.1f} {r['elapsed_s']:>10.2f} {'ok' if r['correct'] else 'WRONG':>8}"
+                  f"  {r['extension']}")
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multiplexed chat over /ws/chat")
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-interval-ms", type=float, default=2.0)
+    parser.add_argument("--read-delay-ms", type=float, nargs="+", default=[0, 1, 5],
+                        help="Client delay after each received frame (0 = read as fast as possible)")
+    parser.add_argument("--window", type=int, default=64,
+                        help="Unacknowledged frames the server may send (0 = no acks, socket buffers only)")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Build the SQLite plant-data database from the JSON files in app/data.
+
+Run from the backend directory, then start the API with DATA_BACKEND=sqlite:
+
+    python scripts/convert_data_to_sqlite.py
+    python scripts/convert_data_to_sqlite.py --data-dir /var/lib/amm-assist/data --out /var/lib/amm-assist/plant.sqlite3
+
+The database is written to a temporary file and moved into place, so it can be
+rebuilt while workers are running; they switch to the new file on their next query.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import DATA_DIR, SQLITE_DATA_PATH  # noqa: E402
+from app.storage import convert_json_to_sqlite  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert plant data JSON files to SQLite")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", default=SQLITE_DATA_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = convert_json_to_sqlite(args.data_dir, args.out)
+    for dataset, rows in counts.items():
+        print(f"{dataset:<24} {rows:>8,} rows")
+    print(f"Wrote {args.out} ({os.path.getsize(args.out):,} bytes) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Local OpenAI/Azure-compatible chat completions server for exercising the provider pool.
+
+Run two instances with different behaviour, then point the pool at them:
+
+    python scripts/mock_llm_server.py --port 9001 --latency-ms 150
+    python scripts/mock_llm_server.py --port 9002 --latency-ms 900 --jitter-ms 600 --error-rate 0.2
+
+    LLM_PROVIDER=pool OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:9001/v1 \\
+    AZURE_OPENAI_API_KEY=x AZURE_OPENAI_ENDPOINT=http://127.0.0.1:9002 AZURE_OPENAI_DEPLOYMENT=mock \\
+    uvicorn app.main:app
+
+Serves both /v1/chat/completions (OpenAI) and
+/openai/deployments/{deployment}/chat/completions (Azure), streaming or not.
+--latency-ms/--jitter-ms delay the first token; --error-rate fails that share of
+requests with --error-status (429 by default, use 503 for server errors).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Mock LLM")
+settings = argparse.Namespace()
+
+
+def _reply_text(body: dict) -> str:
+    system = " ".join(str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "system")
+    # The planner expects a JSON plan
+    if "planning module" in system:
+        return "[]"
+    return f"Mock answer from {settings.name}."
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def _complete(request: Request, model: str):
+    body = await request.json()
+    model = body.get("model") or model
+    await asyncio.sleep(max(0.0, settings.latency_ms + random.uniform(-1, 1) * settings.jitter_ms) / 1000)
+    if random.random() < settings.error_rate:
+        return JSONResponse(
+            {"error": {"message": f"Mock {settings.error_status} from {settings.name}", "type": "mock_error"}},
+            status_code=settings.error_status,
+        )
+
+    text = _reply_text(body)
+    words = text.split(" ")
+    usage = {"prompt_tokens": 42, "completion_tokens": len(words), "total_tokens": 42 + len(words)}
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def stream():
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            yield _chunk(completion_id, model, {"content": word if i == 0 else " " + word})
+            await asyncio.sleep(settings.token_ms / 1000)
+        yield _chunk(completion_id, model, {}, finish_reason="stop")
+        if body.get("stream_options", {}).get("include_usage"):
+            yield _chunk(completion_id, model, {}, usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/chat/completions")
+async def openai_completions(request: Request):
+    return await _complete(request, "mock-openai")
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def azure_completions(deployment: str, request: Request):
+    return await _complete(request, deployment)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--name", default=None, help="Name echoed in replies (default: mock-<port>)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Delay before the first token")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter on the delay")
+    parser.add_argument("--token-ms", type=float, default=10, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.parse_args(namespace=settings)
+    settings.name = settings.name or f"mock-{settings.port}"
+    uvicorn.run(app, host="127.0.0.1", port=settings.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
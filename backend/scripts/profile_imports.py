@@ -0,0 +1,78 @@
+"""Profile backend import time using `python -X importtime`.
+
+Run from the backend directory:
+
+    python scripts/profile_imports.py                  # top 25 modules by cumulative time
+    python scripts/profile_imports.py --top 50 --sort self
+    python scripts/profile_imports.py --json importtime.json --budget-ms 1500
+
+--json writes the per-module table so startup cost can be tracked across commits;
+--budget-ms exits non-zero when the total import time of the target exceeds the budget.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       self [us] |  cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str) -> list[dict]:
+    """Import `module` in a fresh interpreter and parse the -X importtime report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile backend import time")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to show")
+    parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+    parser.add_argument("--json", dest="json_path", help="Write the full per-module table to this file")
+    parser.add_argument("--budget-ms", type=float, help="Fail if total import time exceeds this many ms")
+    args = parser.parse_args()
+
+    rows = profile(args.module)
+    target = next((r for r in rows if r["module"] == args.module), None)
+    total_ms = target["cumulative_ms"] if target else sum(r["self_ms"] for r in rows)
+
+    key = "cumulative_ms" if args.sort == "cumulative" else "self_ms"
+    print(f"{'self ms':>10} {'cumul ms':>10}  module")
+    for row in sorted(rows, key=lambda r: r[key], reverse=True)[:args.top]:
+        print(f"{row['self_ms']:>10.1f} {row['cumulative_ms']:>10.1f}  {row['module']}")
+    print(f"\nTotal import time for {args.module}: {total_ms:.1f} ms ({len(rows)} modules)")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"module": args.module, "total_ms": total_ms, "modules": rows}, f, indent=2)
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        raise SystemExit(f"Import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Knowledge base search over the shipped sample KB with the configured thresholds."""
+import pytest
+
+from app.knowledge_index import search_knowledge_base
+
+
+def _ids(query: str) -> list[str]:
+    return [hit["id"] for hit in search_knowledge_base(query)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("defect severity levels", "KB-011"),
+    ("how often should I change the coolant", "KB-008"),
+    ("what safety gear do I need on the floor", "KB-003"),
+    ("what is a critical defect", "KB-011"),
+    ("laser focus adjustment", "KB-010"),
+    ("align the laser beam", "KB-010"),
+])
+def test_paraphrases_find_their_entry(query, expected):
+    assert expected in _ids(query)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How do I calibrate the laser cutter?", "KB-010"),
+    ("PPE requirements", "KB-003"),
+    ("preventive maintenance schedule", "KB-008"),
+])
+def test_direct_questions_rank_their_entry_first(query, expected):
+    assert _ids(query)[0] == expected
+
+
+@pytest.mark.parametrize("query", [
+    "xyzzy",
+    "what's for lunch today",
+    "tell me a joke",
+    "what is the capital of France",
+    "weather tomorrow",
+    "how do I reset my email password",
+])
+def test_off_topic_queries_find_nothing(query):
+    assert _ids(query) == []
+
+
+def test_hits_carry_snippets_from_the_answer():
+    hit = search_knowledge_base("How do I calibrate the laser cutter?")[0]
+    assert hit["snippet"]
+    assert hit["score"] > 0
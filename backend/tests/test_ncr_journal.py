@@ -0,0 +1,144 @@
+"""NCR journal: group commit, torn-tail repair and catch-up across processes."""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app.ncr_journal import NCRJournal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "ncr_journal.jsonl")
+
+
+def _read_lines(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _append_from_subprocess(path: str, count: int, work_order_id: str) -> subprocess.Popen:
+    script = (
+        "import sys\n"
+        "from app.ncr_journal import NCRJournal\n"
+        "journal = NCRJournal(sys.argv[1], group_commit_ms=1)\n"
+        "for i in range(int(sys.argv[2])):\n"
+        "    journal.append({'work_order_id': sys.argv[3], 'description': f'subprocess {i}'})\n"
+        "journal.close()\n"
+    )
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    return subprocess.Popen([sys.executable, "-c", script, path, str(count), work_order_id], env=env)
+
+
+def test_concurrent_appends_get_unique_gap_free_sequence_numbers(journal_path, monkeypatch):
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+
+    journal = NCRJournal(journal_path, group_commit_ms=5)
+    threads, per_thread = 20, 10
+    results: list[dict] = []
+    results_lock = threading.Lock()
+
+    def report(worker: int):
+        for i in range(per_thread):
+            result = journal.append({"work_order_id": f"wo-{worker % 4}", "description": f"{worker}/{i}"})
+            with results_lock:
+                results.append(result)
+
+    workers = [threading.Thread(target=report, args=(w,)) for w in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    journal.close()
+
+    total = threads * per_thread
+    assert sorted(r["seq"] for r in results) == list(range(1, total + 1))
+    assert len({r["ncr_number"] for r in results}) == total
+    lines = _read_lines(journal_path)
+    assert [line["seq"] for line in lines] == list(range(1, total + 1))
+    # Concurrent reports share fsyncs
+    assert len(fsyncs) < total
+
+    # Each result counts the defects on its work order up to and including itself
+    for wo in range(4):
+        counts = sorted(r["defects_logged_on_wo"] for r in results if r["work_order_id"] == f"wo-{wo}")
+        assert counts == list(range(1, len(counts) + 1))
+
+
+def test_reopen_continues_sequence_and_counts(journal_path):
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    for _ in range(3):
+        journal.append({"work_order_id": "WO-2001"})
+    journal.close()
+
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    assert journal.last_seq() == 3
+    assert journal.defects_logged("wo-2001") == 3
+    assert journal.append({"work_order_id": "WO-2001"})["ncr_number"] == "NCR-000004"
+    journal.close()
+
+
+def test_torn_tail_is_truncated_on_open(journal_path):
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    journal.append({"work_order_id": "WO-2001"})
+    journal.append({"work_order_id": "WO-2002"})
+    journal.close()
+    intact_size = os.path.getsize(journal_path)
+    # A crash mid-write leaves a partial line without its newline
+    with open(journal_path, "ab") as f:
+        f.write(b'{"seq": 3, "ncr_number": "NCR-0000')
+
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    assert os.path.getsize(journal_path) == intact_size
+    assert journal.last_seq() == 2
+    assert journal.append({"work_order_id": "WO-2002"})["seq"] == 3
+    journal.close()
+
+    assert [line["seq"] for line in _read_lines(journal_path)] == [1, 2, 3]
+    assert NCRJournal(journal_path, group_commit_ms=0).defect_counts() == {"WO-2001": 1, "WO-2002": 2}
+
+
+def test_journal_without_any_newline_is_emptied(journal_path):
+    with open(journal_path, "wb") as f:
+        f.write(b'{"seq": 1, "ncr_')
+
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    assert os.path.getsize(journal_path) == 0
+    assert journal.append({"work_order_id": "WO-2001"})["seq"] == 1
+    journal.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="cross-process locking needs fcntl")
+def test_catches_up_with_appends_from_another_process(journal_path):
+    journal = NCRJournal(journal_path, group_commit_ms=0)
+    journal.append({"work_order_id": "WO-2001"})
+
+    proc = _append_from_subprocess(journal_path, 5, "WO-2003")
+    assert proc.wait(timeout=60) == 0
+
+    assert journal.last_seq() == 6
+    assert journal.defects_logged("WO-2003") == 5
+    assert journal.append({"work_order_id": "WO-2003"})["defects_logged_on_wo"] == 6
+    journal.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="cross-process locking needs fcntl")
+def test_processes_appending_concurrently_share_one_sequence(journal_path):
+    journal = NCRJournal(journal_path, group_commit_ms=1)
+    procs = [_append_from_subprocess(journal_path, 20, f"WO-{2000 + p}") for p in range(3)]
+    local = [journal.append({"work_order_id": "WO-2001"})["seq"] for _ in range(20)]
+    for proc in procs:
+        assert proc.wait(timeout=60) == 0
+
+    seqs = [line["seq"] for line in _read_lines(journal_path)]
+    assert seqs == list(range(1, 81))
+    assert local == sorted(local)
+    assert journal.last_seq() == 80
+    journal.close()
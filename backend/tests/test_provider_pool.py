@@ -0,0 +1,122 @@
+"""PooledChatModel against two fake providers: hedging, retries and latency ranking."""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Optional
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from app.agent.provider_pool import PooledChatModel
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _FakeProvider(BaseChatModel):
+    """Streams its name after `delay_s`; the first calls fail with the queued HTTP statuses."""
+
+    name: str
+    delay_s: float = 0.0
+    failures: list[int] = Field(default_factory=list)
+    calls: list[float] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls.append(time.monotonic())
+        if self.failures:
+            raise _StatusError(self.failures.pop(0))
+        await asyncio.sleep(self.delay_s)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self.name))
+
+
+def _pool(*providers: _FakeProvider, **options) -> PooledChatModel:
+    options = {"retry_base_ms": 1, "retry_max_ms": 5, **options}
+    return PooledChatModel(providers=[(p.name, p) for p in providers], **options)
+
+
+def test_hedged_request_fires_after_the_hedge_delay_and_the_faster_answer_wins():
+    slow, fast = _FakeProvider(name="slow", delay_s=2.0), _FakeProvider(name="fast")
+    pool = _pool(slow, fast, hedge_default_ms=100)
+
+    started = time.monotonic()
+    answer = asyncio.run(pool.ainvoke("hi"))
+    elapsed = time.monotonic() - started
+
+    assert answer.content == "fast"
+    assert len(slow.calls) == len(fast.calls) == 1
+    assert 0.09 <= fast.calls[0] - slow.calls[0] < 0.5
+    assert elapsed < 1.0
+
+
+def test_no_hedge_when_the_first_provider_answers_in_time():
+    first, second = _FakeProvider(name="first", delay_s=0.01), _FakeProvider(name="second")
+    pool = _pool(first, second, hedge_default_ms=500)
+
+    assert asyncio.run(pool.ainvoke("hi")).content == "first"
+    assert second.calls == []
+
+
+@pytest.mark.parametrize("failures", [[429], [503], [429, 503]])
+def test_throttling_and_server_errors_are_retried(failures):
+    provider = _FakeProvider(name="only", failures=list(failures))
+    pool = _pool(provider, hedge_enabled=False, max_retries=3)
+
+    assert asyncio.run(pool.ainvoke("hi")).content == "only"
+    assert len(provider.calls) == len(failures) + 1
+
+
+def test_gives_up_after_max_retries():
+    provider = _FakeProvider(name="only", failures=[503] * 10)
+    pool = _pool(provider, hedge_enabled=False, max_retries=2)
+
+    with pytest.raises(_StatusError):
+        asyncio.run(pool.ainvoke("hi"))
+    assert len(provider.calls) == 3
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    provider = _FakeProvider(name="only", failures=[400])
+    pool = _pool(provider, hedge_enabled=False, max_retries=3)
+
+    with pytest.raises(_StatusError):
+        asyncio.run(pool.ainvoke("hi"))
+    assert len(provider.calls) == 1
+
+
+def test_faster_provider_is_ranked_first_once_both_are_measured():
+    slow, fast = _FakeProvider(name="slow", delay_s=0.05), _FakeProvider(name="fast", delay_s=0.0)
+    pool = _pool(slow, fast, hedge_enabled=False)
+
+    async def calls(n: int) -> list[str]:
+        return [(await pool.ainvoke("hi")).content for _ in range(n)]
+
+    answers = asyncio.run(calls(6))
+
+    # Unmeasured providers are sampled first, then the fastest one takes the traffic
+    assert answers[:2] == ["slow", "fast"]
+    assert answers[2:] == ["fast"] * 4
+    assert [name for name, _ in pool._ranked()] == ["fast", "slow"]
+    stats = pool.stats()
+    assert stats["fast"]["ewma_ms"] < stats["slow"]["ewma_ms"]
+
+
+def test_a_failing_provider_drops_behind_the_other():
+    flaky, steady = _FakeProvider(name="flaky", failures=[503]), _FakeProvider(name="steady")
+    pool = _pool(flaky, steady, hedge_enabled=False, max_retries=1)
+
+    assert asyncio.run(pool.ainvoke("hi")).content == "steady"
+    assert [name for name, _ in pool._ranked()][0] == "steady"
@@ -0,0 +1,18 @@
+"""Importing the app must not load the heavy libraries that are only needed on first use."""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_main_import_leaves_numpy_and_matplotlib_unloaded():
+    script = (
+        "import sys\n"
+        "import app.main\n"
+        "print(','.join(m for m in ('numpy', 'matplotlib') if m in sys.modules))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    out = subprocess.run([sys.executable, "-c", script], env=env, cwd=BACKEND_DIR,
+                         capture_output=True, text=True, timeout=120, check=True)
+    assert out.stdout.strip() == ""
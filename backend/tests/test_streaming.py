@@ -0,0 +1,100 @@
+"""Resumable chat executions: event ids, Last-Event-ID replay and concurrent runs."""
+import asyncio
+
+import pytest
+
+from app import streaming
+from app.streaming import ConversationBusy, start_execution
+
+
+class _Client:
+    """Stands in for the HTTP request: only is_disconnected() is used."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+@pytest.fixture(autouse=True)
+def _fresh_executions(monkeypatch):
+    monkeypatch.setattr(streaming, "_executions", {})
+
+
+async def _events(count: int, gate: asyncio.Event = None):
+    for i in range(count):
+        if gate is not None and i == count - 1:
+            await gate.wait()
+        yield f"event: token\ndata: {i}\n\n"
+
+
+async def _collect(execution, last_event_id: int = 0) -> list[str]:
+    return [chunk async for chunk in execution.subscribe(_Client(), last_event_id)]
+
+
+def _ids(chunks: list[str]) -> list[int]:
+    return [int(c.split("\n", 1)[0][len("id: "):]) for c in chunks if c.startswith("id: ")]
+
+
+def test_event_ids_continue_across_a_conversations_executions():
+    async def scenario():
+        first = start_execution("c1", _events(3))
+        assert _ids(await _collect(first)) == [1, 2, 3]
+        second = start_execution("c1", _events(2))
+        assert _ids(await _collect(second)) == [4, 5]
+
+    asyncio.run(scenario())
+
+
+def test_resume_replays_only_missed_events():
+    async def scenario():
+        execution = start_execution("c1", _events(5))
+        await _collect(execution)
+        assert _ids(await _collect(execution, last_event_id=3)) == [4, 5]
+
+    asyncio.run(scenario())
+
+
+def test_resume_past_the_buffer_reports_a_gap(monkeypatch):
+    monkeypatch.setattr(streaming, "SSE_REPLAY_BUFFER_SIZE", 3)
+
+    async def scenario():
+        execution = start_execution("c1", _events(6))
+        await execution.task
+        chunks = await _collect(execution, last_event_id=1)
+        assert chunks[0].startswith("event: replay_gap")
+        assert '"missed_from": 2, "missed_to": 3' in chunks[0]
+        assert _ids(chunks) == [4, 5, 6]
+
+    asyncio.run(scenario())
+
+
+def test_new_chat_is_rejected_while_the_previous_run_is_streaming():
+    async def scenario():
+        gate = asyncio.Event()
+        running = start_execution("c1", _events(3, gate))
+        await asyncio.sleep(0)
+        with pytest.raises(ConversationBusy):
+            start_execution("c1", _events(1))
+        # Other conversations are unaffected
+        assert _ids(await _collect(start_execution("c2", _events(1)))) == [1]
+
+        gate.set()
+        assert _ids(await _collect(running)) == [1, 2, 3]
+        assert _ids(await _collect(start_execution("c1", _events(1)))) == [4]
+
+    asyncio.run(scenario())
+
+
+def test_cancel_all_stops_running_executions():
+    async def scenario():
+        gate = asyncio.Event()
+        execution = start_execution("c1", _events(2, gate))
+        await asyncio.sleep(0)
+        await streaming.cancel_all()
+        assert execution.done
+        assert execution.cancel_token.is_set()
+        assert _ids(await _collect(execution)) == [1]
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+"""/ws/chat command handling: malformed frames are answered with errors, not a dropped socket."""
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_binary_and_invalid_frames_get_error_frames_and_keep_the_connection():
+    client = TestClient(app)
+    with client.websocket_connect("/ws/chat") as ws:
+        ws.send_bytes(b"xx")
+        frame = ws.receive_json()
+        assert frame["type"] == "error"
+        assert "Binary frames" in frame["message"]
+
+        ws.send_text("{not json")
+        frame = ws.receive_json()
+        assert frame["type"] == "error"
+        assert frame["message"].startswith("Invalid JSON")
+
+        ws.send_json({"type": "resume", "conversation_id": "missing", "request_id": "r1"})
+        frame = ws.receive_json()
+        assert frame["type"] == "error"
+        assert frame["request_id"] == "r1"
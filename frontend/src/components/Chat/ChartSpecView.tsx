@@ -0,0 +1,119 @@
+import { useState } from "react";
+import type { ChartPanel, ChartSpec } from "../../types";
+
+const WIDTH = 480;
+const HEIGHT = 260;
+const PAD = { top: 16, right: 16, bottom: 48, left: 44 };
+const PLOT_W = WIDTH - PAD.left - PAD.right;
+const PLOT_H = HEIGHT - PAD.top - PAD.bottom;
+
+function yDomain(panel: ChartPanel): [number, number] {
+    if (panel.y_range) return panel.y_range;
+    const values = panel.series.flatMap((s) => s.values).concat(panel.thresholds.map((t) => t.value));
+    const max = Math.max(0, ...values);
+    return [0, max > 0 ? max * 1.1 : 1];
+}
+
+const Panel: React.FC<{ panel: ChartPanel }> = ({ panel }) => {
+    const [min, max] = yDomain(panel);
+    const y = (v: number) => PAD.top + PLOT_H - ((v - min) / (max - min)) * PLOT_H;
+    const slot = PLOT_W / Math.max(panel.x.length, 1);
+    const xCenter = (i: number) => PAD.left + slot * i + slot / 2;
+    const ticks = [0, 0.25, 0.5, 0.75, 1].map((f) => min + (max - min) * f);
+
+    return (
+        <svg viewBox={`0 0 ${WIDTH} ${HEIGHT}`} className="chart-spec-panel" role="img">
+            <text x={WIDTH / 2} y={12} textAnchor="middle" className="chart-spec-title">{panel.title}</text>
+            {ticks.map((t) => (
+                <g key={t}>
+                    <line x1={PAD.left} x2={WIDTH - PAD.right} y1={y(t)} y2={y(t)} className="chart-spec-grid" />
+                    <text x={PAD.left - 6} y={y(t) + 3} textAnchor="end" className="chart-spec-tick">
+                        {Number.isInteger(t) ? t : t.toFixed(1)}
+                    </text>
+                </g>
+            ))}
+            <text x={10} y={PAD.top + PLOT_H / 2} transform={`rotate(-90 10 ${PAD.top + PLOT_H / 2})`}
+                textAnchor="middle" className="chart-spec-tick">{panel.y_label}</text>
+
+            {panel.kind === "bar" && panel.series.map((series, si) => {
+                const barW = (slot * 0.7) / panel.series.length;
+                return series.values.map((v, i) => (
+                    <rect
+                        key={`${si}-${i}`}
+                        x={PAD.left + slot * i + slot * 0.15 + barW * si}
+                        y={y(Math.max(v, min))}
+                        width={barW}
+                        height={Math.max(0, y(min) - y(Math.max(v, min)))}
+                        fill={series.colors?.[i] ?? series.color ?? "#6366f1"}
+                    >
+                        <title>{`${series.name} · ${panel.x[i]}: ${v}`}</title>
+                    </rect>
+                ));
+            })}
+
+            {panel.kind === "line" && panel.series.map((series, si) => {
+                const points = series.values.map((v, i) => `${xCenter(i)},${y(v)}`).join(" ");
+                const color = series.color ?? "#6366f1";
+                return (
+                    <g key={si}>
+                        {series.fill && (
+                            <polygon
+                                points={`${xCenter(0)},${y(min)} ${points} ${xCenter(series.values.length - 1)},${y(min)}`}
+                                fill={color}
+                                opacity={0.15}
+                            />
+                        )}
+                        <polyline points={points} fill="none" stroke={color} strokeWidth={2} />
+                        {series.values.map((v, i) => (
+                            <circle key={i} cx={xCenter(i)} cy={y(v)} r={3.5} fill={color}>
+                                <title>{`${series.name} · ${panel.x[i]}: ${v}`}</title>
+                            </circle>
+                        ))}
+                    </g>
+                );
+            })}
+
+            {panel.thresholds.map((t) => (
+                <g key={t.label}>
+                    <line x1={PAD.left} x2={WIDTH - PAD.right} y1={y(t.value)} y2={y(t.value)}
+                        stroke={t.color} strokeDasharray="6 4" opacity={0.6} />
+                    <text x={WIDTH - PAD.right} y={y(t.value) - 4} textAnchor="end" fill={t.color}
+                        className="chart-spec-tick">{t.label}</text>
+                </g>
+            ))}
+
+            {panel.x.map((label, i) => (
+                <text key={label + i} x={xCenter(i)} y={HEIGHT - PAD.bottom + 14}
+                    transform={`rotate(30 ${xCenter(i)} ${HEIGHT - PAD.bottom + 14})`}
+                    className="chart-spec-tick">{label}</text>
+            ))}
+
+            {panel.series.length > 1 && panel.series.map((series, si) => (
+                <text key={series.name} x={PAD.left + 4 + si * 90} y={HEIGHT - 4}
+                    fill={series.color ?? "#94a3b8"} className="chart-spec-tick">■ {series.name}</text>
+            ))}
+        </svg>
+    );
+};
+
+/** Renders a chart_data spec client-side; click a panel to expand it. */
+export const ChartSpecView: React.FC<{ spec: ChartSpec }> = ({ spec }) => {
+    const [expanded, setExpanded] = useState<number | null>(null);
+
+    return (
+        <div className="chart-spec">
+            <div className="chart-spec-heading">{spec.title}</div>
+            <div className="chart-spec-panels">
+                {spec.panels.map((panel, i) => (
+                    <div
+                        key={i}
+                        className={`chart-spec-cell${expanded === i ? " expanded" : ""}`}
+                        onClick={() => setExpanded(expanded === i ? null : i)}
+                    >
+                        <Panel panel={panel} />
+                    </div>
+                ))}
+            </div>
+        </div>
+    );
+};
@@ -1,6 +1,28 @@
+import { useState } from "react";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
-import type { Message } from "../../types";
+import type { ChartData, Message } from "../../types";
+import { API_BASE_URL } from "../../utils/api";
+import { ChartSpecView } from "./ChartSpecView";
+
+/** Shows the streamed preview; the full-size render is fetched only when clicked. */
+const ChartImage: React.FC<{ chart: ChartData }> = ({ chart }) => {
+    const [showFull, setShowFull] = useState(false);
+    const src = showFull && chart.full_url
+        ? `${API_BASE_URL}${chart.full_url}`
+        : `data:${chart.mime_type};base64,${chart.image_base64}`;
+
+    return (
+        <img
+            src={src}
+            alt={chart.summary || "Performance Chart"}
+            className="chart-image"
+            title={chart.full_url && !showFull ? "Click to load full resolution" : undefined}
+            style={chart.full_url && !showFull ? { cursor: "zoom-in" } : undefined}
+            onClick={() => chart.full_url && setShowFull(true)}
+        />
+    );
+};
 
 interface MessageBubbleProps {
     message: Message;
@@ -36,11 +58,7 @@ export const MessageBubble: React.FC<MessageBubbleProps> = ({ message }) => {
                     <div className="chart-container">
                         {message.charts.map((chart, i) => (
                             <div key={i} className="chart-wrapper">
-                                <img
-                                    src={`data:image/png;base64,${chart.image_base64}`}
-                                    alt={chart.summary || "Performance Chart"}
-                                    className="chart-image"
-                                />
+                                {chart.spec ? <ChartSpecView spec={chart.spec} /> : <ChartImage chart={chart} />}
                                 {chart.summary && (
                                     <div className="chart-caption">{chart.summary}</div>
                                 )}
@@ -1,7 +1,14 @@
 import { useState, useCallback, useRef } from "react";
-import type { Message, SkillStep, PlanStep, ChatState, ChartData } from "../types";
+import type { Message, SkillStep, PlanStep, ChatState, ChartData, ChartSpec } from "../types";
 import { API_BASE_URL } from "../utils/api";
 
+const RESUME_ATTEMPTS = 5;
+const RESUME_BACKOFF_MS = 1000;
+
+interface StreamCursor {
+    lastEventId: string;
+}
+
 function generateId(): string {
     return `${Date.now()}-${Math.random().toString(36).substring(2, 9)}`;
 }
@@ -54,6 +61,8 @@ export function useChat() {
                 messages: [...prev.messages, assistantMessage],
             }));
 
+            const cursor: StreamCursor = { lastEventId: "" };
+
             try {
                 abortRef.current = new AbortController();
 
@@ -63,41 +72,33 @@ export function useChat() {
                     body: JSON.stringify({
                         message: content.trim(),
                         conversation_id: state.conversationId,
+                        // Dashboards with a chart spec are drawn client-side; others fall back to images
+                        chart_mode: "spec",
                     }),
                     signal: abortRef.current.signal,
                 });
 
                 if (!response.ok) throw new Error("Chat request failed");
 
-                const reader = response.body?.getReader();
-                if (!reader) throw new Error("No response body");
-
-                const decoder = new TextDecoder();
-                let buffer = "";
-
-                while (true) {
-                    const { done, value } = await reader.read();
-                    if (done) break;
-
-                    buffer += decoder.decode(value, { stream: true });
-                    const lines = buffer.split("\n");
-                    buffer = lines.pop() || "";
-
-                    let currentEventType = "";
-
-                    for (const line of lines) {
-                        if (line.startsWith("event: ")) {
-                            currentEventType = line.slice(7).trim();
-                        } else if (line.startsWith("data: ") && currentEventType) {
-                            try {
-                                const data = JSON.parse(line.slice(6));
-                                handleSSEEvent(currentEventType, data, assistantId);
-                            } catch {
-                                // Skip malformed JSON
-                            }
-                            currentEventType = "";
-                        }
+                // Shop-floor Wi-Fi drops connections; reattach to the running execution
+                // and replay the events after the last one received instead of re-asking.
+                let stream: Response = response;
+                for (let attempt = 0; ; attempt++) {
+                    try {
+                        if (await readStream(stream, assistantId, cursor)) break;
+                    } catch (err) {
+                        if (err instanceof Error && err.name === "AbortError") throw err;
                     }
+                    if (attempt >= RESUME_ATTEMPTS) throw new Error("Connection lost");
+                    await new Promise((resolve) => setTimeout(resolve, RESUME_BACKOFF_MS * (attempt + 1)));
+                    stream = await fetch(
+                        `${API_BASE_URL}/api/chat/${encodeURIComponent(state.conversationId)}/stream`,
+                        {
+                            headers: cursor.lastEventId ? { "Last-Event-ID": cursor.lastEventId } : {},
+                            signal: abortRef.current.signal,
+                        }
+                    );
+                    if (!stream.ok) throw new Error("Connection lost");
                 }
             } catch (err) {
                 if (err instanceof Error && err.name !== "AbortError") {
@@ -162,7 +163,28 @@ export function useChat() {
 
                 case "chart": {
                     const chartData: ChartData = {
+                        chart_id: data.chart_id as string | undefined,
                         image_base64: data.image_base64 as string,
+                        mime_type: (data.mime_type as string) || "image/png",
+                        full_url: data.full_url as string | null | undefined,
+                        chart_type: data.chart_type as string,
+                        summary: data.summary as string,
+                    };
+                    setState((prev) => ({
+                        ...prev,
+                        messages: prev.messages.map((msg) =>
+                            msg.id === assistantId
+                                ? { ...msg, charts: [...(msg.charts || []), chartData] }
+                                : msg
+                        ),
+                    }));
+                    break;
+                }
+
+                case "chart_data": {
+                    const chartData: ChartData = {
+                        chart_id: data.chart_id as string | undefined,
+                        spec: data.spec as ChartSpec,
                         chart_type: data.chart_type as string,
                         summary: data.summary as string,
                     };
@@ -201,6 +223,48 @@ export function useChat() {
         []
     );
 
+    /** Reads SSE events until the stream ends; true if the execution finished ("done"). */
+    const readStream = useCallback(
+        async (response: Response, assistantId: string, cursor: StreamCursor): Promise<boolean> => {
+            const reader = response.body?.getReader();
+            if (!reader) throw new Error("No response body");
+
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let currentEventType = "";
+            let currentEventId = "";
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) return false;
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split("\n");
+                buffer = lines.pop() || "";
+
+                for (const line of lines) {
+                    if (line.startsWith("id: ")) {
+                        currentEventId = line.slice(4).trim();
+                    } else if (line.startsWith("event: ")) {
+                        currentEventType = line.slice(7).trim();
+                    } else if (line.startsWith("data: ") && currentEventType) {
+                        if (currentEventId) cursor.lastEventId = currentEventId;
+                        if (currentEventType === "done") return true;
+                        try {
+                            const data = JSON.parse(line.slice(6));
+                            handleSSEEvent(currentEventType, data, assistantId);
+                        } catch {
+                            // Skip malformed JSON
+                        }
+                        currentEventType = "";
+                        currentEventId = "";
+                    }
+                }
+            }
+        },
+        [handleSSEEvent]
+    );
+
     const clearChat = useCallback(() => {
         setState({
             messages: [],
@@ -1,7 +1,40 @@
+export interface ChartSeries {
+    name: string;
+    values: number[];
+    color?: string;
+    colors?: string[];
+    fill?: boolean;
+}
+
+export interface ChartThreshold {
+    value: number;
+    label: string;
+    color: string;
+}
+
+export interface ChartPanel {
+    title: string;
+    kind: "bar" | "line";
+    x: string[];
+    y_label: string;
+    y_range?: [number, number];
+    series: ChartSeries[];
+    thresholds: ChartThreshold[];
+}
+
+export interface ChartSpec {
+    title: string;
+    panels: ChartPanel[];
+}
+
 export interface ChartData {
-    image_base64: string;
+    chart_id?: string;
+    image_base64?: string;
+    mime_type?: string;
+    spec?: ChartSpec;
     chart_type: string;
     summary: string;
+    full_url?: string | null;
 }
 
 export interface Message {